@@ -24,289 +24,3559 @@ ActionModule definition for the Ansible prompt action plugin.
 
 __metaclass__ = type
 
+import atexit
+import os
 import re
 import sys
+import threading
+import time
+
+from collections import ChainMap, namedtuple, OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager
+from functools import lru_cache
+from types import MappingProxyType
+
+from ansible.errors import AnsibleError
+from ansible.module_utils.common.text.converters import to_text
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.plugins.action import ActionBase
+from ansible.utils.display import Display
+from ansible.utils.unsafe_proxy import wrap_var
+
+
+display = Display()
+
+
+class PromptError(Exception):
+    """
+    Raised when a message specification cannot be compiled into a prompt plan.
+
+    The failure message is kept unformatted so it can be handed to ``ActionModule._fail`` unchanged.
+
+    .. class:: PromptError(message, *args)
+    .. versionadded:: 1.1.0
+    """
+
+    def __init__(self, message, *args):
+        """
+        Initialize the error with a failure message and its formatting arguments.
+
+        .. versionadded:: 1.1.0
+        .. function:: __init__(message, *args)
+        """
+        super(PromptError, self).__init__(message % args)
+
+        self.template = message
+        self.params = args
+
+
+#: ANSI foreground color codes for the ``color`` option.
+COLORS = {
+    'black': 30, 'red': 31, 'green': 32, 'yellow': 33, 'blue': 34, 'magenta': 35, 'cyan': 36, 'white': 37,
+    'bright_black': 90, 'bright_red': 91, 'bright_green': 92, 'bright_yellow': 93, 'bright_blue': 94,
+    'bright_magenta': 95, 'bright_cyan': 96, 'bright_white': 97,
+}
+
+#: ANSI text attribute codes for the ``style`` option.
+STYLES = {'bold': 1, 'dim': 2, 'italic': 3, 'underline': 4, 'blink': 5, 'reverse': 7}
+
+#: Restores the terminal's default styling after styled text.
+RESET = "\x1b[0m"
+
+#: Matches ANSI escape sequences, which take up no columns on the terminal.
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+
+#: Terminal columns taken by each non-ASCII character seen so far.
+CHAR_WIDTHS = dict()
+
+
+def _charWidth(char):
+    """
+    Return the number of terminal columns a character occupies, caching the result.
+
+    Wide and full-width East Asian characters take two columns, while combining and other zero-width characters take
+    none.
+
+    .. versionadded:: 1.1.0
+    .. function:: _charWidth(char)
+    """
+    width = CHAR_WIDTHS.get(char)
+
+    if width is None:
+        import unicodedata
+
+        if unicodedata.combining(char) or unicodedata.category(char) in ('Mn', 'Me', 'Cf'):
+            width = 0
+        elif unicodedata.east_asian_width(char) in ('W', 'F'):
+            width = 2
+        else:
+            width = 1
+
+        CHAR_WIDTHS[char] = width
+
+    return width
+
+
+@lru_cache(maxsize=1024)
+def displayWidth(text):
+    """
+    Return the number of terminal columns a string occupies, ignoring any ANSI escape sequences.
+
+    .. versionadded:: 1.1.0
+    .. function:: displayWidth(text)
+    """
+    if "\x1b" in text:
+        text = ANSI_ESCAPE.sub("", text)
+
+    if text.isascii():
+        return len(text)
+
+    return sum(_charWidth(char) for char in text)
+
+
+def _splitWidth(word, width):
+    """
+    Split a word into the longest leading part fitting in the given number of columns, and the rest.
+
+    .. versionadded:: 1.1.0
+    .. function:: _splitWidth(word, width)
+    """
+    used = 0
+
+    for i, char in enumerate(word):
+        used += 1 if char.isascii() else _charWidth(char)
+
+        if used > width:
+            return word[:max(i, 1)], word[max(i, 1):]
+
+    return word, ""
+
+
+def wrapText(text, width):
+    """
+    Wrap text greedily to lines of at most the given number of columns.
+
+    Each line of the text is wrapped separately and runs of whitespace are collapsed.  Words wider than a line are
+    split across lines.  Every word is measured once, so the time taken grows linearly with the text.
+
+    :kwarg text: the text to wrap
+    :kwarg width: the number of columns available
+
+    :returns: a list of lines
+
+    .. versionadded:: 1.1.0
+    .. function:: wrapText(text, width)
+    """
+    width = max(width, 1)
+    lines = []
+
+    for paragraph in text.split("\n"):
+        line = []
+        used = 0
+
+        for word in paragraph.split():
+            wordWidth = displayWidth(word)
+
+            if line and used + 1 + wordWidth > width:
+                lines.append(" ".join(line))
+                line = []
+                used = 0
+
+            while wordWidth > width:
+                head, word = _splitWidth(word, width)
+                lines.append(head)
+                wordWidth = displayWidth(word)
+
+            if word:
+                used += wordWidth + (1 if line else 0)
+                line.append(word)
+
+        lines.append(" ".join(line))
+
+    return lines
+
+
+#: Item options whose text is templated by the plugin just before the item is shown.
+DEFERRED_OPTIONS = ('say', 'default', 'say_file', 'when', 'foreach', 'key')
+
+
+def _isTemplate(value):
+    """
+    Return whether a value is text containing a Jinja2 expression or statement.
+
+    .. versionadded:: 1.1.0
+    .. function:: _isTemplate(value)
+    """
+    return isinstance(value, str) and ("{{" in value or "{%" in value)
+
+
+def freeze(value):
+    """
+    Return a deeply immutable copy of a value taken from task arguments.
+
+    Lists become tuples, sets become frozensets, and dicts become read-only mappings, so a compiled plan can be shared
+    between hosts, threads, and tasks without copying it, and nothing rendering it can change the task's arguments.
+
+    :kwarg value: the value to freeze
+
+    :returns: the frozen value
+
+    .. versionadded:: 1.1.0
+    .. function:: freeze(value)
+    """
+    if isinstance(value, dict):
+        return MappingProxyType(dict((k, freeze(v)) for k, v in value.items()))
+
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(v) for v in value)
+
+    return value
+
+
+#: Characters drawing the border of ``box`` and ``panel`` layouts.
+BORDER = {
+    'top': u"\u250c%s\u2510",
+    'side': u"\u2502 %s \u2502",
+    'bottom': u"\u2514%s\u2518",
+    'line': u"\u2500",
+}
+
+
+class SayOp(namedtuple('SayOp', 'text align newline style wrap layout when')):
+    """
+    A compiled, immutable message to display to the user.
+
+    ``style`` is the ANSI escape sequence styling the message, or ``""`` for unstyled text.  ``wrap`` is set when the
+    message is wrapped to the terminal's width, and ``layout`` is ``box`` or ``panel`` to draw a border around the
+    message, or ``None``.  ``when`` is a tuple of conditions that must all be true for the message to be displayed,
+    or ``None`` to always display it.
+
+    .. class:: SayOp(text, align, newline, style, wrap, layout, when)
+    .. versionadded:: 1.1.0
+    """
+
+    __slots__ = ()
+
+
+class SayFileOp(namedtuple('SayFileOp', 'path align newline style wrap when')):
+    """
+    A compiled, immutable file whose lines are displayed to the user.
+
+    ``style`` is the ANSI escape sequence styling each line, or ``""`` for unstyled text.  ``wrap`` is set when each
+    line is wrapped to the terminal's width.  ``when`` is a tuple of conditions, as for a ``SayOp``.
+
+    .. class:: SayFileOp(path, align, newline, style, wrap, when)
+    .. versionadded:: 1.1.0
+    """
+
+    __slots__ = ()
+
+
+def _answerPath(text):
+    """
+    Convert an answer to an existing path, expanding any home directory.
+
+    :raises ValueError: if the path does not exist
+
+    .. versionadded:: 1.1.0
+    .. function:: _answerPath(text)
+    """
+    path = os.path.expanduser(text)
+
+    if not os.path.exists(path):
+        raise ValueError("Path '%s' does not exist." % text)
+
+    return path
+
+
+def _answerIp(text):
+    """
+    Check that an answer is an IPv4 or IPv6 address.
+
+    :raises ValueError: if the answer is not an IP address
+
+    .. versionadded:: 1.1.0
+    .. function:: _answerIp(text)
+    """
+    import socket
+
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, text)
+            return text
+        except (socket.error, ValueError):
+            pass
+
+    raise ValueError("'%s' is not an IP address." % text)
+
+
+#: Conversions for each answer ``type``, raising ``ValueError`` for invalid answers.
+ANSWER_TYPES = {
+    'str': to_text,
+    'int': int,
+    'float': float,
+    'path': _answerPath,
+    'ip': _answerIp,
+}
+
+#: Compiled answer ``pattern`` expressions, shared by every question using the same pattern.
+PATTERNS = dict()
+
+
+class Validator(namedtuple('Validator', 'type pattern choices')):
+    """
+    A compiled, immutable check of the answers to a question, converting them to the question's ``type``.
+
+    ``pattern`` is a compiled expression that must match the whole answer and ``choices`` a frozenset of the allowed
+    answers; either is ``None`` when not used.
+
+    .. class:: Validator(type, pattern, choices)
+    .. versionadded:: 1.1.0
+    """
+
+    __slots__ = ()
+
+
+    @staticmethod
+    def compilePattern(pattern):
+        """
+        Return the compiled expression matching the whole of an answer, compiling each pattern only once.
+
+        :raises re.error: if the pattern is invalid
+
+        .. versionadded:: 1.1.0
+        .. function:: compilePattern(pattern)
+        """
+        compiled = PATTERNS.get(pattern)
+
+        if compiled is None:
+            compiled = PATTERNS[pattern] = re.compile(r"(?:%s)\Z" % pattern)
+
+        return compiled
+
+
+    def convert(self, text):
+        """
+        Check an answer and convert it to the question's type.
+
+        :raises ValueError: if the answer is invalid
+
+        .. versionadded:: 1.1.0
+        .. function:: convert(text)
+        """
+        if self.choices is not None and text not in self.choices:
+            raise ValueError("'%s' is not one of the choices." % text)
+
+        if self.pattern is not None and self.pattern.match(text) is None:
+            raise ValueError("'%s' does not match the pattern." % text)
+
+        return ANSWER_TYPES[self.type](text)
+
+
+    def accepts(self, text):
+        """
+        Return whether an answer is valid.
+
+        .. versionadded:: 1.1.0
+        .. function:: accepts(text)
+        """
+        try:
+            self.convert(text)
+        except ValueError:
+            return False
+
+        return True
+
+
+class Secret(namedtuple('Secret', 'verify encrypt salt')):
+    """
+    The compiled, immutable handling of a question whose answer is read without being displayed.
+
+    ``verify`` is set when the answer must be typed twice.  ``encrypt`` is the name of the algorithm to hash the
+    answer with, such as ``sha512_crypt``, or ``None`` to keep the answer as typed, and ``salt`` is the salt to hash
+    with, or ``None`` for a random salt.
+
+    .. class:: Secret(verify, encrypt, salt)
+    .. versionadded:: 1.1.0
+    """
+
+    __slots__ = ()
+
+
+class AskOp(namedtuple('AskOp', (
+    'var say postfix default trim confirm once timeout prompt validator frame when secret'
+))):
+    """
+    A compiled, immutable question to ask the user.
+
+    ``default`` is ``None`` when no default is available and ``confirm`` is ``None`` for non-confirmation questions.
+    ``once`` is set when the answer should be shared by every host running the task, and ``timeout`` is the number of
+    seconds to wait for an answer, or ``None`` to use the global timeout.  ``prompt`` is the fully rendered question,
+    including any default and postfix, so that it is built only once no matter how often it is asked.  ``validator``
+    is the question's ``Validator``, or ``None`` if any answer is accepted as text.  ``frame`` is the ``prompt`` as a
+    format string with ``{say}`` and ``{default}`` fields, used to rebuild it once templated text is rendered.
+    ``when`` is a tuple of conditions, as for a ``SayOp``.  ``secret`` is the question's ``Secret`` handling, or
+    ``None`` if the answer is displayed as it is typed.
+
+    .. class:: AskOp(var, say, postfix, default, trim, confirm, once, timeout, prompt, validator, frame, when, secret)
+    .. versionadded:: 1.1.0
+    """
+
+    __slots__ = ()
+
+
+class ForEachOp(namedtuple('ForEachOp', 'items var key op')):
+    """
+    A compiled, immutable message or question repeated for each element of a list.
+
+    ``items`` is a tuple of the elements, or a template rendering a list of them.  ``var`` is the name of the variable
+    holding the current element, and ``key`` is a template naming each element's answer, or ``None`` to use the
+    element itself.  ``op`` is the ``SayOp``, ``SayFileOp``, or ``AskOp`` repeated for each element.
+
+    .. class:: ForEachOp(items, var, key, op)
+    .. versionadded:: 1.1.0
+    """
+
+    __slots__ = ()
+
+
+class Response(namedtuple('Response', 'value source waited firstInput retries timedOut')):
+    """
+    The raw response to a question and how it was obtained.
+
+    ``source`` is one of ``user``, ``shared`` (answered for another host), ``answers`` (provided ahead of time),
+    ``default`` (not interactive), or ``timeout``.  ``waited`` is the number of seconds spent waiting on the user,
+    ``firstInput`` the seconds until the first line of input arrived (or ``None``), and ``retries`` the number of
+    responses rejected before a valid one was given.
+
+    .. class:: Response(value, source, waited, firstInput, retries, timedOut)
+    .. versionadded:: 1.1.0
+    """
+
+    __slots__ = ()
+
+
+class PromptPlan(namedtuple('PromptPlan', 'ops errors')):
+    """
+    A compiled message: the operations to perform and any errors found while validating it.
+
+    .. class:: PromptPlan(ops, errors)
+    .. versionadded:: 1.1.0
+    """
+
+    __slots__ = ()
+
+
+class PlanCache(object):
+    """
+    A process-wide, thread-safe LRU cache of compiled prompt plans.
+
+    Plans are keyed by a stable hash of the rendered ``msg`` argument, so identical specifications seen again by the
+    same process (e.g., through loops or repeated tasks) skip validation and parsing entirely.
+
+    .. class:: PlanCache([maxsize=128])
+    .. versionadded:: 1.1.0
+    """
+
+    def __init__(self, maxsize=128):
+        """
+        Initialize an empty plan cache.
+
+        :kwarg maxsize: the maximum number of plans to retain
+
+        .. versionadded:: 1.1.0
+        .. function:: __init__([maxsize=128])
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    @classmethod
+    def key(cls, msg):
+        """
+        Return a stable hash for a message specification.
+
+        :kwarg msg: the message provided to parse (string, object, or list)
+
+        :returns: a hex digest identifying the specification
+
+        .. versionadded:: 1.1.0
+        .. function:: key(msg)
+        """
+        import hashlib
+
+        return hashlib.sha1(repr(cls._canonical(msg)).encode('utf-8')).hexdigest()
+
+
+    @classmethod
+    def _canonical(cls, value):
+        """
+        Convert a value into a type-tagged, order-independent structure suitable for hashing.
+
+        .. versionadded:: 1.1.0
+        .. function:: _canonical(value)
+        """
+        if isinstance(value, dict):
+            return ('dict', sorted((repr(k), cls._canonical(v)) for k, v in value.items()))
+
+        if isinstance(value, (list, tuple)):
+            return (type(value).__name__, [cls._canonical(v) for v in value])
+
+        return (type(value).__name__, repr(value))
+
+
+    def get(self, key):
+        """
+        Return the plan stored for a key, or ``None``, updating the hit and miss counters.
+
+        .. versionadded:: 1.1.0
+        .. function:: get(key)
+        """
+        with self._lock:
+            plan = self._plans.get(key)
+
+            if plan is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._plans[key] = self._plans.pop(key)
+
+            return plan
+
+
+    def put(self, key, plan):
+        """
+        Store a plan, evicting the least recently used plan if the cache is full.
+
+        .. versionadded:: 1.1.0
+        .. function:: put(key, plan)
+        """
+        with self._lock:
+            self._plans.pop(key, None)
+            self._plans[key] = plan
+
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+
+
+    def clear(self):
+        """
+        Remove all plans and reset the hit and miss counters.
+
+        .. versionadded:: 1.1.0
+        .. function:: clear()
+        """
+        with self._lock:
+            self._plans.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        :returns: a dict with ``hits``, ``misses``, ``size``, and ``maxsize``
+
+        .. versionadded:: 1.1.0
+        .. function:: stats()
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._plans),
+                'maxsize': self.maxsize,
+            }
+
+
+PLAN_CACHE = PlanCache()
+
+
+class TerminalGeometry(object):
+    """
+    Provides the size of the controlling terminal, read once and cached until the terminal is resized.
+
+    The size is read with a ``TIOCGWINSZ`` ioctl on the output stream, standard output, or ``/dev/tty``, in that
+    order.  If no terminal is available, the ``LINES`` and ``COLUMNS`` environment variables are used, falling back to
+    the configured default.  Cached sizes are invalidated whenever the process receives ``SIGWINCH``.
+
+    .. class:: TerminalGeometry([stream=None, default=(24, 80)])
+    .. versionadded:: 1.1.0
+    """
+
+    # Incremented on SIGWINCH; instances re-read their size when it changes
+    _generation = 0
+    _handlerInstalled = False
+    _previousHandler = None
+
+
+    def __init__(self, stream=None, default=(24, 80)):
+        """
+        Initialize a terminal geometry provider.
+
+        :kwarg stream: the output stream whose terminal should be measured (defaults to standard output)
+        :kwarg default: the ``(rows, columns)`` to assume when no terminal size can be determined
+
+        .. versionadded:: 1.1.0
+        .. function:: __init__([stream=None, default=(24, 80)])
+        """
+        self.stream = stream
+        self.default = default
+
+        self._size = None
+        self._seen = None
+
+
+    @classmethod
+    def _resized(cls, signum, frame):
+        """
+        Invalidate all cached terminal sizes when the terminal is resized, chaining any previous handler.
+
+        .. versionadded:: 1.1.0
+        .. function:: _resized(signum, frame)
+        """
+        TerminalGeometry._generation += 1
+
+        if callable(cls._previousHandler):
+            cls._previousHandler(signum, frame)
+
+
+    @classmethod
+    def _installHandler(cls):
+        """
+        Install the ``SIGWINCH`` handler once per process, where signals can be handled.
+
+        .. versionadded:: 1.1.0
+        .. function:: _installHandler()
+        """
+        # Handlers can only be installed from the main thread, so other threads leave it to the main thread
+        if TerminalGeometry._handlerInstalled or threading.current_thread() is not threading.main_thread():
+            return
+
+        TerminalGeometry._handlerInstalled = True
+
+        import signal
+
+        if not hasattr(signal, 'SIGWINCH'):
+            return
+
+        try:
+            TerminalGeometry._previousHandler = signal.signal(signal.SIGWINCH, TerminalGeometry._resized)
+        except (ValueError, OSError):
+            pass
+
+
+    def invalidate(self):
+        """
+        Discard the cached size so it is read again on next use.
+
+        .. versionadded:: 1.1.0
+        .. function:: invalidate()
+        """
+        self._size = None
+
+
+    def size(self):
+        """
+        Return the size of the terminal.
+
+        :returns: a ``(rows, columns)`` tuple of integers
+
+        .. versionadded:: 1.1.0
+        .. function:: size()
+        """
+        self._installHandler()
+
+        if self._size is None or self._seen != TerminalGeometry._generation:
+            self._seen = TerminalGeometry._generation
+            self._size = self._query() or self._environment() or tuple(self.default)
+
+        return self._size
+
+
+    def columns(self):
+        """
+        Return the width of the terminal.
+
+        :returns: the number of columns
+
+        .. versionadded:: 1.1.0
+        .. function:: columns()
+        """
+        return self.size()[1]
+
+
+    def _query(self):
+        """
+        Read the terminal size from the first available terminal file descriptor.
+
+        :returns: a ``(rows, columns)`` tuple, or ``None`` if no terminal is available
+
+        .. versionadded:: 1.1.0
+        .. function:: _query()
+        """
+        try:
+            import fcntl
+            import struct
+            import termios
+        except ImportError:
+            return None
+
+        for stream in (self.stream, sys.__stdout__):
+            try:
+                size = self._ioctl(fcntl, struct, termios, stream.fileno())
+            except (AttributeError, IOError, OSError, ValueError):
+                continue
+
+            if size:
+                return size
+
+        try:
+            fd = os.open('/dev/tty', os.O_RDONLY)
+        except (IOError, OSError):
+            return None
+
+        try:
+            return self._ioctl(fcntl, struct, termios, fd)
+        except (IOError, OSError):
+            return None
+        finally:
+            os.close(fd)
+
+
+    @staticmethod
+    def _ioctl(fcntl, struct, termios, fd):
+        """
+        Return the terminal size for a file descriptor, or ``None`` if it reports no size.
+
+        .. versionadded:: 1.1.0
+        .. function:: _ioctl(fcntl, struct, termios, fd)
+        """
+        rows, columns = struct.unpack('hhhh', fcntl.ioctl(fd, termios.TIOCGWINSZ, b'\0' * 8))[:2]
+
+        if rows > 0 and columns > 0:
+            return (rows, columns)
+
+        return None
+
+
+    def _environment(self):
+        """
+        Read the terminal size from the ``LINES`` and ``COLUMNS`` environment variables.
+
+        :returns: a ``(rows, columns)`` tuple, or ``None`` if ``COLUMNS`` is not set to a positive integer
+
+        .. versionadded:: 1.1.0
+        .. function:: _environment()
+        """
+        try:
+            columns = int(os.environ['COLUMNS'])
+        except (KeyError, ValueError):
+            return None
+
+        if columns <= 0:
+            return None
+
+        try:
+            rows = int(os.environ.get('LINES', self.default[0]))
+        except ValueError:
+            rows = self.default[0]
+
+        return (rows, columns)
+
+
+TERMINAL = TerminalGeometry()
+
+
+class InputSession(object):
+    """
+    An input source that is opened lazily, at most once per process, and reused across questions and tasks.
+
+    Sessions for device or file paths are shared process-wide through ``InputSession.get`` and closed at interpreter
+    exit.  Sessions wrapping an already-open stream never close it.
+
+    .. class:: InputSession(source)
+    .. versionadded:: 1.1.0
+    """
+
+    _sessions = {}
+    _lock = threading.Lock()
+
+
+    def __init__(self, source):
+        """
+        Initialize an unopened input session.
+
+        :kwarg source: a path to open for reading, or an already-open input stream
+
+        .. versionadded:: 1.1.0
+        .. function:: __init__(source)
+        """
+        self.source = source
+
+        self._stream = None if isinstance(source, str) else source
+        self._pending = ""
+        self._decoder = None
+
+
+    @classmethod
+    def get(cls, source):
+        """
+        Return the shared session for a path, or a new session wrapping a stream.
+
+        :kwarg source: a path to open for reading, or an already-open input stream
+
+        :returns: an ``InputSession``
+
+        .. versionadded:: 1.1.0
+        .. function:: get(source)
+        """
+        if not isinstance(source, str):
+            return cls(source)
+
+        with cls._lock:
+            if source not in cls._sessions:
+                cls._sessions[source] = cls(source)
+
+            return cls._sessions[source]
+
+
+    @classmethod
+    def closeAll(cls):
+        """
+        Close and forget every shared session.
+
+        .. versionadded:: 1.1.0
+        .. function:: closeAll()
+        """
+        with cls._lock:
+            for session in cls._sessions.values():
+                session.close()
+
+            cls._sessions.clear()
+
+
+    def stream(self):
+        """
+        Return the input stream, opening it on first use.
+
+        :returns: a readable stream
+
+        .. versionadded:: 1.1.0
+        .. function:: stream()
+        """
+        if self._stream is None:
+            self._stream = open(self.source)
+
+        return self._stream
+
+
+    def readline(self, timeout=None):
+        """
+        Read a line of input, waiting at most the given number of seconds for it to become available.
+
+        Streams backed by a file descriptor are read directly and buffered by the session, so lines already received
+        are never hidden from ``select`` in the stream's own buffer.  Other streams, such as in-memory streams, are
+        always considered available.
+
+        :kwarg timeout: the number of seconds to wait, or ``None`` to wait indefinitely
+
+        :returns: the line read, including any line ending, ``""`` at the end of input, or ``None`` if the timeout
+                  expired
+
+        .. versionadded:: 1.1.0
+        .. function:: readline([timeout=None])
+        """
+        stream = self.stream()
+
+        try:
+            fd = stream.fileno()
+        except (AttributeError, IOError, OSError, ValueError):
+            return stream.readline()
+
+        import codecs
+        import select
+
+        if self._decoder is None:
+            self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+
+        deadline = None if timeout is None else time.time() + timeout
+
+        while "\n" not in self._pending:
+            if deadline is not None:
+                remaining = deadline - time.time()
+
+                if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                    return None
+
+            chunk = os.read(fd, 4096)
+
+            if not chunk:
+                line = self._pending + self._decoder.decode(b"", True)
+                self._pending = ""
+
+                return line
+
+            self._pending += self._decoder.decode(chunk)
+
+        line, self._pending = self._pending.split("\n", 1)
+
+        return line + "\n"
+
+
+    def ask(self, askstr, output, timeout=None, echo=True):
+        """
+        Display a prompt and read a line of input, waiting at most the given number of seconds for it.
+
+        :kwarg askstr: the prompt to display
+        :kwarg output: the output stream to display the prompt on
+        :kwarg timeout: the number of seconds to wait, or ``None`` to wait indefinitely
+        :kwarg echo: whether the terminal displays what is typed (defaults to True)
+
+        :returns: the line read, including any line ending, ``""`` at the end of input, or ``None`` if the timeout
+                  expired
+
+        .. versionadded:: 1.1.0
+        .. function:: ask(askstr, output[, timeout=None, echo=True])
+        """
+        output.write(askstr)
+        output.flush()
+
+        if timeout is not None and timeout <= 0:
+            return None
+
+        if echo:
+            return self.readline(timeout)
+
+        with self.noEcho():
+            return self.readline(timeout)
+
+
+    @contextmanager
+    def noEcho(self):
+        """
+        Stop the terminal from displaying what is typed, if the input is a terminal, restoring it afterwards.
+
+        The line ending is still displayed, and input typed ahead is kept.
+
+        :returns: a context yielding whether the terminal's echo was disabled
+
+        .. versionadded:: 1.1.0
+        .. function:: noEcho()
+        """
+        try:
+            fd = self.stream().fileno()
+        except (AttributeError, IOError, OSError, ValueError):
+            fd = None
+
+        if fd is None or not os.isatty(fd):
+            yield False
+            return
+
+        import termios
+
+        previous = termios.tcgetattr(fd)
+        attributes = termios.tcgetattr(fd)
+        attributes[3] = (attributes[3] & ~termios.ECHO) | termios.ECHONL
+
+        termios.tcsetattr(fd, termios.TCSADRAIN, attributes)
+
+        try:
+            yield True
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, previous)
+
+
+    def close(self):
+        """
+        Close the input stream if this session opened it.
+
+        .. versionadded:: 1.1.0
+        .. function:: close()
+        """
+        if self._stream is not None and isinstance(self.source, str):
+            self._stream.close()
+            self._stream = None
+
+
+atexit.register(InputSession.closeAll)
+
+
+def _detachedWorker():
+    """
+    Return whether this is a task worker that Ansible has detached from the controller's terminal.
+
+    From ansible-core 2.19, workers start a new session and replace their standard streams, so they can neither open
+    '/dev/tty' nor write to the controller's output.  They talk to the user through the controller instead.
+
+    .. versionadded:: 1.1.0
+    .. function:: _detachedWorker()
+    """
+    if getattr(display, '_final_q', None) is None:
+        return False
+
+    try:
+        return os.getsid(0) == os.getpid()
+    except OSError:
+        return False
+
+
+class DisplayInput(InputSession):
+    """
+    An input session that asks questions through the controller's display, as the ``pause`` module does.
+
+    .. class:: DisplayInput()
+    .. versionadded:: 1.1.0
+    """
+
+    def __init__(self):
+        """
+        Initialize an input session answered by the controller.
+
+        .. versionadded:: 1.1.0
+        .. function:: __init__()
+        """
+        super(DisplayInput, self).__init__(None)
+
+        self.interactive = True
+
+
+    def stream(self):
+        """
+        Return this session, which reads through the controller, unless the controller has no terminal to ask on.
+
+        :returns: this session
+
+        :raises IOError: if the controller has reported that its standard input is not interactive
+
+        .. versionadded:: 1.1.0
+        .. function:: stream()
+        """
+        if not self.interactive:
+            raise IOError("the controller's standard input is not interactive")
+
+        return self
+
+
+    def readline(self, timeout=None):
+        """
+        Read a line of input through the controller, waiting at most the given number of seconds for it.
+
+        :kwarg timeout: the number of seconds to wait, or ``None`` to wait indefinitely
+
+        :returns: the line read, including its line ending, or ``None`` if the timeout expired
+
+        .. versionadded:: 1.1.0
+        .. function:: readline([timeout=None])
+        """
+        return self.ask("", DisplayOutput(), timeout)
+
+
+    def ask(self, askstr, output, timeout=None, echo=True):
+        """
+        Have the controller display a prompt and read a line of input, waiting at most the given number of seconds.
+
+        Output still pending is displayed first, so messages are never shown after the question they lead to.
+
+        :kwarg askstr: the prompt to display
+        :kwarg output: the output stream holding any pending output
+        :kwarg timeout: the number of seconds to wait, or ``None`` to wait indefinitely
+        :kwarg echo: whether the controller displays what is typed (defaults to True)
+
+        :returns: the line read, including its line ending, or ``None`` if the timeout expired
+
+        :raises AnsibleError: if the controller cannot read input, such as when its standard input is not a terminal
+
+        .. versionadded:: 1.1.0
+        .. function:: ask(askstr, output[, timeout=None, echo=True])
+        """
+        output.flush()
+
+        if timeout is not None and timeout <= 0:
+            return None
+
+        from ansible.errors import AnsiblePromptNoninteractive
+
+        start = time.time()
+
+        try:
+            answer = display.prompt_until(askstr, private=not echo, seconds=timeout)
+        except AnsiblePromptNoninteractive:
+            self.interactive = False
+            raise
+
+        if timeout is not None and time.time() - start >= timeout:
+            return None
+
+        return to_text(answer) + "\n"
+
+
+    def close(self):
+        """
+        Do nothing, as the controller owns its input.
+
+        .. versionadded:: 1.1.0
+        .. function:: close()
+        """
+
+
+class DisplayOutput(object):
+    """
+    An output stream that writes through the controller's display, for workers that cannot write to its output.
+
+    .. class:: DisplayOutput()
+    .. versionadded:: 1.1.0
+    """
+
+    def write(self, text):
+        """
+        Display text on the controller, without adding a line ending.
+
+        .. versionadded:: 1.1.0
+        .. function:: write(text)
+        """
+        if text:
+            display.display(text, newline=False)
+
+
+    def flush(self):
+        """
+        Do nothing, as text is sent to the controller as soon as it is written.
+
+        .. versionadded:: 1.1.0
+        .. function:: flush()
+        """
+
+
+class OutputBuffer(object):
+    """
+    Accumulates message output and writes it to a stream in a single call.
+
+    With the ``ask`` policy, output is held until input is needed from the user or the prompt completes.  With the
+    ``item`` policy, output is written as soon as each message is rendered.  Either way, output is written once the
+    buffer exceeds its size limit, so memory use stays bounded for very large messages.
+
+    .. class:: OutputBuffer(stream[, policy='ask', limit=65536])
+    .. versionadded:: 1.1.0
+    """
+
+    POLICIES = ('ask', 'item')
+
+
+    def __init__(self, stream, policy='ask', limit=65536):
+        """
+        Initialize an empty output buffer.
+
+        :kwarg stream: the output stream to write to
+        :kwarg policy: when to write buffered output, either ``ask`` or ``item``
+        :kwarg limit: the number of buffered characters that causes output to be written
+
+        .. versionadded:: 1.1.0
+        .. function:: __init__(stream[, policy='ask', limit=65536])
+        """
+        if policy not in self.POLICIES:
+            raise ValueError("Invalid flush policy '%s'. Expected 'ask' or 'item'." % policy)
+
+        self.stream = stream
+        self.policy = policy
+        self.limit = limit
+
+        self._chunks = []
+        self._size = 0
+
+
+    def write(self, text):
+        """
+        Add text to the buffer, writing it immediately if required by the flush policy.
+
+        .. versionadded:: 1.1.0
+        .. function:: write(text)
+        """
+        self._chunks.append(text)
+        self._size += len(text)
+
+        if self.policy == 'item' or self._size >= self.limit:
+            self.flush()
+
+
+    def flush(self):
+        """
+        Write all buffered output to the stream in one call.
+
+        .. versionadded:: 1.1.0
+        .. function:: flush()
+        """
+        if not self._chunks:
+            return
+
+        output = "".join(self._chunks)
+        self._chunks = []
+        self._size = 0
+
+        self.stream.write(output)
+
+        if hasattr(self.stream, 'flush'):
+            self.stream.flush()
+
+
+class AnswerFile(object):
+    """
+    Loads and caches answers from YAML or JSON answer files.
+
+    Files are parsed at most once per process, unless they change on disk.
+
+    .. class:: AnswerFile
+    .. versionadded:: 1.1.0
+    """
+
+    _files = {}
+    _lock = threading.Lock()
+
+
+    @classmethod
+    def load(cls, path):
+        """
+        Return the answers in a file, keyed by variable name.
+
+        :kwarg path: the path to a YAML or JSON file containing a single mapping
+
+        :returns: a dict of answers
+
+        :raises PromptError: if the file cannot be read or does not contain a mapping
+
+        .. versionadded:: 1.1.0
+        .. function:: load(path)
+        """
+        try:
+            mtime = os.stat(path).st_mtime
+        except (IOError, OSError) as e:
+            raise PromptError("Unable to read answer file '%s': %s", path, e)
+
+        with cls._lock:
+            cached = cls._files.get(path)
+
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+        # YAML is a superset of JSON, so one parser handles both formats
+        import yaml
+
+        try:
+            with open(path) as f:
+                answers = yaml.safe_load(f)
+        except (IOError, OSError, yaml.YAMLError) as e:
+            raise PromptError("Unable to read answer file '%s': %s", path, e)
+
+        if answers is None:
+            answers = {}
+
+        if not isinstance(answers, dict):
+            raise PromptError("Answer file '%s' must contain a mapping of variable names to answers.", path)
+
+        with cls._lock:
+            cls._files[path] = (mtime, answers)
+
+        return answers
+
+
+def _privateDirectory():
+    """
+    Return a temporary directory private to the current user, creating it if needed.
+
+    :returns: the directory path
+
+    :raises OSError: if the directory cannot be created or is owned by another user
+
+    .. versionadded:: 1.1.0
+    .. function:: _privateDirectory()
+    """
+    import tempfile
+
+    directory = os.path.join(tempfile.gettempdir(), 'ansible-prompt-%d' % os.getuid())
+
+    # Worker processes race to create the directory, so an existing one is not an error
+    os.makedirs(directory, 0o700, exist_ok=True)
+
+    # Never share state through a directory another user controls
+    if os.stat(directory).st_uid != os.getuid():
+        raise OSError("Directory '%s' is not owned by the current user" % directory)
+
+    return directory
+
+
+def _removeFinishedRuns(directory):
+    """
+    Remove the answer stores and lock files left in a private directory by playbook runs that have ended.
+
+    Files are named after the process ID of their run, so those whose process no longer exists are removed.  This
+    keeps stored answers from outliving the run that asked for them.
+
+    :kwarg directory: the private directory to clean
+
+    .. versionadded:: 1.1.0
+    .. function:: _removeFinishedRuns(directory)
+    """
+    for name in os.listdir(directory):
+        run = name.split('.', 1)[0]
+
+        if not run.isdigit() or int(run) == os.getppid():
+            continue
+
+        try:
+            os.kill(int(run), 0)
+            continue
+        except ProcessLookupError:
+            pass
+        except OSError:
+            # The process exists, but belongs to another user
+            continue
+
+        # Another worker may be removing the same files
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+class TerminalLock(object):
+    """
+    An exclusive lock on the terminal, shared by every worker process of a playbook run.
+
+    Ansible forks a worker per host, so concurrent questions would otherwise interleave their prompts and read each
+    other's answers.  The lock is an ``flock`` on a file in the user's private temporary directory.
+
+    .. class:: TerminalLock(path)
+    .. versionadded:: 1.1.0
+    """
+
+    _runLocks = {}
+
+
+    def __init__(self, path):
+        """
+        Initialize a lock backed by the given file, which is created on first use.
+
+        :kwarg path: the path of the lock file
+
+        .. versionadded:: 1.1.0
+        .. function:: __init__(path)
+        """
+        self.path = path
+
+
+    @classmethod
+    def forRun(cls):
+        """
+        Return the terminal lock for the current playbook run, or ``None`` if no private lock file can be created.
+
+        :returns: a ``TerminalLock`` or ``None``
+
+        .. versionadded:: 1.1.0
+        .. function:: forRun()
+        """
+        run = os.getppid()
+
+        if run not in cls._runLocks:
+            try:
+                directory = _privateDirectory()
+                _removeFinishedRuns(directory)
+                cls._runLocks[run] = cls(os.path.join(directory, '%d.tty.lock' % run))
+            except (IOError, OSError) as e:
+                display.vvv("prompt terminal access will not be serialized between hosts: %s" % e)
+                cls._runLocks[run] = None
+
+        return cls._runLocks[run]
+
+
+    @contextmanager
+    def hold(self):
+        """
+        Hold the terminal exclusively, waiting for any other process using it.
+
+        .. versionadded:: 1.1.0
+        .. function:: hold()
+        """
+        import fcntl
+
+        with open(self.path, 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+            try:
+                yield self
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class AnswerStore(object):
+    """
+    A file-backed store of answers shared by every worker process of a playbook run.
+
+    Ansible runs each host's task in a separate worker process, so answers are kept in a JSON file guarded by an
+    exclusive ``flock``.  Holding the lock while asking ensures other hosts wait for, then reuse, the first answer.
+
+    .. class:: AnswerStore(path)
+    .. versionadded:: 1.1.0
+    """
+
+    _runStores = {}
+
+
+    def __init__(self, path):
+        """
+        Initialize a store backed by the given file, which is created on first write.
+
+        :kwarg path: the path of the JSON file holding answers; ``<path>.lock`` is used for locking
+
+        .. versionadded:: 1.1.0
+        .. function:: __init__(path)
+        """
+        self.path = path
+
+
+    @classmethod
+    def forRun(cls):
+        """
+        Return the store for the current playbook run, or ``None`` if no private store can be created.
+
+        Worker processes share their parent, the controlling ``ansible-playbook`` process, so the run is identified by
+        the parent process ID.  Stores left by runs that have ended are removed first.
+
+        :returns: an ``AnswerStore`` or ``None``
+
+        .. versionadded:: 1.1.0
+        .. function:: forRun()
+        """
+        run = os.getppid()
+
+        if run not in cls._runStores:
+            try:
+                directory = _privateDirectory()
+                _removeFinishedRuns(directory)
+                cls._runStores[run] = cls(os.path.join(directory, '%d.json' % run))
+            except (IOError, OSError) as e:
+                display.vvv("prompt answers will not be shared between hosts: %s" % e)
+                cls._runStores[run] = None
+
+        return cls._runStores[run]
+
+
+    @staticmethod
+    def key(*parts):
+        """
+        Return the key identifying a question.
+
+        :kwarg parts: the values identifying the question, such as the task, variable, and prompt
+
+        :returns: a hex digest
+
+        .. versionadded:: 1.1.0
+        .. function:: key(*parts)
+        """
+        import hashlib
+
+        return hashlib.sha1(repr(tuple(to_text(p) for p in parts)).encode('utf-8')).hexdigest()
+
+
+    @contextmanager
+    def lock(self):
+        """
+        Hold an exclusive lock on the store across processes.
+
+        .. versionadded:: 1.1.0
+        .. function:: lock()
+        """
+        import fcntl
+
+        with open(self.path + '.lock', 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+            try:
+                yield self
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+    def get(self, key):
+        """
+        Return the stored answer for a key, or ``None``.
+
+        .. versionadded:: 1.1.0
+        .. function:: get(key)
+        """
+        return self._read().get(key)
+
+
+    def set(self, key, value):
+        """
+        Store an answer, replacing the file atomically.
+
+        .. versionadded:: 1.1.0
+        .. function:: set(key, value)
+        """
+        import json
+        import tempfile
+
+        answers = self._read()
+        answers[key] = value
+
+        fd, path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=os.path.basename(self.path) + '.')
+
+        with os.fdopen(fd, 'w') as f:
+            json.dump(answers, f)
+
+        os.rename(path, self.path)
+
+
+    def _read(self):
+        """
+        Return all stored answers.
+
+        .. versionadded:: 1.1.0
+        .. function:: _read()
+        """
+        import json
+
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+
+class ActionModule(ActionBase):
+    """
+    Prompts user with one-or-more messages and optionally waits for input for each.
+
+    .. class:: ActionModule
+    .. versionadded:: 0.1.0
+
+    .. versionchanged:: 0.2.0
+       Added user input prompting functionality.
+
+    .. versionchanged:: 0.3.0
+       Added newline, alignment, and formatting functionality.
+
+    .. versionchanged:: 1.0.0
+       Added field postfix, confirm, choices, and defaults.
+    """
+
+    TRANSFERS_FILES = False
+    ANSWERS_FILE_ENV = 'ANSIBLE_PROMPT_ANSWERS'
+    ANSWER_ENV_PREFIX = 'ANSIBLE_PROMPT_ANSWER_'
+    FORMATS = ('text', 'json')
+    VALID_PARAMS = [
+        'say', 'newline', 'align',
+        'ask', 'postfix', 'default', 'trim', 'confirm', 'once',
+        'say_file', 'timeout', 'type', 'pattern', 'choices',
+        'color', 'bold', 'style', 'wrap', 'box', 'panel', 'when',
+        'foreach', 'loop_var', 'key', 'secret', 'verify', 'encrypt', 'salt'
+    ]
+    TASK_PARAMS = ('msg', 'form', 'format')
+
+
+    def __init__(self, task, connection, play_context, loader, templar, shared_loader_obj):
+        """
+        Initialize the prompt Ansible plugin.
+
+        .. versionadded:: 0.1.0
+
+        .. versionchanged:: 0.2.0
+           Precompiled regular expressions for input variable validation.  Added input setting.
+
+        .. versionchanged:: 1.1.0
+           Added terminal geometry, output flush policy, answer, answer store, terminal lock, interactivity, timeout,
+           statistics, and output format settings.
+
+        .. function:: __init__(task, connection, play_context, loader, templar, shared_loader_obj)
+        """
+        super(ActionModule, self).__init__(task, connection, play_context, loader, templar, shared_loader_obj)
+
+        self.setOutput()
+        self.setInput()
+        self.setTerminal(TERMINAL)
+        self.setAnswers()
+        self.setAnswerStore()
+        self.setTerminalLock()
+        self.setInteractive(boolean(os.environ.get('ANSIBLE_PROMPT_INTERACTIVE', True), strict=False))
+        self.setStats(boolean(os.environ.get('ANSIBLE_PROMPT_STATS', False), strict=False))
+
+        # Invalid settings fail the task when it runs, rather than raising while Ansible loads the plugin
+        self._environmentErrors = []
+        self._fromEnvironment(self.setFlushPolicy, 'ANSIBLE_PROMPT_FLUSH')
+        self._fromEnvironment(self.setTimeout, 'ANSIBLE_PROMPT_TIMEOUT')
+        self._fromEnvironment(self.setFormat, 'ANSIBLE_PROMPT_FORMAT')
+
+        self._host = None
+        self._taskVars = None
+
+        # Pre-compile our regex for checking valid variables
+        self.rValidVariable = re.compile(r"^[A-Za-z0-9_]+$")
+
+
+    def _fromEnvironment(self, setter, name):
+        """
+        Apply a setting from an environment variable, keeping the default and recording the error if it is invalid.
+
+        :kwarg setter: the method applying the setting
+        :kwarg name: the name of the environment variable
+
+        .. versionadded:: 1.1.0
+        .. function:: _fromEnvironment(setter, name)
+        """
+        try:
+            setter(os.environ.get(name))
+        except ValueError as e:
+            setter()
+            self._environmentErrors.append("Environment variable %s invalid.  %s" % (name, e))
+
+
+    @classmethod
+    def finalize_task_arg(cls, name, value, templar, context):
+        """
+        Template a task parameter, leaving the text of message items to be templated just before each is shown.
+
+        Deferring the text allows an item to use the answers to questions asked earlier in the same task.  Called by
+        ansible-core 2.19 and later; earlier versions template every parameter before the plugin runs.
+
+        :kwarg name: the name of the task parameter
+        :kwarg value: the parameter's value
+        :kwarg templar: the template engine to use
+        :kwarg context: unused
+
+        :returns: the templated value
+
+        .. versionadded:: 1.1.0
+        .. function:: finalize_task_arg(name, value, templar, context)
+        """
+        # A single string cannot ask anything, so it can be templated as a whole
+        if name != 'msg' or isinstance(value, str):
+            return super(ActionModule, cls).finalize_task_arg(name, value, templar, context)
+
+        items = value if isinstance(value, list) else [value]
+        finalized = []
+
+        for item in items:
+            if isinstance(item, dict):
+                item = dict(
+                    (k, v if k in DEFERRED_OPTIONS else templar.template(v)) for k, v in item.items()
+                )
+
+            finalized.append(item)
+
+        return finalized if isinstance(value, list) else finalized[0]
+
+
+    def run(self, tmp=None, task_vars=None):
+        """
+        Perform the plugin task, prompting the user one or more times.
+
+        :kwarg tmp: the temporary directory to use if creating files
+        :kwarg task_vars: any variables associated with the task
+
+        :returns: a dictionary of results from the module
+
+        .. versionadded:: 0.1.0
+
+        .. versionchanged:: 1.1.0
+           Added the optional ``form`` and ``format`` parameters.
+
+        .. function:: run([tmp=None, task_vars=None])
+        """
+        task_vars = task_vars or dict()
+
+        result = super(ActionModule, self).run(tmp, task_vars)
+        args = self._task.args
+
+        self._host = task_vars.get('inventory_hostname')
+        self._taskVars = task_vars
+
+        if self._environmentErrors:
+            return self._fail(result, "%s", self._environmentErrors[0])
+
+        # Expect only the messages parameter, optionally asked as a form or output in another format
+        if 'msg' not in args:
+            return self._fail(result, "Required 'msg' parameter missing.")
+
+        unexpected = sorted(to_text(arg) for arg in args if arg not in self.TASK_PARAMS)
+
+        if unexpected:
+            return self._fail(
+                result, "Unexpected parameter %s.  Expected 'msg', with optional 'form' and 'format'.",
+                ", ".join("'%s'" % arg for arg in unexpected)
+            )
+
+        fmt = args.get('format')
+
+        if fmt is not None and fmt not in self.FORMATS:
+            return self._fail(result, "Format '%s' invalid.  Expected 'text' or 'json'.", fmt)
+
+        return self._prompt(result, args['msg'], boolean(args.get('form', False), strict=False), fmt)
+
+
+    def setOutput(self, outstr=None):
+        """
+        Set the output stream to write messages and questions to.
+
+        :kwarg outstr: an output stream to write to (defaults to sys.stdout, or the controller's display in detached
+                       task workers)
+
+        .. versionadded:: 0.1.0
+
+        .. versionchanged:: 1.1.0
+           Questions are written to the output stream rather than to ``sys.stdout``.  Detached task workers write
+           through the controller's display.
+
+        .. function:: setOutput([outstr=None])
+        """
+        self._outstr = outstr or (DisplayOutput() if _detachedWorker() else sys.stdout)
+
+
+    def setInput(self, instr=None):
+        """
+        Set the input stream to read from.
+
+        :kwarg instr: an input stream, path, or ``InputSession`` to read from (defaults to '/dev/tty', or the
+                      controller's display in detached task workers)
+
+        .. versionadded:: 0.2.0
+
+        .. versionchanged:: 1.1.0
+           Paths are opened once per process and shared through an ``InputSession``.  Detached task workers ask
+           through the controller's display.
+
+        .. function:: setInput([instr=None])
+        """
+        self._instr = instr or (DisplayInput() if _detachedWorker() else '/dev/tty')
+        self._input = self._instr if isinstance(self._instr, InputSession) else InputSession.get(self._instr)
+
+
+    def setTerminal(self, terminal=None):
+        """
+        Set the terminal geometry provider used for aligning messages.
+
+        :kwarg terminal: a ``TerminalGeometry`` to measure with (defaults to the shared, process-wide provider)
+
+        .. versionadded:: 1.1.0
+        .. function:: setTerminal([terminal=None])
+        """
+        self._terminal = terminal or TERMINAL
+
+
+    def setFlushPolicy(self, policy=None):
+        """
+        Set when message output is written to the output stream.
+
+        :kwarg policy: ``ask`` to buffer output until input is needed or the prompt completes, or ``item`` to write
+                       each message as it is rendered (defaults to ``ask``)
+
+        :raises ValueError: if the policy is not recognized
+
+        .. versionadded:: 1.1.0
+        .. function:: setFlushPolicy([policy=None])
+        """
+        policy = policy or 'ask'
+
+        if policy not in OutputBuffer.POLICIES:
+            raise ValueError("Invalid flush policy '%s'. Expected 'ask' or 'item'." % policy)
+
+        self._flushPolicy = policy
+
+
+    def setAnswers(self, answers=None):
+        """
+        Set the answers to use for questions instead of asking the user.
+
+        Answers are keyed by the question's ``ask`` variable name.  When not provided, answers are read from the file
+        named by the ``ANSIBLE_PROMPT_ANSWERS`` environment variable, if any, and from
+        ``ANSIBLE_PROMPT_ANSWER_<name>`` environment variables, which take precedence.
+
+        :kwarg answers: a dict of answers, or the path to a YAML or JSON answer file (defaults to the environment)
+
+        .. versionadded:: 1.1.0
+        .. function:: setAnswers([answers=None])
+        """
+        self._answerSource = answers
+        self._answersResolved = None
+
+
+    def setAnswerStore(self, store=None):
+        """
+        Set where answers to questions are shared between the hosts of a playbook run.
+
+        :kwarg store: an ``AnswerStore`` (defaults to the store for the current run)
+
+        .. versionadded:: 1.1.0
+        .. function:: setAnswerStore([store=None])
+        """
+        self._answerStore = store
+
+
+    def setTerminalLock(self, lock=None):
+        """
+        Set the lock serializing questions between the hosts of a playbook run.
+
+        :kwarg lock: a ``TerminalLock`` (defaults to the lock for the current run)
+
+        .. versionadded:: 1.1.0
+        .. function:: setTerminalLock([lock=None])
+        """
+        self._terminalLock = lock
+
+
+    def setInteractive(self, interactive=True):
+        """
+        Set whether the user may be asked for input.
+
+        When not interactive, questions without a provided answer use their default, or fail if they have none.
+
+        :kwarg interactive: whether to read from the input stream (defaults to True)
+
+        .. versionadded:: 1.1.0
+        .. function:: setInteractive([interactive=True])
+        """
+        self._interactive = interactive
+
+
+    def setTimeout(self, timeout=None):
+        """
+        Set the number of seconds to wait for an answer to questions that do not set their own ``timeout``.
+
+        When the timeout expires, the question's default is used, or the prompt fails if it has none.
+
+        :kwarg timeout: a positive number of seconds, or ``None`` to wait indefinitely
+
+        :raises ValueError: if the timeout is not a positive number
+
+        .. versionadded:: 1.1.0
+        .. function:: setTimeout([timeout=None])
+        """
+        if timeout is not None and timeout != "":
+            try:
+                seconds = float(timeout)
+            except (TypeError, ValueError):
+                seconds = 0
+
+            if seconds <= 0:
+                raise ValueError("Invalid timeout '%s'. Expected a positive number of seconds." % timeout)
+
+            timeout = seconds
+        else:
+            timeout = None
+
+        self._timeout = timeout
+
+
+    def setStats(self, stats=False):
+        """
+        Set whether to report per-message timings in the ``prompt_stats`` key of the task result.
+
+        :kwarg stats: whether to record timings (defaults to False)
+
+        .. versionadded:: 1.1.0
+        .. function:: setStats([stats=False])
+        """
+        self._stats = stats
+
+
+    def setFormat(self, fmt=None):
+        """
+        Set the format messages are written in.
+
+        :kwarg fmt: ``text`` to render messages for the terminal, or ``json`` to write each message as a single line
+                    of JSON with its text, alignment, and host (defaults to ``text``)
+
+        :raises ValueError: if the format is not recognized
+
+        .. versionadded:: 1.1.0
+        .. function:: setFormat([fmt=None])
+        """
+        fmt = fmt or 'text'
+
+        if fmt not in self.FORMATS:
+            raise ValueError("Invalid format '%s'. Expected 'text' or 'json'." % fmt)
+
+        self._format = fmt
+
+
+    @property
+    def _answers(self):
+        """
+        The provided answers as text, keyed by variable name, resolved once per plugin instance.
+
+        .. versionadded:: 1.1.0
+        """
+        if self._answersResolved is None:
+            source = self._answerSource
+            answers = {}
+
+            if source is None:
+                path = os.environ.get(self.ANSWERS_FILE_ENV)
+
+                if path:
+                    answers.update(AnswerFile.load(path))
+
+                prefix = len(self.ANSWER_ENV_PREFIX)
+
+                for name, value in os.environ.items():
+                    if name.startswith(self.ANSWER_ENV_PREFIX):
+                        answers[name[prefix:]] = value
+
+            elif isinstance(source, dict):
+                answers.update(source)
+
+            else:
+                answers.update(AnswerFile.load(source))
+
+            self._answersResolved = dict((to_text(k), self._answerText(v)) for k, v in answers.items())
+
+        return self._answersResolved
+
+
+    @staticmethod
+    def _answerText(value):
+        """
+        Convert a provided answer to the text the user would have typed.
+
+        .. versionadded:: 1.1.0
+        .. function:: _answerText(value)
+        """
+        if value is None:
+            return ""
+
+        if isinstance(value, bool):
+            return "y" if value else "n"
+
+        return to_text(value)
+
+
+    def _prompt(self, result, msg, form=False, fmt=None):
+        """
+        Prompts the user with a message and optionally asks for a response.
+
+        :kwarg result: the base result dict to build on
+        :kwarg msg: the message provided to parse (string, object, or list)
+        :kwarg form: whether to ask consecutive questions together as a single form (defaults to False)
+        :kwarg fmt: the format to write messages in (defaults to the configured format)
+
+        :returns: an updated dict response with success or failure
+
+        .. versionadded:: 0.1.0
+
+        .. versionchanged:: 0.2.0
+           Added user input prompting functionality.
+
+        .. versionchanged:: 0.3.0
+           Added newline, alignment, and formatting functionality.
+
+        .. versionchanged:: 1.0.0
+           Added postfix, confirm, choices, and defaults.
+
+        .. versionchanged:: 1.1.0
+           Messages are compiled into a cached plan and fully validated before any output is produced.  Output is
+           buffered according to the flush policy.  Added form mode and output formats.
+
+        .. function:: _prompt(result, msg[, form=False, fmt=None])
+        """
+        output = OutputBuffer(self._outstr, self._flushPolicy)
+
+        try:
+            return self._run(result, self._compile(msg), output, form, fmt or self._format)
+        finally:
+            output.flush()
+
+
+    def _run(self, result, plan, output, form=False, fmt='text'):
+        """
+        Execute a compiled prompt plan.
+
+        :kwarg result: the base result dict to build on
+        :kwarg plan: the ``PromptPlan`` to execute
+        :kwarg output: the ``OutputBuffer`` to write messages to
+        :kwarg form: whether to ask consecutive questions together as a single form (defaults to False)
+        :kwarg fmt: the format to write messages in (defaults to ``text``)
+
+        :returns: an updated dict response with success or failure
+
+        .. versionadded:: 1.1.0
+        .. function:: _run(result, plan, output[, form=False, fmt='text'])
+        """
+        # Refuse to start if any item is invalid, reporting all of them at once
+        if plan.errors:
+            return self._fail(
+                result,
+                "\n".join(e.template for e in plan.errors),
+                *[param for e in plan.errors for param in e.params]
+            )
+
+        stats = [] if self._stats else None
+        answered = dict()
+        answers = dict()
+        skipped = set()
+
+        # Later items are templated with the answers to earlier questions
+        variables = ChainMap(answers, self._taskVars or {})
+
+        try:
+            for index, op in enumerate(plan.ops):
+                # Loops are expanded one element at a time, each shown as an item of its own
+                if isinstance(op, ForEachOp):
+                    self._runForEach(result, index, op, output, fmt, answers, variables, stats)
+                    continue
+
+                start = time.time() if stats is not None else None
+                response = None
+
+                # In form mode, the first of a run of questions asks all of those that apply
+                if form and self._inForm(op) and index not in answered and index not in skipped:
+                    end = index
+                    fields = []
+
+                    while end < len(plan.ops) and self._inForm(plan.ops[end]):
+                        if self._applies(plan.ops[end], variables):
+                            fields.append(end)
+                        else:
+                            skipped.add(end)
+
+                        end += 1
+
+                    if fields:
+                        answered.update(zip(fields, self._askForm(
+                            [self._renderOp(plan.ops[i], variables) for i in fields], output
+                        )))
+
+                elif index not in answered and index not in skipped:
+                    if self._applies(op, variables):
+                        op = self._renderOp(op, variables)
+                    else:
+                        skipped.add(index)
+
+                # Items whose conditions are false are left out entirely
+                if index in skipped:
+                    continue
+
+                # If this is a prompt, ask it as such
+                if isinstance(op, AskOp):
+                    response = answered.pop(index) if index in answered else self._ask(op, output)
+                    var = self._factFor(result, op, response)
+
+                    result['ansible_facts'][op.var] = var
+                    # Answers are the user's input, so they are never templated themselves
+                    answers[op.var] = wrap_var(var)
+
+                else:
+                    self._show(op, output, fmt)
+
+                if stats is not None:
+                    stats.append(self._itemStats(index, op, time.time() - start, response))
+
+        except PromptError as e:
+            return self._fail(result, e.template, *e.params)
+
+        finally:
+            if stats is not None:
+                result['prompt_stats'] = {
+                    'items': stats,
+                    'render': round(sum(i['render'] for i in stats), 6),
+                    'wait': round(sum(i.get('wait', 0) for i in stats), 6),
+                }
+
+        return result
+
+
+    @staticmethod
+    def _inForm(op):
+        """
+        Return whether a plan operation can be asked as part of a form.
+
+        Secrets are read without being displayed, so they are always asked on their own.
+
+        .. versionadded:: 1.1.0
+        .. function:: _inForm(op)
+        """
+        return isinstance(op, AskOp) and op.secret is None
+
+
+    def _runForEach(self, result, index, op, output, fmt, answers, variables, stats):
+        """
+        Show a message or ask a question for each element of a loop, collecting the answers into a single dict fact.
+
+        :kwarg result: the result dict to add facts to
+        :kwarg index: the position of the loop in the message list
+        :kwarg op: the ``ForEachOp`` to run
+        :kwarg output: the ``OutputBuffer`` to write messages to
+        :kwarg fmt: the format to write messages in
+        :kwarg answers: the answers given so far, to add the loop's answers to
+        :kwarg variables: the variables available to templates
+        :kwarg stats: the list to add item statistics to, or ``None``
+
+        :raises PromptError: if the loop cannot be expanded, or a question cannot be answered
+
+        .. versionadded:: 1.1.0
+        .. function:: _runForEach(result, index, op, output, fmt, answers, variables, stats)
+        """
+        if isinstance(op.op, AskOp):
+            facts = result.setdefault('ansible_facts', dict()).get(op.op.var)
+
+            # Like any question asked again, the loop replaces the answer of an earlier question of the same name
+            if not isinstance(facts, dict):
+                facts = result['ansible_facts'][op.op.var] = dict()
+
+            collected = answers[op.op.var] = dict()
+
+        start = time.time() if stats is not None else None
+
+        for key, item in self._expand(op, variables):
+            response = None
+
+            if isinstance(item, AskOp):
+                response = self._ask(item, output, (key,))
+                facts[key] = self._factFor(result, item, response, "%s[%s]" % (item.var, key))
+                collected[key] = wrap_var(facts[key])
+
+            else:
+                self._show(item, output, fmt)
+
+            if stats is not None:
+                now = time.time()
+                stats.append(dict(self._itemStats(index, item, now - start, response), key=key))
+                start = now
+
+
+    def _expand(self, op, variables):
+        """
+        Generate the items of a loop one element at a time, skipping those whose conditions are false.
+
+        :kwarg op: the ``ForEachOp`` to expand
+        :kwarg variables: the variables available to templates
+
+        :returns: a generator of tuples of each element's key and its rendered operation
+
+        :raises PromptError: if the loop's elements are not a list, an element cannot be rendered, or a repeated
+                             question's element has no text to key its answer by
+
+        .. versionadded:: 1.1.0
+        .. function:: _expand(op, variables)
+        """
+        items = self._renderValue(op.items, variables)
+
+        if not isinstance(items, (list, tuple)):
+            raise PromptError("Option 'foreach' must be a list.  Received '%s'.", items)
+
+        for element in items:
+            scope = variables.new_child({op.var: element})
+
+            if not self._applies(op.op, scope):
+                continue
+
+            key = element if op.key is None else self._renderValue(op.key, scope)
+
+            # Answers are keyed by text, and a mapping or list has no meaningful text to key them by
+            if isinstance(op.op, AskOp) and isinstance(key, (Mapping, list, tuple, set, frozenset)):
+                if op.key is None:
+                    raise PromptError(
+                        "Option 'key' is required to repeat '%s' over elements that are not strings or numbers.",
+                        op.op.var
+                    )
+
+                raise PromptError("Option 'key' must render a string or number.  Received '%s'.", key)
+
+            yield to_text(key), self._renderOp(op.op, scope)
+
+
+    def _factFor(self, result, op, response, name=None):
+        """
+        Convert the response to a question into the value of its fact, reporting any wait on the result.
+
+        :kwarg result: the result dict to report on
+        :kwarg op: the ``AskOp`` answered
+        :kwarg response: the question's ``Response``
+        :kwarg name: the name to report the wait under (defaults to the question's variable)
+
+        :returns: the value of the fact
+
+        .. versionadded:: 1.1.0
+        .. function:: _factFor(result, op, response[, name=None])
+        """
+        name = name or op.var
+        var = response.value
+
+        if 'ansible_facts' not in result:
+            result['ansible_facts'] = dict()
+
+        # Keep secrets out of the displayed task result
+        if op.secret is not None:
+            result['_ansible_no_log'] = True
+
+        # Report how long the user took on questions that may time out
+        if self._timeoutFor(op) is not None:
+            result.setdefault('prompt_wait', dict())[name] = round(response.waited, 3)
+
+            if response.timedOut:
+                result.setdefault('prompt_timed_out', []).append(name)
+
+        # Hashed secrets are complete once hashed
+        if op.secret is not None and op.secret.encrypt is not None:
+            return var
+
+        # Trim whitespace if set
+        if op.trim:
+            var = var.strip()
+
+        if op.confirm is not None:
+            return var.lower() == "y"
+
+        if op.validator is not None:
+            return op.validator.convert(var)
+
+        return var
+
+
+    def _show(self, op, output, fmt):
+        """
+        Display a message or file in the given format.
+
+        :kwarg op: the ``SayOp`` or ``SayFileOp`` to display
+        :kwarg output: the ``OutputBuffer`` to write to
+        :kwarg fmt: the format to write the message in
+
+        .. versionadded:: 1.1.0
+        .. function:: _show(op, output, fmt)
+        """
+        # If it's a file, print each of its lines
+        if isinstance(op, SayFileOp):
+            self._sayFile(op, output, fmt)
+
+        # If it's just a message, print it
+        elif fmt == 'json':
+            output.write(self._renderJson(op.text, op))
+
+        else:
+            self._say(op, output)
+
+
+    @contextmanager
+    def _templateVariables(self, variables):
+        """
+        Make variables available to the template engine, restoring its previous variables afterwards.
+
+        .. versionadded:: 1.1.0
+        .. function:: _templateVariables(variables)
+        """
+        previous = self._templar.available_variables
+
+        try:
+            self._templar.available_variables = variables
+            yield
+
+        finally:
+            self._templar.available_variables = previous
+
+
+    def _applies(self, op, variables):
+        """
+        Return whether every condition of a plan operation is true, so that it should be shown.
+
+        :kwarg op: the ``SayOp``, ``SayFileOp``, or ``AskOp`` to check
+        :kwarg variables: the variables available to conditions, including the answers given so far
+
+        :returns: whether the operation should be shown
+
+        :raises PromptError: if a condition cannot be evaluated
+
+        .. versionadded:: 1.1.0
+        .. function:: _applies(op, variables)
+        """
+        if op.when is None:
+            return True
+
+        # Literal conditions need no template engine, nor the loader older releases require to evaluate them
+        if all(isinstance(condition, bool) for condition in op.when):
+            return all(op.when)
+
+        if self._templar is None:
+            condition = next(c for c in op.when if not isinstance(c, bool))
+            raise PromptError("Unable to evaluate condition '%s': no template engine available.", condition)
+
+        try:
+            with self._templateVariables(variables):
+                evaluate = getattr(self._templar, 'evaluate_conditional', None)
+
+                if evaluate is not None:
+                    return all(evaluate(condition) for condition in op.when)
+
+                # Before ansible-core 2.19, conditions are evaluated through the playbook's conditional mix-in
+                from ansible.playbook.conditional import Conditional
+
+                conditional = Conditional(loader=self._loader)
+                conditional.when = list(op.when)
+
+                return conditional.evaluate_conditional(self._templar, variables)
+
+        except AnsibleError as e:
+            raise PromptError("Unable to evaluate condition: %s", e)
+
+
+    def _renderValue(self, value, variables):
+        """
+        Return a value with its templates rendered, or the value itself if it is not a template.
+
+        :kwarg value: the value to render
+        :kwarg variables: the variables available to the template
+
+        :returns: the rendered value
+
+        :raises PromptError: if the template cannot be rendered
+
+        .. versionadded:: 1.1.0
+        .. function:: _renderValue(value, variables)
+        """
+        if self._templar is None or not _isTemplate(value):
+            return value
+
+        try:
+            with self._templateVariables(variables):
+                return self._templar.template(value)
+
+        except AnsibleError as e:
+            raise PromptError("Unable to render message: %s", e)
+
+
+    def _renderOp(self, op, variables):
+        """
+        Return a plan operation with the templates in its text rendered, just before it is shown.
+
+        Operations are shared between hosts and tasks through the plan cache, so a rendered copy is returned rather
+        than changing the operation.
+
+        :kwarg op: the ``SayOp``, ``SayFileOp``, or ``AskOp`` to render
+        :kwarg variables: the variables available to templates, including the answers given so far
+
+        :returns: the rendered operation
+
+        :raises PromptError: if a template cannot be rendered, or renders a default that is not a valid answer
+
+        .. versionadded:: 1.1.0
+        .. function:: _renderOp(op, variables)
+        """
+        if self._templar is None:
+            return op
+
+        if isinstance(op, AskOp):
+            fields = ('say', 'default')
+        else:
+            fields = ('path',) if isinstance(op, SayFileOp) else ('text',)
+
+        rendered = dict(
+            (f, to_text(self._renderValue(getattr(op, f), variables))) for f in fields if _isTemplate(getattr(op, f))
+        )
+
+        if not rendered:
+            return op
+
+        op = op._replace(**rendered)
+
+        if isinstance(op, AskOp):
+            if 'default' in rendered and op.validator is not None and not op.validator.accepts(op.default):
+                raise PromptError("Default '%s' is not a valid answer for '%s'.", op.default, op.var)
+
+            op = op._replace(prompt=op.frame.format(say=op.say, default=op.default))
+
+        return op
+
+
+    @staticmethod
+    def _itemStats(index, op, elapsed, response):
+        """
+        Return the timings recorded for a single message item.
+
+        :kwarg index: the position of the item in the message list
+        :kwarg op: the item's plan operation
+        :kwarg elapsed: the total number of seconds spent on the item
+        :kwarg response: the ``Response`` to a question, or ``None`` for other messages
+
+        :returns: a dict of item statistics
+
+        .. versionadded:: 1.1.0
+        .. function:: _itemStats(index, op, elapsed, response)
+        """
+        if response is None:
+            return {
+                'index': index,
+                'type': 'say_file' if isinstance(op, SayFileOp) else 'say',
+                'render': round(elapsed, 6),
+            }
+
+        return {
+            'index': index,
+            'type': 'ask',
+            'var': op.var,
+            'source': response.source,
+            'render': round(max(elapsed - response.waited, 0), 6),
+            'wait': round(response.waited, 6),
+            'first_input': round(response.firstInput, 6) if response.firstInput is not None else None,
+            'retries': response.retries,
+            'timed_out': response.timedOut,
+        }
+
+
+    def _say(self, op, output):
+        """
+        Display a message.
+
+        :kwarg op: the ``SayOp`` to display
+        :kwarg output: the ``OutputBuffer`` to write to
+
+        .. versionadded:: 1.1.0
+        .. function:: _say(op, output)
+        """
+        if op.layout is not None:
+            output.write(self._renderBlock(to_text(op.text), op))
+
+        elif op.wrap:
+            output.write(self._renderWrapped(to_text(op.text), op, op.newline))
+
+        else:
+            output.write(self._render(op.text, op.align, op.newline, op.style))
+
+
+    def _sayFile(self, op, output, fmt='text'):
+        """
+        Display each line of a file, streaming it so memory use does not depend on the size of the file.
+
+        Every line is aligned individually.  Only the final line obeys the message's ``newline`` setting.
+
+        :kwarg op: the ``SayFileOp`` to display
+        :kwarg output: the ``OutputBuffer`` to write to
+        :kwarg fmt: the format to write each line in (defaults to ``text``)
+
+        :raises PromptError: if the file cannot be found or read
+
+        .. versionadded:: 1.1.0
+        .. function:: _sayFile(op, output[, fmt='text'])
+        """
+        path = op.path
+
+        if self._loader is not None:
+            try:
+                path = self._find_needle('files', path)
+            except AnsibleError as e:
+                raise PromptError("Unable to read file '%s': %s", op.path, e)
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                previous = None
+
+                # Hold back one line, so the last one can be recognized
+                if fmt == 'json':
+                    render = self._renderJson
+                elif op.wrap:
+                    render = self._renderWrapped
+                else:
+                    render = self._renderLine
+
+                for line in f:
+                    if previous is not None:
+                        output.write(render(previous, op, True))
+
+                    previous = line.rstrip("\r\n")
+
+                if previous is not None:
+                    output.write(render(previous, op, op.newline))
+
+        except (IOError, OSError, UnicodeError) as e:
+            raise PromptError("Unable to read file '%s': %s", op.path, e)
+
+
+    def _render(self, text, align, newline, style=""):
+        """
+        Return a line of text styled and aligned for the terminal.
+
+        Alignment uses the columns the text occupies on the terminal, so escape sequences and wide characters do not
+        shift it.
+
+        :kwarg text: the text to display
+        :kwarg align: ``left``, ``center``, or ``right``
+        :kwarg newline: whether to end the line with a newline
+        :kwarg style: the ANSI escape sequence to style the text with (defaults to none)
+
+        :returns: the text to output
+
+        .. versionadded:: 1.1.0
+        .. function:: _render(text, align, newline[, style=""])
+        """
+        postfix = "\n" if newline else ""
+        styled = "%s%s%s" % (style, text, RESET) if style else text
+
+        if align == 'left':
+            return "%s%s" % (styled, postfix)
+
+        left, right = self._margins(text, self._terminal.columns() - len(postfix), align)
+
+        return "%s%s%s%s" % (" " * left, styled, " " * right, postfix)
+
+
+    @staticmethod
+    def _margins(text, columns, align):
+        """
+        Return the spaces needed before and after text to align it within a number of columns.
+
+        Margins are based on the columns the text occupies on the terminal, and a centered text's spaces are split as
+        ``str.center()`` splits them.
+
+        :kwarg text: the text to align
+        :kwarg columns: the number of columns to align within
+        :kwarg align: ``left``, ``center``, or ``right``
+
+        :returns: a tuple of the number of spaces before and after the text
+
+        .. versionadded:: 1.1.0
+        .. function:: _margins(text, columns, align)
+        """
+        margin = max(columns - displayWidth(text), 0)
+
+        if align == 'right':
+            return margin, 0
+
+        if align == 'center':
+            left = margin // 2 + (margin & columns & 1)
+            return left, margin - left
+
+        return 0, margin
+
+
+    def _renderLine(self, text, op, newline):
+        """
+        Return a line of text styled and aligned as a message requires.
+
+        .. versionadded:: 1.1.0
+        .. function:: _renderLine(text, op, newline)
+        """
+        return self._render(text, op.align, newline, op.style)
+
+
+    def _renderJson(self, text, op, newline=True):
+        """
+        Return a message as a single compact line of JSON, without any of the terminal's formatting.
+
+        Styles, wrapping, borders, and the ``newline`` setting apply only to the terminal, so they are left out.
+
+        :kwarg text: the text of the message
+        :kwarg op: the ``SayOp`` or ``SayFileOp`` being displayed
+        :kwarg newline: ignored, as every message is written on its own line
+
+        :returns: the text to output
+
+        .. versionadded:: 1.1.0
+        .. function:: _renderJson(text, op[, newline=True])
+        """
+        import json
+
+        record = {'text': to_text(text), 'align': op.align, 'host': self._host}
+
+        return "%s\n" % json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+
+    def _renderWrapped(self, text, op, newline):
+        """
+        Return text wrapped to the terminal's width, with each line styled and aligned as a message requires.
+
+        Only the final line obeys the ``newline`` setting.
+
+        :kwarg text: the text to display
+        :kwarg op: the ``SayOp`` or ``SayFileOp`` being displayed
+        :kwarg newline: whether to end the final line with a newline
+
+        :returns: the text to output
+
+        .. versionadded:: 1.1.0
+        .. function:: _renderWrapped(text, op, newline)
+        """
+        lines = wrapText(text, self._terminal.columns() - 1)
+
+        return "".join(
+            self._render(line, op.align, newline or i < len(lines) - 1, op.style)
+            for i, line in enumerate(lines)
+        )
+
+
+    def _renderBlock(self, text, op):
+        """
+        Return text wrapped inside a border, rendered as a single block.
+
+        A ``box`` is as wide as its longest line and is itself aligned, while a ``panel`` spans the terminal and
+        aligns each line within it.
+
+        :kwarg text: the text to display
+        :kwarg op: the ``SayOp`` being displayed
+
+        :returns: the text to output
+
+        .. versionadded:: 1.1.0
+        .. function:: _renderBlock(text, op)
+        """
+        inner = max(self._terminal.columns() - 5, 1)
+        lines = wrapText(text, inner)
+
+        if op.layout == 'box':
+            inner = max(displayWidth(line) for line in lines)
+            align = op.align
+            content = 'left'
+        else:
+            align = 'left'
+            content = op.align
+
+        block = [BORDER['top'] % (BORDER['line'] * (inner + 2))]
+
+        for line in lines:
+            left, right = self._margins(line, inner, content)
+            block.append(BORDER['side'] % ("%s%s%s" % (" " * left, line, " " * right)))
+
+        block.append(BORDER['bottom'] % (BORDER['line'] * (inner + 2)))
+
+        return "".join(self._render(line, align, True, op.style) for line in block)
+
+
+    def _ask(self, op, output, scope=()):
+        """
+        Obtain the response to a question, from the configured answers or by asking the user.
+
+        :kwarg op: the ``AskOp`` to answer
+        :kwarg output: the ``OutputBuffer`` to flush before waiting on the user
+        :kwarg scope: the keys distinguishing a repeated question's answers when sharing them with other hosts
+
+        :returns: a ``Response`` holding the raw response string, with any default applied
+
+        :raises PromptError: if no valid response is available without asking the user
+
+        .. versionadded:: 1.1.0
+        .. function:: _ask(op, output[, scope=()])
+        """
+        response = self._provided(op)
+
+        if response is not None:
+            return self._hashed(op, response)
+
+        # Everything said so far must be visible before waiting on the user
+        output.flush()
+
+        store = self._answerStore or AnswerStore.forRun()
+        task = getattr(self._task, '_uuid', None)
+
+        # Secrets are only shared once hashed, so they are never written to disk as typed
+        if not op.once or store is None or task is None or (op.secret is not None and op.secret.encrypt is None):
+            return self._hashed(op, self._readAnswer(op))
+
+        # Other hosts wait on the lock while the first one asks, then reuse its answer
+        key = AnswerStore.key(task, op.var, op.say, *scope)
+
+        with store.lock():
+            var = store.get(key)
+
+            if var is not None:
+                return Response(var, 'shared', 0.0, None, 0, False)
+
+            # Hashing is slow by design, so the hash is computed once and shared with every other host
+            response = self._hashed(op, self._readAnswer(op))
+            store.set(key, response.value)
+
+        return response
+
+
+    def _hashed(self, op, response):
+        """
+        Return the response to a question with its answer hashed, if the question is a secret to be hashed.
+
+        :kwarg op: the ``AskOp`` answered
+        :kwarg response: the question's ``Response``
+
+        :returns: a ``Response``
+
+        :raises PromptError: if the answer cannot be hashed
+
+        .. versionadded:: 1.1.0
+        .. function:: _hashed(op, response)
+        """
+        if op.secret is None or op.secret.encrypt is None:
+            return response
+
+        from ansible.utils.encrypt import do_encrypt
+
+        value = response.value.strip() if op.trim else response.value
+
+        try:
+            return response._replace(value=to_text(do_encrypt(value, op.secret.encrypt, salt=op.secret.salt)))
+        except AnsibleError as e:
+            raise PromptError("Unable to hash the answer to '%s': %s", op.var, e)
+
+
+    def _askForm(self, ops, output):
+        """
+        Obtain the responses to a group of questions, asking the user for all of those without an answer at once.
+
+        :kwarg ops: the ``AskOp`` questions to answer
+        :kwarg output: the ``OutputBuffer`` to flush before waiting on the user
+
+        :returns: a list of ``Response``, in the order of the questions
+
+        :raises PromptError: if no valid response is available for a question
+
+        .. versionadded:: 1.1.0
+        .. function:: _askForm(ops, output)
+        """
+        responses = [self._provided(op) for op in ops]
+        pending = [i for i, response in enumerate(responses) if response is None]
+
+        if not pending:
+            return responses
+
+        # Everything said so far must be visible before waiting on the user
+        output.flush()
+
+        store = self._answerStore or AnswerStore.forRun()
+        task = getattr(self._task, '_uuid', None)
+
+        if store is None or task is None:
+            for i, response in zip(pending, self._readFormAnswers([ops[i] for i in pending])):
+                responses[i] = response
+
+            return responses
+
+        # Other hosts wait on the lock while the first one fills in the form, then reuse its answers
+        keys = dict((i, AnswerStore.key(task, ops[i].var, ops[i].say)) for i in pending if ops[i].once)
+
+        with store.lock():
+            for i in keys:
+                var = store.get(keys[i])
+
+                if var is not None:
+                    responses[i] = Response(var, 'shared', 0.0, None, 0, False)
+
+            pending = [i for i in pending if responses[i] is None]
+
+            if pending:
+                for i, response in zip(pending, self._readFormAnswers([ops[i] for i in pending])):
+                    responses[i] = response
+
+                    if i in keys:
+                        store.set(keys[i], response.value)
+
+        return responses
+
+
+    def _provided(self, op):
+        """
+        Obtain the response to a question without asking the user, if one is available.
+
+        :kwarg op: the ``AskOp`` to answer
+
+        :returns: a ``Response``, or ``None`` if the user must be asked
 
-from ansible.plugins.action import ActionBase
+        :raises PromptError: if the provided answer is invalid, or no answer is available in non-interactive mode
 
+        .. versionadded:: 1.1.0
+        .. function:: _provided(op)
+        """
+        # Answers provided ahead of time are used as though the user typed them
+        if to_text(op.var) in self._answers:
+            var = self._answers[to_text(op.var)]
 
-class ActionModule(ActionBase):
-    """
-    Prompts user with one-or-more messages and optionally waits for input for each.
+            if var == "":
+                if op.default is None:
+                    raise PromptError("Empty answer provided for '%s' with no default.", op.var)
 
-    .. class:: ActionModule
-    .. versionadded:: 0.1.0
+                return Response(op.default, 'answers', 0.0, None, 0, False)
 
-    .. versionchanged:: 0.2.0
-       Added user input prompting functionality.
+            if self._accept(op, var) is None:
+                if op.confirm is not None:
+                    raise PromptError("Invalid answer '%s' provided for confirmation '%s'.", var, op.var)
 
-    .. versionchanged:: 0.3.0
-       Added newline, alignment, and formatting functionality.
+                raise PromptError("Invalid answer '%s' provided for '%s'.", var, op.var)
 
-    .. versionchanged:: 1.0.0
-       Added field postfix, confirm, choices, and defaults.
-    """
+            return Response(var, 'answers', 0.0, None, 0, False)
 
-    TRANSFERS_FILES = False
-    VALID_PARAMS = [
-        'say', 'newline', 'align',
-        'ask', 'postfix', 'default', 'trim', 'confirm'
-    ]
+        if not self._interactive:
+            if op.default is None:
+                raise PromptError("No answer provided for '%s' in non-interactive mode.", op.var)
 
+            return Response(op.default, 'default', 0.0, None, 0, False)
 
-    def __init__(self, task, connection, play_context, loader, templar, shared_loader_obj):
+        return None
+
+
+    def _readAnswer(self, op):
         """
-        Initialize the prompt Ansible plugin.
+        Ask the user a question, holding the terminal so no other host's question can interleave with it.
 
-        .. versionadded:: 0.1.0
+        :kwarg op: the ``AskOp`` to ask
 
-        .. versionchanged:: 0.2.0
-           Precompiled regular expressions for input variable validation.  Added input setting.
+        :returns: a ``Response``
 
-        .. function:: __init__(task, connection, play_context, loader, templar, shared_loader_obj)
+        .. versionadded:: 1.1.0
+        .. function:: _readAnswer(op)
         """
-        super(ActionModule, self).__init__(task, connection, play_context, loader, templar, shared_loader_obj)
+        if self._inputAvailable():
+            try:
+                with self._holdTerminal():
+                    return self._readTerminal(op)
+            except PromptError:
+                # The controller only reports that it cannot ask once a question is sent to it
+                if self._inputAvailable():
+                    raise
 
-        self.setOutput(sys.stdout)
-        self.setInput('/dev/tty')
+        return self._unattended(op)
 
-        # Pre-compile our regex for checking valid variables
-        self.rValidVariable = re.compile(r"^[A-Za-z0-9_]+$")
 
+    def _readFormAnswers(self, ops):
+        """
+        Ask the user a group of questions as a form, holding the terminal so no other host's question interleaves.
+
+        :kwarg ops: the ``AskOp`` questions to ask
 
-    def run(self, tmp=None, task_vars=None):
+        :returns: a list of ``Response``, in the order of the questions
+
+        .. versionadded:: 1.1.0
+        .. function:: _readFormAnswers(ops)
         """
-        Perform the plugin task, prompting the user one or more times.
+        if self._inputAvailable():
+            try:
+                with self._holdTerminal():
+                    return self._readForm(ops)
+            except PromptError:
+                # The controller only reports that it cannot ask once a question is sent to it
+                if self._inputAvailable():
+                    raise
 
-        :kwarg tmp: the temporary directory to use if creating files
-        :kwarg task_vars: any variables associated with the task
+        return [self._unattended(op) for op in ops]
 
-        :returns: a dictionary of results from the module
 
-        .. versionadded:: 0.1.0
-        .. function:: run([tmp=None, task_vars=None])
+    def _inputAvailable(self):
         """
-        task_vars = task_vars or dict()
+        Return whether the input can be opened.
 
-        result = super(ActionModule, self).run(tmp, task_vars)
-        args = self._task.args
+        Reading from '/dev/tty' needs a controlling terminal, and asking through the display needs a controller that
+        can ask.
 
-        # Expect only the messages parameter
-        if 'msg' not in args:
-            return self._fail(result, "Required 'msg' parameter missing.")
+        .. versionadded:: 1.1.0
+        .. function:: _inputAvailable()
+        """
+        try:
+            self._input.stream()
+        except (IOError, OSError) as e:
+            display.vvv("prompt input '%s' is not available: %s" % (self._instr, e))
+            return False
+
+        return True
 
-        if len(args) != 1:
-            return self._fail(result, "Expected single 'msg' parameter. Multiple parameters given.")
 
-        return self._prompt(result, args['msg'])
+    def _unattended(self, op):
+        """
+        Return the response to a question that cannot be asked because no input is available.
 
+        A question's default is only used in place of asking when answers were provided ahead of time, so that a
+        missing terminal never silently confirms a question the user expected to be asked.
 
-    def setOutput(self, outstr=None):
+        :kwarg op: the ``AskOp`` that cannot be asked
+
+        :returns: a ``Response`` holding the question's default
+
+        :raises PromptError: if no answers were provided, or the question has no default
+
+        .. versionadded:: 1.1.0
+        .. function:: _unattended(op)
         """
-        Set the output stream to write to.
+        if op.default is None:
+            raise PromptError(
+                "No terminal available to ask '%s'; provide an answer with ANSIBLE_PROMPT_ANSWER_%s or in the "
+                "ANSIBLE_PROMPT_ANSWERS file.", op.var, op.var
+            )
 
-        :kwarg outstr: an output stream to write to (defaults to sys.stdout)
+        if not self._answers:
+            raise PromptError(
+                "No terminal available to ask '%s'; provide an answer, or set ANSIBLE_PROMPT_INTERACTIVE=false to "
+                "use its default.", op.var
+            )
 
-        .. versionadded:: 0.1.0
-        .. function:: setOutput([outstr=None])
+        return Response(op.default, 'default', 0.0, None, 0, False)
+
+
+    @contextmanager
+    def _holdTerminal(self):
+        """
+        Hold the terminal for this playbook run, if it can be locked.
+
+        .. versionadded:: 1.1.0
+        .. function:: _holdTerminal()
         """
-        self._outstr = outstr or sys.stdout
+        lock = self._terminalLock or TerminalLock.forRun()
 
+        if lock is None:
+            yield
+            return
 
-    def setInput(self, instr=None):
+        with lock.hold():
+            yield
+
+
+    def _readTerminal(self, op):
         """
-        Set the input stream to read from.
+        Ask the user a question until a valid response is given or the question times out.
 
-        :kwarg instr: an input stream to read from (defaults to '/dev/tty')
+        :kwarg op: the ``AskOp`` to ask
 
-        .. versionadded:: 0.2.0
-        .. function:: setInput([instr=None])
+        :returns: a ``Response``
+
+        :raises PromptError: if the question times out without a default
+
+        .. versionadded:: 1.1.0
+        .. function:: _readTerminal(op)
         """
-        self._instr = instr or '/dev/tty'
+        timeout = self._timeoutFor(op)
+        start = time.time()
+        firstInput = None
+        retries = -1
+
+        # Repeat question until answered
+        while True:
+            retries += 1
+
+            echo = op.secret is None
+            var = self._readLine(op.prompt, None if timeout is None else timeout - (time.time() - start), echo)
+
+            if var is not None and not echo and op.secret.verify and self._accept(op, var) is not None:
+                again = self._readLine(
+                    "Confirm %s" % op.prompt, None if timeout is None else timeout - (time.time() - start), echo
+                )
+
+                if again is not None and again != var:
+                    self._outstr.write("Answers do not match.\n")
+                    continue
+
+                var = again
+
+            if var is None:
+                waited = time.time() - start
+
+                if op.default is None:
+                    raise PromptError("Timed out after %.1f seconds waiting for '%s'.", waited, op.var)
 
+                # Finish the unanswered prompt's line before anything else is displayed
+                self._outstr.write("\n")
 
-    def _prompt(self, result, msg):
+                return Response(op.default, 'timeout', waited, firstInput, retries, True)
+
+            if firstInput is None:
+                firstInput = time.time() - start
+
+            var = self._accept(op, var)
+
+            if var is not None:
+                return Response(var, 'user', time.time() - start, firstInput, retries, False)
+
+
+    def _readForm(self, ops):
         """
-        Prompts the user with a message and optionally asks for a response.
+        Ask the user a group of questions as a form, asking again only for the answers that are invalid.
+
+        The questions are listed together and one answer is read per line, so answers may be typed one at a time or
+        pasted as a single block.  The shortest timeout of the questions applies to the whole form.
+
+        :kwarg ops: the ``AskOp`` questions to ask
+
+        :returns: a list of ``Response``, in the order of the questions
+
+        :raises PromptError: if the form times out on a question without a default
+
+        .. versionadded:: 1.1.0
+        .. function:: _readForm(ops)
+        """
+        timeouts = [timeout for timeout in map(self._timeoutFor, ops) if timeout is not None]
+        timeout = min(timeouts) if timeouts else None
+        start = time.time()
+        firstInput = None
+
+        self._outstr.write("".join("%d. %s\n" % (n, op.prompt.rstrip()) for n, op in enumerate(ops, 1)))
+
+        lines = []
+
+        while len(lines) < len(ops):
+            line = self._readLine("", None if timeout is None else timeout - (time.time() - start))
+
+            if line is None:
+                # Finish any partially typed answer's line before anything else is displayed
+                self._outstr.write("\n")
+                break
+
+            if firstInput is None:
+                firstInput = time.time() - start
+
+            lines.append(line)
+
+        responses = []
+
+        for n, op in enumerate(ops):
+            asked = time.time() if n else start
+            var = lines[n] if n < len(lines) else None
+            retries = 0
+
+            while var is not None and self._accept(op, var) is None:
+                retries += 1
+                var = self._readLine(op.prompt, None if timeout is None else timeout - (time.time() - start))
+
+            if var is None:
+                if op.default is None:
+                    raise PromptError("Timed out after %.1f seconds waiting for '%s'.", time.time() - start, op.var)
+
+                responses.append(Response(op.default, 'timeout', time.time() - asked, None, retries, True))
+                continue
+
+            responses.append(Response(
+                self._accept(op, var),
+                'user',
+                time.time() - asked,
+                firstInput if not n else None,
+                retries,
+                False
+            ))
+
+        return responses
+
+
+    @staticmethod
+    def _accept(op, var):
+        """
+        Return the response to a question if it is acceptable, applying any default to an empty response.
+
+        :kwarg op: the ``AskOp`` being answered
+        :kwarg var: the response given
+
+        :returns: the accepted response, or ``None`` if the question must be asked again
+
+        .. versionadded:: 1.1.0
+        .. function:: _accept(op, var)
+        """
+        if var == "":
+            return op.default
+
+        if op.confirm is not None and var.lower() not in "yn":
+            return None
+
+        if op.validator is not None and not op.validator.accepts(var.strip() if op.trim else var):
+            return None
+
+        return var
+
+
+    def _readLine(self, askstr, timeout=None, echo=True):
+        """
+        Display a prompt and read a line of input, optionally waiting at most the given number of seconds.
+
+        Lines are read directly from the input session, so neither ``sys.stdin`` nor the interpreter's line editing is
+        involved.
+
+        :kwarg askstr: the prompt to display
+        :kwarg timeout: the number of seconds to wait, or ``None`` to wait indefinitely
+        :kwarg echo: whether the terminal displays what is typed (defaults to True)
+
+        :returns: the line read without its line ending, or ``None`` if the timeout expired
+
+        :raises PromptError: if the input stream is closed or cannot be read
+
+        .. versionadded:: 1.1.0
+        .. function:: _readLine(askstr[, timeout=None, echo=True])
+        """
+        try:
+            line = self._input.ask(askstr, self._outstr, timeout, echo)
+        except (IOError, OSError, AnsibleError) as e:
+            raise PromptError("Unable to read an answer: %s", e)
+
+        if line is None:
+            return None
+
+        if line == "":
+            raise PromptError("Input closed while waiting for an answer.")
+
+        return line.rstrip("\r\n")
+
+
+    def _timeoutFor(self, op):
+        """
+        Return the number of seconds to wait for an answer to a question, or ``None`` to wait indefinitely.
+
+        .. versionadded:: 1.1.0
+        .. function:: _timeoutFor(op)
+        """
+        return op.timeout if op.timeout is not None else self._timeout
+
+
+    def validate(self, msg):
+        """
+        Check every item of a message without producing any output or asking any questions.
 
-        :kwarg result: the base result dict to build on
         :kwarg msg: the message provided to parse (string, object, or list)
 
-        :returns: an updated dict response with success or failure
+        :returns: a list of failure messages, one per invalid item, which is empty if the message is valid
 
-        .. versionadded:: 0.1.0
+        .. versionadded:: 1.1.0
+        .. function:: validate(msg)
+        """
+        return [str(e) for e in self._compile(msg).errors]
 
-        .. versionchanged:: 0.2.0
-           Added user input prompting functionality.
 
-        .. versionchanged:: 0.3.0
-           Added newline, alignment, and formatting functionality.
+    def _compile(self, msg):
+        """
+        Return the compiled plan for a message, validating and parsing it only if it has not been seen before.
 
-        .. versionchanged:: 1.0.0
-           Added postfix, confirm, choices, and defaults.
+        :kwarg msg: the message provided to parse (string, object, or list)
+
+        :returns: a ``PromptPlan``
+
+        .. versionadded:: 1.1.0
+        .. function:: _compile(msg)
+        """
+        key = PLAN_CACHE.key(msg)
+        plan = PLAN_CACHE.get(key)
+
+        if plan is None:
+            plan = self._parse(msg)
+            PLAN_CACHE.put(key, plan)
 
-        .. function:: _prompt(result, msg)
+        display.vvvv("prompt plan cache: %(hits)d hits, %(misses)d misses, %(size)d plans" % PLAN_CACHE.stats())
+
+        return plan
+
+
+    def _parse(self, msg):
+        """
+        Validate a message specification and convert it into a prompt plan.
+
+        Every item is checked, so a plan lists all invalid items rather than only the first.
+
+        :kwarg msg: the message provided to parse (string, object, or list)
+
+        :returns: a ``PromptPlan``
+
+        .. versionadded:: 1.1.0
+        .. function:: _parse(msg)
         """
         if not isinstance(msg, list):
             msg = [msg]
 
         if len(msg) == 0:
-            return self._fail(result, "No message provided")
+            return PromptPlan((), (PromptError("No message provided"),))
+
+        ops = []
+        errors = []
 
         # Parse each item on the list
         for m in msg:
+            try:
+                ops.append(self._parseItem(m))
+            except PromptError as e:
+                errors.append(e)
 
-            if m is not None and not isinstance(m, (str, dict)):
-                m = str(m)
+        return PromptPlan(tuple(op for op in ops if op is not None), tuple(errors))
 
-            # If no message is provided, fail
-            if m is None or len(m) == 0:
-                return self._fail(result, "No message provided")
 
-            # If a simple scalar value is provided, simply display it
-            if not isinstance(m, dict):
-                self._outstr.write("%s\n" % m)
-                continue
+    def _parseItem(self, m):
+        """
+        Validate a single message item and convert it into a prompt plan operation.
+
+        :kwarg m: the message item to parse
+
+        :returns: a ``SayOp``, ``SayFileOp``, or ``AskOp``, or ``None`` if the item produces no output
+
+        :raises PromptError: if the item is invalid
+
+        .. versionadded:: 1.1.0
+        .. function:: _parseItem(m)
+        """
+        if m is not None and not isinstance(m, (str, dict)):
+            m = str(m)
+
+        # If no message is provided, fail
+        if m is None or len(m) == 0:
+            raise PromptError("No message provided")
+
+        # If a simple scalar value is provided, simply display it
+        if not isinstance(m, dict):
+            return SayOp(m, 'left', True, "", False, None, None)
+
+        # If this is a set of key/value pairs, parse it
+        for arg in m:
+            if arg not in self.VALID_PARAMS:
+                raise PromptError("Unexpected parameter '%s'", arg)
+
+        # If this is a loop, parse the item it repeats
+        if 'foreach' in m:
+            return self._parseForEach(m)
+
+        for option in ('loop_var', 'key'):
+            if option in m:
+                raise PromptError("Option '%s' requires option 'foreach'.", option)
+
+        when = self._parseWhen(m)
+
+        # If this is a prompt, ask it as such
+        if 'ask' in m:
 
-            # If this is a set of key/value pairs, parse it
-            for arg in m:
-                if arg not in self.VALID_PARAMS:
-                    return self._fail(result, "Unexpected parameter '%s'" % arg)
+            # Check for valid variable name
+            if m['ask'] is None or str(m['ask']).strip() == "":
+                raise PromptError("Parameter 'ask' must provide variable name.  Empty received.")
 
-            # Determine postfix given newline settings
-            postfix = "\n"
+            # Check for illegal ansible characters
+            if not self.rValidVariable.search(str(m['ask'])):
+                raise PromptError("Invalid character in 'ask' parameter '%s'.", m['ask'])
+
+            # Check if any invalid parameters are provided
             if 'newline' in m and not m['newline']:
-                postfix = ""
+                raise PromptError("Option 'newline' is not compatible with option 'ask'.")
 
-            # If this is a prompt, ask it as such
-            if 'ask' in m:
+            if 'align' in m and m['align'] != 'left':
+                raise PromptError("Option 'align' is not compatible with option 'ask'.")
 
-                # Check for valid variable name
-                if m['ask'] is None or str(m['ask']).strip() == "":
-                    return self._fail(result, "Parameter 'ask' must provide variable name.  Empty received.")
+            for option in ('wrap', 'box', 'panel'):
+                if option in m:
+                    raise PromptError("Option '%s' is not compatible with option 'ask'.", option)
 
-                # Check for illegal ansible characters
-                if not self.rValidVariable.search(m['ask']):
-                    return self._fail(result, "Invalid character in 'ask' parameter '%s'.", m['ask'])
+            if 'confirm' in m and 'default' in m:
+                raise PromptError("Unexpected 'default' provided with confirmation question.")
 
-                # Check if any invalid parameters are provided
-                if 'newline' in m and not m['newline']:
-                    return self._fail(result, "Option 'newline' is not compatible with option 'ask'.")
+            if 'say_file' in m:
+                raise PromptError("Option 'say_file' is not compatible with option 'ask'.")
 
-                if 'align' in m and m['align'] != 'left':
-                    return self._fail(result, "Option 'align' is not compatible with option 'ask'.")
+            secret = self._parseSecret(m)
 
-                if 'confirm' in m and 'default' in m:
-                    return self._fail(result, "Unexpected 'default' provided with confirmation question.")
+            timeout = m.get('timeout')
 
-                # If no say is provided, just make it blank
-                if 'say' not in m:
-                    m['say'] = ""
+            if timeout is not None:
+                try:
+                    timeout = float(timeout)
+                except (TypeError, ValueError):
+                    timeout = 0
 
-                # If no trim, default to true
-                if 'trim' not in m:
-                    m['trim'] = True
+                if timeout <= 0:
+                    raise PromptError("Option 'timeout' must be a positive number of seconds.")
 
-                # Default to input postfix, if not set
-                if 'postfix' not in m:
-                    m['postfix'] = "?"
+            confirm = None
+            default = to_text(m['default']) if m.get('default') is not None else None
+            defaultString = ""
 
-                # Convert to terminal input temporarily
-                oldin = sys.stdin
+            if 'confirm' in m:
+                for option in ('type', 'pattern', 'choices'):
+                    if option in m:
+                        raise PromptError("Option '%s' is not compatible with option 'confirm'.", option)
 
-                # Repeat question until answered
-                while True:
-                    if isinstance(self._instr, str):
-                        sys.stdin = open(self._instr)
-                    else:
-                        sys.stdin = self._instr
+                confirm = bool(m['confirm'])
+                default = "y" if confirm else "n"
+                defaultString = " [Yn]" if confirm else " [yN]"
 
-                    defaultString = ""
+            validator = self._parseValidator(m)
 
-                    if 'confirm' in m:
-                        if m['confirm']:
-                            defaultString = " [Yn]"
-                            m['default'] = "y"
-                        else:
-                            defaultString = " [yN]"
-                            m['default'] = "n"
+            if validator is not None:
+                # Templated defaults are checked once they are rendered
+                if default is not None:
+                    if not _isTemplate(default) and not validator.accepts(default):
+                        raise PromptError("Default '%s' is not a valid answer for '%s'.", default, m['ask'])
 
-                    elif 'default' in m:
-                        defaultString = " [%s]" % m['default']
+                if validator.choices is not None:
+                    defaultString = " (%s)" % "/".join(to_text(c) for c in m['choices'])
 
-                    # Present empty string if "say" not provided
-                    askstr = "%s%s%s " % (
-                        m['say'],
-                        defaultString,
-                        m['postfix']
-                    )
+            say = to_text(m.get('say', ""))
+            postfix = to_text(m.get('postfix', "?"))
+            style = self._parseStyle(m)
 
-                    var = raw_input(askstr)
+            # Escape the fixed parts of the prompt, leaving fields for the text that may be templated
+            frame = "%s%s%s%s " % (
+                "%s{say}%s" % (style, RESET) if style else "{say}",
+                defaultString.replace("{", "{{").replace("}", "}}"),
+                " [{default}]" if default is not None and confirm is None else "",
+                postfix.replace("{", "{{").replace("}", "}}"),
+            )
 
-                    if var != "":
-                        if 'confirm' in m and var.lower() not in "yn":
-                            continue
+            return AskOp(
+                var=to_text(m['ask']),
+                say=say,
+                postfix=postfix,
+                default=default,
+                trim=bool(m.get('trim', secret is None)),
+                confirm=confirm,
+                once=bool(m.get('once', True)),
+                timeout=timeout,
+                prompt=frame.format(say=say, default=default),
+                validator=validator,
+                frame=frame,
+                when=when,
+                secret=secret
+            )
 
-                        break
+        # If it's just a message, print it
+        if 'say' in m or 'say_file' in m:
 
-                    if 'default' in m:
-                        var = m['default']
-                        break
+            if 'say' in m and 'say_file' in m:
+                raise PromptError("Option 'say' is not compatible with option 'say_file'.")
 
-                # Revert to previous setting
-                sys.stdin = oldin
+            if 'default' in m:
+                raise PromptError("Unexpected 'default' in non-question prompt.")
 
-                if 'ansible_facts' not in result:
-                    result['ansible_facts'] = dict()
+            if 'postfix' in m:
+                raise PromptError("Unexpected 'postfix' in non-question prompt.")
 
-                # Trim whitespace if set
-                if m['trim']:
-                    var = var.strip()
+            if 'trim' in m:
+                raise PromptError("Unexpected 'trim' in non-question prompt.")
 
-                if 'confirm' in m:
-                    var = (var.lower() == "y")
+            if 'confirm' in m:
+                raise PromptError("Unexpected 'confirm' in non-question prompt.")
 
-                result['ansible_facts'][m['ask']] = var
+            if 'once' in m:
+                raise PromptError("Unexpected 'once' in non-question prompt.")
 
-            # If it's just a message, print it
-            elif 'say' in m:
-                import subprocess
+            if 'timeout' in m:
+                raise PromptError("Unexpected 'timeout' in non-question prompt.")
 
-                if 'default' in m:
-                    return self._fail(result, "Unexpected 'default' in non-question prompt.")
+            for option in ('type', 'pattern', 'choices', 'secret', 'verify', 'encrypt', 'salt'):
+                if option in m:
+                    raise PromptError("Unexpected '%s' in non-question prompt.", option)
 
-                if 'postfix' in m:
-                    return self._fail(result, "Unexpected 'postfix' in non-question prompt.")
+            align = m.get('align', 'left')
 
-                if 'trim' in m:
-                    return self._fail(result, "Unexpected 'trim' in non-question prompt.")
+            if align not in ('left', 'center', 'right'):
+                raise PromptError("Align '%s' invalid.  Expected 'left', 'center', or 'right'.", align)
 
-                if 'confirm' in m:
-                    return self._fail(result, "Unexpected 'confirm' in non-question prompt.")
+            newline = not ('newline' in m and not m['newline'])
+            layout = None
 
-                if 'align' not in m:
-                    m['align'] = 'left'
+            for option in ('box', 'panel'):
+                if not m.get(option):
+                    continue
 
-                output = m['say']
+                if layout is not None:
+                    raise PromptError("Option 'box' is not compatible with option 'panel'.")
 
-                if m['align'] == 'center':
-                    rows, columns = subprocess.check_output(['stty', 'size']).decode().split()
-                    output = "%s%s" % (output.center(int(columns) - len(postfix)), postfix)
-                elif m['align'] == 'right':
-                    rows, columns = subprocess.check_output(['stty', 'size']).decode().split()
-                    output = "%s%s" % (output.rjust(int(columns) - len(postfix)), postfix)
-                elif m['align'] == 'left':
-                    output = "%s%s" % (output, postfix)
-                else:
-                    return self._fail(
-                        result,
-                        "Align '%s' invalid.  Expected 'left', 'center', or 'right'.",
-                        m['align']
-                    )
+                if 'say_file' in m:
+                    raise PromptError("Option '%s' is not compatible with option 'say_file'.", option)
 
-                self._outstr.write(output)
+                if not newline:
+                    raise PromptError("Option 'newline' is not compatible with option '%s'.", option)
 
-        return result
+                layout = option
+
+            if 'say_file' in m:
+                if m['say_file'] is None or str(m['say_file']).strip() == "":
+                    raise PromptError("Parameter 'say_file' must provide a file path.  Empty received.")
+
+                return SayFileOp(
+                    to_text(m['say_file']), align, newline, self._parseStyle(m), bool(m.get('wrap', False)), when
+                )
+
+            return SayOp(
+                to_text(m['say']), align, newline, self._parseStyle(m), bool(m.get('wrap', False)), layout, when
+            )
+
+        return None
+
+
+    def _parseStyle(self, m):
+        """
+        Compile the styling options of a message item into an ANSI escape sequence.
+
+        :kwarg m: the message item to parse
+
+        :returns: the escape sequence, or ``""`` if the item is not styled
+
+        :raises PromptError: if a color or style is invalid
+
+        .. versionadded:: 1.1.0
+        .. function:: _parseStyle(m)
+        """
+        if 'color' not in m and 'bold' not in m and 'style' not in m:
+            return ""
+
+        codes = []
+
+        if m.get('color') is not None:
+            if not isinstance(m['color'], str) or m['color'] not in COLORS:
+                raise PromptError("Color '%s' invalid.  Expected one of: %s.", m['color'], ", ".join(sorted(COLORS)))
+
+            codes.append(COLORS[m['color']])
+
+        if m.get('bold'):
+            codes.append(STYLES['bold'])
+
+        styles = m.get('style') or []
+
+        if not isinstance(styles, list):
+            styles = str(styles).replace(",", " ").split()
+
+        for style in styles:
+            if not isinstance(style, str) or style not in STYLES:
+                raise PromptError("Style '%s' invalid.  Expected one of: %s.", style, ", ".join(sorted(STYLES)))
+
+            if STYLES[style] not in codes:
+                codes.append(STYLES[style])
+
+        if not codes:
+            return ""
+
+        return "\x1b[%sm" % ";".join(str(code) for code in codes)
+
+
+    def _parseForEach(self, m):
+        """
+        Validate a loop and the message item it repeats.
+
+        :kwarg m: the message item to parse
+
+        :returns: a ``ForEachOp``
+
+        :raises PromptError: if the loop or its item is invalid
+
+        .. versionadded:: 1.1.0
+        .. function:: _parseForEach(m)
+        """
+        items = m['foreach']
+
+        if not isinstance(items, list) and not _isTemplate(items):
+            raise PromptError("Option 'foreach' must be a list.  Received '%s'.", items)
+
+        var = m.get('loop_var', 'item')
+
+        if var is None or not self.rValidVariable.search(str(var)):
+            raise PromptError("Invalid character in 'loop_var' parameter '%s'.", var)
+
+        if 'key' in m and 'ask' not in m:
+            raise PromptError("Unexpected 'key' in non-question prompt.")
+
+        if 'say' not in m and 'say_file' not in m and 'ask' not in m:
+            raise PromptError("Option 'foreach' requires a 'say', 'say_file', or 'ask' to repeat.")
+
+        op = self._parseItem(dict((k, v) for k, v in m.items() if k not in ('foreach', 'loop_var', 'key')))
+
+        key = to_text(m['key']) if m.get('key') is not None else None
+
+        return ForEachOp(freeze(items), to_text(var), key, op)
+
+
+    @staticmethod
+    def _parseSecret(m):
+        """
+        Compile the secret handling of a question.
+
+        :kwarg m: the question item to parse
+
+        :returns: a ``Secret``, or ``None`` if the answer is displayed as it is typed
+
+        :raises PromptError: if the secret options are invalid
+
+        .. versionadded:: 1.1.0
+        .. function:: _parseSecret(m)
+        """
+        if not m.get('secret'):
+            for option in ('verify', 'encrypt', 'salt'):
+                if option in m:
+                    raise PromptError("Option '%s' requires option 'secret'.", option)
+
+            return None
+
+        # A secret's default would be displayed in the prompt
+        for option in ('confirm', 'default'):
+            if option in m:
+                raise PromptError("Option '%s' is not compatible with option 'secret'.", option)
+
+        encrypt = m.get('encrypt')
+
+        if encrypt is not None:
+            if not isinstance(encrypt, str) or not re.match(r"^[a-z0-9_]+$", encrypt):
+                raise PromptError(
+                    "Encrypt '%s' invalid.  Expected a hashing algorithm, such as 'sha512_crypt'.", encrypt
+                )
+
+            if m.get('type', 'str') != 'str':
+                raise PromptError("Option 'type' is not compatible with option 'encrypt'.")
+
+        elif 'salt' in m:
+            raise PromptError("Option 'salt' requires option 'encrypt'.")
+
+        salt = to_text(m['salt']) if m.get('salt') is not None else None
+
+        return Secret(bool(m.get('verify', False)), encrypt, salt)
+
+
+    @staticmethod
+    def _parseWhen(m):
+        """
+        Normalize the conditions of a message item.
+
+        :kwarg m: the message item to parse
+
+        :returns: a tuple of conditions, or ``None`` if the item is always shown
+
+        :raises PromptError: if the conditions are invalid
+
+        .. versionadded:: 1.1.0
+        .. function:: _parseWhen(m)
+        """
+        if 'when' not in m:
+            return None
+
+        when = m['when'] if isinstance(m['when'], list) else [m['when']]
+
+        if len(when) == 0 or any(not isinstance(c, (str, bool)) or c == "" for c in when):
+            raise PromptError("Option 'when' must be a condition or a list of conditions.")
+
+        return tuple(when)
+
+
+    def _parseValidator(self, m):
+        """
+        Compile the answer checks of a question.
+
+        :kwarg m: the question item to parse
+
+        :returns: a ``Validator``, or ``None`` if the question accepts any answer as text
+
+        :raises PromptError: if the checks are invalid
+
+        .. versionadded:: 1.1.0
+        .. function:: _parseValidator(m)
+        """
+        if 'type' not in m and 'pattern' not in m and 'choices' not in m:
+            return None
+
+        answerType = m.get('type', 'str')
+
+        if answerType not in ANSWER_TYPES:
+            raise PromptError(
+                "Type '%s' invalid.  Expected 'str', 'int', 'float', 'path', or 'ip'.",
+                answerType
+            )
+
+        pattern = None
+
+        if m.get('pattern') is not None:
+            try:
+                pattern = Validator.compilePattern(to_text(m['pattern']))
+            except re.error as e:
+                raise PromptError("Invalid pattern '%s' for '%s': %s", m['pattern'], m['ask'], e)
+
+        choices = None
+
+        if 'choices' in m:
+            if not isinstance(m['choices'], list) or len(m['choices']) == 0:
+                raise PromptError("Option 'choices' must be a list of answers.")
+
+            choices = frozenset(to_text(c) for c in m['choices'])
+
+        return Validator(answerType, pattern, choices)
 
 
     def _fail(self, result, message, *args):
@@ -325,7 +3595,7 @@ class ActionModule(ActionBase):
         if not isinstance(result, dict):
             raise TypeError("Invalid result provided. Expected dict, received %s." % type(result))
 
-        if not isinstance(message, (str, unicode)):
+        if not isinstance(message, str):
             raise TypeError("Invalid message provided. Expected string, received '%s'." % type(message))
 
         if message == "":
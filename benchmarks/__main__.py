@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 Andrew Vaughan <hello@andrewvaughan.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Runs the micro-benchmarks for the Ansible prompt action plugin, optionally saving results as JSON.
+
+.. moduleauthor:: Andrew Vaughan <hello@andrewvaughan.io>
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_prompt import PromptBenchmarks
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def measure(iteration, minTime):
+    """
+    Time a benchmark iteration repeatedly and measure the memory it allocates.
+
+    :kwarg iteration: the callable executing one iteration
+    :kwarg minTime: the minimum number of seconds to spend timing
+
+    :returns: a dict of results
+
+    .. versionadded:: 1.1.0
+    .. function:: measure(iteration, minTime)
+    """
+    # Warm up caches so steady-state, per-host cost is measured
+    iteration()
+
+    count = 0
+    start = time.time()
+    elapsed = 0.0
+
+    while elapsed < minTime:
+        iteration()
+        count += 1
+        elapsed = time.time() - start
+
+    result = {
+        'iterations': count,
+        'ops_per_sec': count / elapsed,
+        'mean_us': elapsed / count * 1e6,
+        'alloc_bytes': None,
+    }
+
+    # Peak memory allocated by a single iteration, where the interpreter supports tracing it
+    if tracemalloc is not None:
+        tracemalloc.start()
+
+        iteration()
+
+        result['alloc_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result
+
+
+def revision():
+    """
+    Return the current git revision, or ``None`` if it cannot be determined.
+
+    .. versionadded:: 1.1.0
+    .. function:: revision()
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD']).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    """
+    Run the benchmarks, print a report, and optionally save and compare results.
+
+    .. versionadded:: 1.1.0
+    .. function:: main([argv=None])
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-k', '--filter', default='', help="only run benchmarks whose name contains this text")
+    parser.add_argument('-t', '--min-time', type=float, default=1.0, help="seconds to spend on each benchmark")
+    parser.add_argument('-o', '--output', help="save results as JSON to this file")
+    parser.add_argument('-c', '--compare', help="compare against results previously saved as JSON")
+
+    args = parser.parse_args(argv)
+
+    suite = PromptBenchmarks()
+    names = sorted(n for n in dir(suite) if n.startswith('bench_') and args.filter in n)
+
+    baseline = {}
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+
+    print("%-42s %14s %12s %14s %10s" % ("benchmark", "ops/sec", "mean (us)", "alloc (bytes)", "vs base"))
+
+    for name in names:
+        result = measure(getattr(suite, name)(), args.min_time)
+        results[name] = result
+
+        change = ""
+
+        if name in baseline:
+            change = "%.2fx" % (result['ops_per_sec'] / baseline[name]['ops_per_sec'])
+
+        print("%-42s %14.1f %12.1f %14s %10s" % (
+            name,
+            result['ops_per_sec'],
+            result['mean_us'],
+            result['alloc_bytes'] if result['alloc_bytes'] is not None else "n/a",
+            change
+        ))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'revision': revision(),
+                'python': platform.python_version(),
+                'timestamp': time.time(),
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 Andrew Vaughan <hello@andrewvaughan.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Benchmarks of the Ansible prompt action plugin's per-host hot paths.
+
+.. moduleauthor:: Andrew Vaughan <hello@andrewvaughan.io>
+"""
+
+import io
+import sys
+
+from unittest import mock
+
+from action_plugins import Prompt
+from action_plugins.prompt import PLAN_CACHE, TerminalGeometry
+
+from ansible.playbook.task import Task as AnsibleTask
+from ansible.playbook.play_context import PlayContext as AnsiblePlayContext
+
+
+class NullOutput(object):
+    """
+    An output stream that discards everything written to it.
+
+    .. class:: NullOutput
+    .. versionadded:: 1.1.0
+    """
+
+    def write(self, text):
+        """
+        Discard text.
+
+        .. versionadded:: 1.1.0
+        .. function:: write(text)
+        """
+        pass
+
+
+    def flush(self):
+        """
+        Do nothing.
+
+        .. versionadded:: 1.1.0
+        .. function:: flush()
+        """
+        pass
+
+
+class FixedTerminal(TerminalGeometry):
+    """
+    A terminal geometry provider with a fixed size, so benchmarks do not depend on the invoking terminal.
+
+    .. class:: FixedTerminal
+    .. versionadded:: 1.1.0
+    """
+
+    def _query(self):
+        """
+        Return a fixed terminal size.
+
+        .. versionadded:: 1.1.0
+        .. function:: _query()
+        """
+        return (24, 80)
+
+
+class PromptBenchmarks(object):
+    """
+    Benchmarks of the Ansible prompt action plugin.
+
+    Each ``bench_*`` method performs any setup and returns a callable that executes one iteration.
+
+    .. class:: PromptBenchmarks
+    .. versionadded:: 1.1.0
+    """
+
+    def _getPrompt(self, msg=None):
+        """
+        Return a Prompt object writing to a discarding stream, optionally with task arguments.
+
+        .. versionadded:: 1.1.0
+        .. function:: _getPrompt([msg=None])
+        """
+        prompt = Prompt(
+            task=AnsibleTask(),
+            connection=mock.Mock(),
+            play_context=AnsiblePlayContext(),
+            loader=None,
+            templar=None,
+            shared_loader_obj=None
+        )
+
+        prompt.setOutput(NullOutput())
+        prompt.setTerminal(FixedTerminal())
+
+        if msg is not None:
+            prompt._task.args = {'msg': msg}
+
+        return prompt
+
+
+    def bench_prompt_init(self):
+        """
+        Instantiate the plugin, as Ansible does for every host and task.
+
+        .. versionadded:: 1.1.0
+        .. function:: bench_prompt_init()
+        """
+        return self._getPrompt
+
+
+    def bench_prompt_run_large_msg(self):
+        """
+        Run a task displaying 1,000 plain messages.
+
+        .. versionadded:: 1.1.0
+        .. function:: bench_prompt_run_large_msg()
+        """
+        msg = ["Release note line %d" % i for i in range(1000)]
+
+        return lambda: self._getPrompt(msg).run()
+
+
+    def bench_prompt_run_large_msg_uncached(self):
+        """
+        Run a task displaying 1,000 plain messages, without the benefit of the plan cache.
+
+        .. versionadded:: 1.1.0
+        .. function:: bench_prompt_run_large_msg_uncached()
+        """
+        msg = ["Release note line %d" % i for i in range(1000)]
+
+        def iteration():
+            PLAN_CACHE.clear()
+            self._getPrompt(msg).run()
+
+        return iteration
+
+
+    def bench_prompt_run_aligned(self):
+        """
+        Run a task displaying 200 centered and right-aligned messages.
+
+        .. versionadded:: 1.1.0
+        .. function:: bench_prompt_run_aligned()
+        """
+        msg = [
+            {'say': "Banner line %d" % i, 'align': 'center' if i % 2 else 'right'}
+            for i in range(200)
+        ]
+
+        return lambda: self._getPrompt(msg).run()
+
+
+    def bench_prompt_run_wrapped(self):
+        """
+        Run a task displaying 20 long paragraphs, wrapped and boxed to the terminal's width.
+
+        .. versionadded:: 1.1.0
+        .. function:: bench_prompt_run_wrapped()
+        """
+        paragraph = " ".join("word%d" % i for i in range(400))
+        msg = [
+            {'say': paragraph, 'wrap': True} if i % 2 else {'say': paragraph, 'box': True, 'align': 'center'}
+            for i in range(20)
+        ]
+
+        return lambda: self._getPrompt(msg).run()
+
+
+    def bench_prompt_run_ask_many(self):
+        """
+        Run a task asking 200 questions, answered from an in-memory stream.
+
+        .. versionadded:: 1.1.0
+        .. function:: bench_prompt_run_ask_many()
+        """
+        msg = [
+            {'say': "Question %d" % i, 'ask': "answer_%d" % i, 'once': False}
+            for i in range(200)
+        ]
+
+        answers = "".join("answer %d\n" % i for i in range(200))
+
+        def iteration():
+            prompt = self._getPrompt(msg)
+            prompt.setInput(io.StringIO(answers))
+
+            stdout = sys.stdout
+            sys.stdout = NullOutput()
+
+            try:
+                prompt.run()
+            finally:
+                sys.stdout = stdout
+
+        return iteration
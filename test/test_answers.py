@@ -0,0 +1,510 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 Andrew Vaughan <hello@andrewvaughan.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Test suite for the Ansible prompt action plugin.
+
+.. moduleauthor:: Andrew Vaughan <hello@andrewvaughan.io>
+"""
+
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from unittest import mock
+
+from action_plugins import Prompt
+from action_plugins.prompt import AnswerStore, TerminalLock
+
+from ansible.playbook.task import Task as AnsibleTask
+from ansible.playbook.play_context import PlayContext as AnsiblePlayContext
+
+
+class TestAnswers(unittest.TestCase):
+    """
+    Tests the provided-answer and non-interactive modes of the Ansible prompt action plugin.
+
+    .. class:: TestAnswers
+    .. versionadded:: 1.1.0
+    """
+
+    def setUp(self):
+        """
+        Sets up a prompt object and a scratch directory before each test.
+
+        .. versionadded:: 1.1.0
+        .. function:: setUp()
+        """
+        self.tmpdir = tempfile.mkdtemp()
+
+        self.prompt = self._getPrompt()
+
+        self.outstr = io.StringIO()
+        self.prompt.setOutput(self.outstr)
+
+
+    def tearDown(self):
+        """
+        Removes the scratch directory after each test.
+
+        .. versionadded:: 1.1.0
+        .. function:: tearDown()
+        """
+        shutil.rmtree(self.tmpdir)
+
+
+    def _getPrompt(self):
+        """
+        Return a generic Prompt object.
+
+        :returns: generic Prompt object
+
+        .. versionadded:: 1.1.0
+        .. function:: _getPrompt()
+        """
+        prompt = Prompt(
+            task=AnsibleTask(),
+            connection=None,
+            play_context=AnsiblePlayContext(),
+            loader=None,
+            templar=None,
+            shared_loader_obj=None
+        )
+        prompt.setAnswerStore(AnswerStore(os.path.join(self.tmpdir, 'answers.json')))
+        prompt.setTerminalLock(TerminalLock(os.path.join(self.tmpdir, 'tty.lock')))
+        prompt.setInput(io.StringIO())
+
+        return prompt
+
+
+    def _writeFile(self, name, content):
+        """
+        Write a file to the scratch directory and return its path.
+
+        .. versionadded:: 1.1.0
+        .. function:: _writeFile(name, content)
+        """
+        path = os.path.join(self.tmpdir, name)
+
+        with open(path, 'w') as f:
+            f.write(content)
+
+        return path
+
+
+
+
+    # setAnswers(answers)
+
+    def test_prompt_setAnswers_dict_valid(self):
+        """
+        Test that provided answers are used without reading any input.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setAnswers_dict_valid()
+        """
+        self.prompt.setAnswers({'first_name': '  Andrew ', 'cont': True, 'zip': 12345})
+
+        with mock.patch.object(self.prompt, '_readLine') as mockinput:
+            result = self.prompt._prompt({}, [
+                {'say': 'First Name', 'ask': 'first_name'},
+                {'say': 'Continue', 'ask': 'cont', 'confirm': False},
+                {'say': 'Zip Code', 'ask': 'zip'},
+            ])
+
+            self.assertFalse(mockinput.called)
+
+        self.assertEqual(result['ansible_facts'], {'first_name': 'Andrew', 'cont': True, 'zip': '12345'})
+
+
+    def test_prompt_setAnswers_empty_default(self):
+        """
+        Test that an empty provided answer falls back to the question's default.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setAnswers_empty_default()
+        """
+        self.prompt.setAnswers({'color': None, 'cont': ''})
+
+        result = self.prompt._prompt({}, [
+            {'say': 'Color', 'ask': 'color', 'default': 'blue'},
+            {'say': 'Continue', 'ask': 'cont', 'confirm': True},
+        ])
+
+        self.assertEqual(result['ansible_facts'], {'color': 'blue', 'cont': True})
+
+
+    def test_prompt_setAnswers_empty_nodefault_fails(self):
+        """
+        Test that an empty provided answer fails for a question without a default.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setAnswers_empty_nodefault_fails()
+        """
+        self.prompt.setAnswers({'color': ''})
+
+        self.assertEqual(
+            self.prompt._prompt({}, {'say': 'Color', 'ask': 'color'}),
+            {'failed': True, 'msg': "Empty answer provided for 'color' with no default."}
+        )
+
+
+    def test_prompt_setAnswers_confirm_invalid_fails(self):
+        """
+        Test that an invalid provided answer to a confirmation fails instead of repeating.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setAnswers_confirm_invalid_fails()
+        """
+        self.prompt.setAnswers({'cont': 'maybe'})
+
+        self.assertEqual(
+            self.prompt._prompt({}, {'say': 'Continue', 'ask': 'cont', 'confirm': True}),
+            {'failed': True, 'msg': "Invalid answer 'maybe' provided for confirmation 'cont'."}
+        )
+
+
+    def test_prompt_setAnswers_yaml_file(self):
+        """
+        Test that answers are read from a YAML answer file.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setAnswers_yaml_file()
+        """
+        self.prompt.setAnswers(self._writeFile('answers.yml', "city: Boston\ncont: no\n"))
+
+        result = self.prompt._prompt({}, [
+            {'say': 'City', 'ask': 'city'},
+            {'say': 'Continue', 'ask': 'cont', 'confirm': True},
+        ])
+
+        self.assertEqual(result['ansible_facts'], {'city': 'Boston', 'cont': False})
+
+
+    def test_prompt_setAnswers_json_file(self):
+        """
+        Test that answers are read from a JSON answer file.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setAnswers_json_file()
+        """
+        self.prompt.setAnswers(self._writeFile('answers.json', json.dumps({'city': 'Boston'})))
+
+        result = self.prompt._prompt({}, {'say': 'City', 'ask': 'city'})
+
+        self.assertEqual(result['ansible_facts'], {'city': 'Boston'})
+
+
+    def test_prompt_setAnswers_file_missing_fails(self):
+        """
+        Test that a missing answer file fails the prompt.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setAnswers_file_missing_fails()
+        """
+        self.prompt.setAnswers(os.path.join(self.tmpdir, 'missing.yml'))
+
+        result = self.prompt._prompt({}, {'say': 'City', 'ask': 'city'})
+
+        self.assertTrue(result['failed'])
+        self.assertTrue(result['msg'].startswith("Unable to read answer file"))
+
+
+    def test_prompt_setAnswers_file_not_mapping_fails(self):
+        """
+        Test that an answer file without a mapping fails the prompt.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setAnswers_file_not_mapping_fails()
+        """
+        path = self._writeFile('answers.yml', "- city\n- Boston\n")
+        self.prompt.setAnswers(path)
+
+        self.assertEqual(
+            self.prompt._prompt({}, {'say': 'City', 'ask': 'city'}),
+            {'failed': True, 'msg': "Answer file '%s' must contain a mapping of variable names to answers." % path}
+        )
+
+
+    def test_prompt_setAnswers_environment(self):
+        """
+        Test that answers are read from the environment, taking precedence over the answer file.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setAnswers_environment()
+        """
+        environ = {
+            'ANSIBLE_PROMPT_ANSWERS': self._writeFile('answers.yml', "city: Boston\nstate: MA\n"),
+            'ANSIBLE_PROMPT_ANSWER_city': 'Cambridge',
+        }
+
+        with mock.patch.dict(os.environ, environ):
+            result = self._getPrompt()._prompt({}, [
+                {'say': 'City', 'ask': 'city'},
+                {'say': 'State', 'ask': 'state'},
+            ])
+
+        self.assertEqual(result['ansible_facts'], {'city': 'Cambridge', 'state': 'MA'})
+
+
+
+
+    # setInteractive(interactive)
+
+    def test_prompt_setInteractive_default_used(self):
+        """
+        Test that questions without answers use their defaults when not interactive.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setInteractive_default_used()
+        """
+        self.prompt.setInteractive(False)
+
+        with mock.patch.object(self.prompt, '_readLine') as mockinput:
+            result = self.prompt._prompt({}, [
+                {'say': 'Color', 'ask': 'color', 'default': 'blue'},
+                {'say': 'Continue', 'ask': 'cont', 'confirm': False},
+            ])
+
+            self.assertFalse(mockinput.called)
+
+        self.assertEqual(result['ansible_facts'], {'color': 'blue', 'cont': False})
+
+
+    def test_prompt_setInteractive_nodefault_fails(self):
+        """
+        Test that a question without an answer or default fails when not interactive.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setInteractive_nodefault_fails()
+        """
+        self.prompt.setInteractive(False)
+
+        self.assertEqual(
+            self.prompt._prompt({}, {'say': 'City', 'ask': 'city'}),
+            {'failed': True, 'msg': "No answer provided for 'city' in non-interactive mode."}
+        )
+
+
+    def test_prompt_setInteractive_environment(self):
+        """
+        Test that interactivity can be disabled from the environment.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setInteractive_environment()
+        """
+        with mock.patch.dict(os.environ, {'ANSIBLE_PROMPT_INTERACTIVE': 'false'}):
+            self.assertFalse(self._getPrompt()._interactive)
+
+        with mock.patch.dict(os.environ, {'ANSIBLE_PROMPT_INTERACTIVE': 'yes'}):
+            self.assertTrue(self._getPrompt()._interactive)
+
+
+
+
+    # setAnswerStore(store)
+
+    def _getHostPrompts(self, count, lines=()):
+        """
+        Return prompts for several hosts running the same task, sharing an answer store and a terminal.
+
+        :kwarg count: the number of hosts
+        :kwarg lines: the lines of input the user types on the terminal
+
+        .. versionadded:: 1.1.0
+        .. function:: _getHostPrompts(count[, lines=()])
+        """
+        task = AnsibleTask()
+        task._uuid = 'task-uuid'
+
+        store = AnswerStore(os.path.join(self.tmpdir, 'answers.json'))
+        lock = TerminalLock(os.path.join(self.tmpdir, 'tty.lock'))
+        terminal = io.StringIO("".join("%s\n" % line for line in lines))
+        prompts = []
+
+        for i in range(count):
+            prompt = Prompt(
+                task=task,
+                connection=None,
+                play_context=AnsiblePlayContext(),
+                loader=None,
+                templar=None,
+                shared_loader_obj=None
+            )
+
+            prompt.setOutput(self.outstr)
+            prompt.setAnswerStore(store)
+            prompt.setTerminalLock(lock)
+            prompt.setInput(terminal)
+            prompts.append(prompt)
+
+        return prompts
+
+
+    def test_prompt_setAnswerStore_asks_once(self):
+        """
+        Test that a question is asked once and its answer reused for every host running the task.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setAnswerStore_asks_once()
+        """
+        msg = [
+            {'say': 'Release', 'ask': 'release'},
+            {'say': 'Continue', 'ask': 'cont', 'confirm': False},
+        ]
+
+        for prompt in self._getHostPrompts(20, [' 1.2.3 ', 'y']):
+            result = prompt._prompt({}, msg)
+
+            self.assertEqual(result['ansible_facts'], {'release': '1.2.3', 'cont': True})
+
+        self.assertEqual(self.outstr.getvalue(), "Release? Continue [yN]? ")
+
+
+    def test_prompt_setAnswerStore_once_false(self):
+        """
+        Test that questions with 'once' disabled are asked for every host.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setAnswerStore_once_false()
+        """
+        msg = {'say': 'Hostname', 'ask': 'hostname', 'once': False}
+
+        results = [prompt._prompt({}, msg) for prompt in self._getHostPrompts(3, ['alpha', 'bravo', 'charlie'])]
+
+        self.assertEqual(
+            [r['ansible_facts']['hostname'] for r in results],
+            ['alpha', 'bravo', 'charlie']
+        )
+
+
+    def test_prompt_setAnswerStore_distinct_questions(self):
+        """
+        Test that answers are only shared between identical questions.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setAnswerStore_distinct_questions()
+        """
+        alpha, bravo = self._getHostPrompts(2, ['one', 'two'])
+
+        alpha._prompt({}, {'say': 'Alpha value', 'ask': 'value'})
+        result = bravo._prompt({}, {'say': 'Bravo value', 'ask': 'value'})
+
+        self.assertEqual(self.outstr.getvalue(), "Alpha value? Bravo value? ")
+
+        self.assertEqual(result['ansible_facts']['value'], 'two')
+
+
+    def test_prompt_once_say_fails(self):
+        """
+        Test that 'once' is rejected for non-question prompts.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_once_say_fails()
+        """
+        self.assertEqual(
+            self.prompt._prompt({}, {'say': 'Hello', 'once': True}),
+            {'failed': True, 'msg': "Unexpected 'once' in non-question prompt."}
+        )
+
+
+
+
+    # AnswerStore
+
+    def test_answerstore_persists(self):
+        """
+        Test that stored answers are visible to other store instances for the same file.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_answerstore_persists()
+        """
+        path = os.path.join(self.tmpdir, 'answers.json')
+
+        with AnswerStore(path).lock() as store:
+            self.assertEqual(store.get('a'), None)
+            store.set('a', 'alpha')
+            store.set('b', 'bravo')
+
+        self.assertEqual(AnswerStore(path).get('a'), 'alpha')
+        self.assertEqual(AnswerStore(path).get('b'), 'bravo')
+
+
+    def test_answerstore_forRun_private(self):
+        """
+        Test that the store for a run lives in a directory only the current user can access.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_answerstore_forRun_private()
+        """
+        with mock.patch('tempfile.gettempdir', return_value=self.tmpdir):
+            with mock.patch.dict(AnswerStore._runStores, clear=True):
+                store = AnswerStore.forRun()
+
+        directory = os.path.dirname(store.path)
+
+        self.assertEqual(os.path.basename(store.path), '%d.json' % os.getppid())
+        self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+
+
+    def test_answerstore_forRun_existing_directory(self):
+        """
+        Test that a private directory already created by another worker is reused.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_answerstore_forRun_existing_directory()
+        """
+        directory = os.path.join(self.tmpdir, 'ansible-prompt-%d' % os.getuid())
+        os.makedirs(directory, 0o700)
+
+        with mock.patch('tempfile.gettempdir', return_value=self.tmpdir):
+            with mock.patch.dict(AnswerStore._runStores, clear=True):
+                store = AnswerStore.forRun()
+
+        self.assertEqual(os.path.dirname(store.path), directory)
+
+
+    def test_answerstore_forRun_removes_finished_runs(self):
+        """
+        Test that stores and locks left by runs that have ended are removed, and those of running ones are kept.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_answerstore_forRun_removes_finished_runs()
+        """
+        directory = os.path.join(self.tmpdir, 'ansible-prompt-%d' % os.getuid())
+        os.makedirs(directory, 0o700)
+
+        finished = subprocess.Popen([sys.executable, '-c', ''])
+        finished.wait()
+
+        stale = ['%d.json' % finished.pid, '%d.json.lock' % finished.pid, '%d.tty.lock' % finished.pid]
+        kept = ['%d.json' % os.getpid(), '%d.tty.lock' % os.getppid(), 'notes.txt']
+
+        for name in stale + kept:
+            open(os.path.join(directory, name), 'w').close()
+
+        with mock.patch('tempfile.gettempdir', return_value=self.tmpdir):
+            with mock.patch.dict(AnswerStore._runStores, clear=True):
+                AnswerStore.forRun()
+
+        self.assertEqual(sorted(os.listdir(directory)), sorted(kept))
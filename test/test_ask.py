@@ -23,12 +23,21 @@ Test suite for the Ansible prompt action plugin.
 """
 
 import ansible
-import mock
-import StringIO
+import errno
+import io
+import os
+import re
+import shutil
 import sys
+import tempfile
 import unittest
 
+from unittest import mock
+
 from action_plugins import Prompt
+from action_plugins.prompt import AnswerStore, DisplayInput, DisplayOutput, InputSession, TerminalLock, display
+
+from ansible.errors import AnsiblePromptInterrupt, AnsiblePromptNoninteractive
 
 from ansible.playbook.task import Task as AnsibleTask
 from ansible.playbook.play_context import PlayContext as AnsiblePlayContext
@@ -49,9 +58,12 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 0.2.0
         .. function:: setUp()
         """
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
         self.prompt = self._getPrompt()
 
-        self.outstr = StringIO.StringIO()
+        self.outstr = io.StringIO()
         self.prompt.setOutput(self.outstr)
 
         self.response = {
@@ -70,7 +82,7 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 0.2.0
         .. function:: _getPrompt()
         """
-        return Prompt(
+        prompt = Prompt(
             task=AnsibleTask(),
             connection=None,
             play_context=AnsiblePlayContext(),
@@ -78,6 +90,29 @@ class TestAsk(unittest.TestCase):
             templar=None,
             shared_loader_obj=None
         )
+        prompt.setAnswerStore(AnswerStore(os.path.join(self.tmpdir, 'answers.json')))
+        prompt.setTerminalLock(TerminalLock(os.path.join(self.tmpdir, 'tty.lock')))
+        prompt.setInput(io.StringIO())
+
+        return prompt
+
+
+    def _typeInput(self, lines, prompt=None):
+        """
+        Feed lines to a prompt as though the user typed them, capturing the questions displayed.
+
+        :kwarg lines: the lines of input to type
+        :kwarg prompt: the prompt to type into (defaults to the test's prompt)
+
+        :returns: the stream the prompt's messages and questions are displayed on
+
+        .. versionadded:: 1.1.0
+        .. function:: _typeInput(lines[, prompt=None])
+        """
+        prompt = prompt or self.prompt
+        prompt.setInput(io.StringIO("".join("%s\n" % line for line in lines)))
+
+        return prompt._outstr
 
 
 
@@ -91,7 +126,16 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 0.2.0
         .. function:: test_prompt_init_default_instr_valid()
         """
-        self.assertEqual(self._getPrompt()._instr, '/dev/tty')
+        prompt = Prompt(
+            task=AnsibleTask(),
+            connection=None,
+            play_context=AnsiblePlayContext(),
+            loader=None,
+            templar=None,
+            shared_loader_obj=None
+        )
+
+        self.assertEqual(prompt._instr, '/dev/tty')
 
 
 
@@ -107,18 +151,12 @@ class TestAsk(unittest.TestCase):
         """
         self.prompt.setInput()
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._instr,
             '/dev/tty'
         )
 
-        with mock.patch('__builtin__.raw_input', return_value='mocked input') as mockinput:
-            result = self.prompt._prompt({}, {
-                'say': 'test',
-                'ask': 'varname'
-            })
-
-            self.assertEquals(result['ansible_facts']['varname'], 'mocked input')
+        self.assertEqual(self.prompt._input.source, '/dev/tty')
 
 
     def test_prompt_setInput_stringio_valid(self):
@@ -128,19 +166,332 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 0.2.0
         .. function:: test_setInput_stringio_valid()
         """
-        instr = StringIO.StringIO()
+        instr = io.StringIO("mocked input\n")
         self.prompt.setInput(instr)
 
-        self.assertEquals(instr, self.prompt._instr)
-        self.assertEquals(instr.getvalue(), "")
+        self.assertEqual(instr, self.prompt._instr)
+
+        result = self.prompt._prompt({}, {
+            'say': 'test',
+            'ask': 'varname'
+        })
+
+        self.assertEqual(result['ansible_facts']['varname'], 'mocked input')
+        self.assertEqual(instr.read(), "")
+
+
+    def test_prompt_setInput_path_opened_once(self):
+        """
+        Test that an input path is opened once for many questions, retries, and prompts.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setInput_path_opened_once()
+        """
+        InputSession.closeAll()
+
+        responses = "\nfoobar\nY\n" * 50
+        opened = []
+
+        def open_helper(path, *args, **kwargs):
+            """
+            Records opens of the fake terminal, opening anything else normally.
+            """
+            if path != '/dev/fake-tty':
+                return open(path, *args, **kwargs)
+
+            opened.append(path)
+            return io.StringIO(responses)
+
+        with mock.patch('action_plugins.prompt.open', create=True, side_effect=open_helper):
+            for i in range(10):
+                prompt = self._getPrompt()
+                prompt.setInput('/dev/fake-tty')
+                prompt.setOutput(self.outstr)
+
+                result = prompt._prompt({}, [
+                    {'say': 'First', 'ask': 'first', 'once': False},
+                    {'say': 'Continue', 'ask': 'cont', 'confirm': False, 'once': False},
+                ] * 5)
+
+                self.assertEqual(result['ansible_facts'], {'first': 'foobar', 'cont': True})
+
+        self.assertEqual(opened, ['/dev/fake-tty'])
+
+        InputSession.closeAll()
+
+
+    def test_prompt_setInput_many_answers(self):
+        """
+        Test that thousands of answers are read from the input without touching sys.stdin.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setInput_many_answers()
+        """
+        msg = [{'ask': 'answer_%d' % i, 'once': False} for i in range(5000)]
+
+        self._typeInput(['answer %d' % i for i in range(5000)])
+
+        with mock.patch('sys.stdin', new=None):
+            result = self.prompt._prompt({}, msg)
+
+        self.assertEqual(len(result['ansible_facts']), 5000)
+        self.assertEqual(result['ansible_facts']['answer_4999'], 'answer 4999')
+
+
+    def test_prompt_setInput_closeAll(self):
+        """
+        Test that shared input sessions are closed and reopened on next use.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setInput_closeAll()
+        """
+        InputSession.closeAll()
+
+        handle = mock.Mock()
+
+        with mock.patch('action_plugins.prompt.open', create=True, return_value=handle) as mockopen:
+            session = InputSession.get('/dev/fake-tty')
+
+            self.assertTrue(session is InputSession.get('/dev/fake-tty'))
+            self.assertEqual(session.stream(), handle)
+
+            InputSession.closeAll()
+
+            handle.close.assert_called_once_with()
+            self.assertFalse(session is InputSession.get('/dev/fake-tty'))
+            self.assertEqual(mockopen.call_count, 1)
+
+
+    def test_prompt_setInput_stream_not_closed(self):
+        """
+        Test that input streams provided by the caller are never closed by the plugin.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setInput_stream_not_closed()
+        """
+        handle = mock.Mock()
+
+        session = InputSession.get(handle)
+        session.close()
+
+        self.assertEqual(session.stream(), handle)
+        self.assertFalse(handle.close.called)
+
+
+    def _withoutTerminal(self):
+        """
+        Point the test's prompt at a terminal that cannot be opened, as when there is no controlling terminal.
+
+        :returns: a patch of ``open`` failing for the terminal
+
+        .. versionadded:: 1.1.0
+        .. function:: _withoutTerminal()
+        """
+        InputSession.closeAll()
+        self.addCleanup(InputSession.closeAll)
+
+        self.prompt.setInput('/dev/fake-tty')
+
+        def open_helper(path, *args, **kwargs):
+            """
+            Fails to open the fake terminal, opening anything else normally.
+            """
+            if path != '/dev/fake-tty':
+                return open(path, *args, **kwargs)
+
+            raise OSError(errno.ENXIO, "No such device or address")
+
+        return mock.patch('action_plugins.prompt.open', create=True, side_effect=open_helper)
+
+
+    def test_prompt_setInput_no_terminal_fails(self):
+        """
+        Test that questions fail cleanly rather than using their defaults when there is no terminal to ask on.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setInput_no_terminal_fails()
+        """
+        with self._withoutTerminal():
+            confirm = self.prompt._prompt({}, {'say': 'Really destroy production', 'ask': 'destroy', 'confirm': True})
+            name = self.prompt._prompt({}, {'ask': 'name'})
+
+        self.assertEqual(confirm, {
+            'failed': True,
+            'msg': "No terminal available to ask 'destroy'; provide an answer, or set "
+                   "ANSIBLE_PROMPT_INTERACTIVE=false to use its default."
+        })
+        self.assertEqual(name, {
+            'failed': True,
+            'msg': "No terminal available to ask 'name'; provide an answer with ANSIBLE_PROMPT_ANSWER_name or in the "
+                   "ANSIBLE_PROMPT_ANSWERS file."
+        })
+        self.assertEqual(self.outstr.getvalue(), "")
+
+
+    def test_prompt_setInput_no_terminal_answers_default(self):
+        """
+        Test that questions without a provided answer use their defaults when there is no terminal to ask on.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setInput_no_terminal_answers_default()
+        """
+        self.prompt.setAnswers({'name': 'Andrew'})
+
+        with self._withoutTerminal():
+            result = self.prompt._prompt({}, [
+                {'ask': 'name'},
+                {'ask': 'first', 'default': 'a'},
+                {'ask': 'last', 'default': 'b'},
+            ])
+
+        self.assertEqual(result['ansible_facts'], {'name': 'Andrew', 'first': 'a', 'last': 'b'})
+        self.assertEqual(self.outstr.getvalue(), "")
+
+
+    def test_prompt_setInput_read_error_fails(self):
+        """
+        Test that an error reading the input fails the task instead of escaping as an exception.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setInput_read_error_fails()
+        """
+        handle = mock.Mock()
+        handle.fileno.side_effect = io.UnsupportedOperation()
+        handle.readline.side_effect = OSError(errno.EIO, "Input/output error")
+
+        self.prompt.setInput(handle)
+
+        result = self.prompt._prompt({}, {'ask': 'name'})
+
+        self.assertEqual(result, {'failed': True, 'msg': "Unable to read an answer: [Errno 5] Input/output error"})
+
+
+    def test_prompt_setInput_detached_worker_default(self):
+        """
+        Test that task workers detached from the terminal default to asking through the controller's display.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setInput_detached_worker_default()
+        """
+        with mock.patch.object(display, '_final_q', new=mock.Mock(), create=True), \
+                mock.patch('action_plugins.prompt.os.getsid', return_value=os.getpid()):
+            self.prompt.setInput()
+            self.prompt.setOutput()
+
+        self.assertTrue(isinstance(self.prompt._input, DisplayInput))
+        self.assertTrue(isinstance(self.prompt._outstr, DisplayOutput))
+
+        with mock.patch.object(display, '_final_q', new=mock.Mock(), create=True), \
+                mock.patch('action_plugins.prompt.os.getsid', return_value=os.getpid() + 1):
+            self.prompt.setInput()
+            self.prompt.setOutput()
+
+        self.assertEqual(self.prompt._instr, '/dev/tty')
+        self.assertEqual(self.prompt._outstr, sys.stdout)
+
+
+    def test_prompt_setInput_display_asks_controller(self):
+        """
+        Test that questions asked through the display are shown and answered by the controller, after any messages.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setInput_display_asks_controller()
+        """
+        self.prompt.setInput(DisplayInput())
+        self.prompt.setOutput(DisplayOutput())
+
+        controller = mock.Mock()
+        controller.prompt_until.side_effect = [b"Andrew", b"secret"]
+
+        with mock.patch.object(display, 'display', new=controller.display), \
+                mock.patch.object(display, 'prompt_until', new=controller.prompt_until):
+            result = self.prompt._prompt({}, [
+                "Hello",
+                {'say': 'Name', 'ask': 'name'},
+                {'say': 'Password', 'ask': 'password', 'secret': True},
+            ])
+
+        self.assertEqual(result['ansible_facts'], {'name': 'Andrew', 'password': 'secret'})
+        self.assertEqual(controller.mock_calls, [
+            mock.call.display("Hello\n", newline=False),
+            mock.call.prompt_until("Name? ", private=False, seconds=None),
+            mock.call.prompt_until("Password? ", private=True, seconds=None),
+        ])
+
+
+    def test_prompt_setInput_display_timeout(self):
+        """
+        Test that a question asked through the display uses its default once the timeout has passed.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setInput_display_timeout()
+        """
+        self.prompt.setInput(DisplayInput())
+        self.prompt.setOutput(DisplayOutput())
+
+        def prompt_until(msg, private=False, seconds=None):
+            """
+            Returns partially typed input once the timeout passes, as the controller does.
+            """
+            self.assertEqual(seconds, 5)
+            clock.return_value += seconds
+            return b"An"
+
+        with mock.patch('action_plugins.prompt.time.time', return_value=1000.0) as clock, \
+                mock.patch.object(display, 'display'), \
+                mock.patch.object(display, 'prompt_until', side_effect=prompt_until):
+            result = self.prompt._prompt({}, {'say': 'Name', 'ask': 'name', 'default': 'Nobody', 'timeout': 5})
+
+        self.assertEqual(result['ansible_facts']['name'], 'Nobody')
+
+
+    def test_prompt_setInput_display_controller_error_fails(self):
+        """
+        Test that an error the controller reports while asking fails the task.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setInput_display_controller_error_fails()
+        """
+        self.prompt.setInput(DisplayInput())
+        self.prompt.setOutput(DisplayOutput())
+
+        with mock.patch.object(display, 'display'), \
+                mock.patch.object(display, 'prompt_until', side_effect=AnsiblePromptInterrupt('user interrupt')):
+            result = self.prompt._prompt({}, {'ask': 'name'})
+
+        self.assertEqual(result, {'failed': True, 'msg': "Unable to read an answer: user interrupt"})
+
+
+    def test_prompt_setInput_display_controller_no_terminal(self):
+        """
+        Test that a controller without a terminal is treated like a missing terminal, using defaults only for
+        questions left unanswered by provided answers.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setInput_display_controller_no_terminal()
+        """
+        noninteractive = AnsiblePromptNoninteractive('stdin is not interactive')
+
+        with mock.patch.object(display, 'display'), \
+                mock.patch.object(display, 'prompt_until', side_effect=noninteractive) as mockprompt:
+            self.prompt.setInput(DisplayInput())
+            failed = self.prompt._prompt({}, {'ask': 'color', 'default': 'blue'})
 
-        with mock.patch('__builtin__.raw_input', return_value='mocked input') as mockinput:
-            result = self.prompt._prompt({}, {
-                'say': 'test',
-                'ask': 'varname'
-            })
+            self.prompt.setInput(DisplayInput())
+            self.prompt.setAnswers({'name': 'Andrew'})
+            answered = self.prompt._prompt({}, [
+                {'ask': 'name'},
+                {'ask': 'color', 'default': 'blue'},
+                {'ask': 'size', 'default': 'large'},
+            ])
 
-            self.assertEquals(result['ansible_facts']['varname'], 'mocked input')
+        self.assertEqual(failed, {
+            'failed': True,
+            'msg': "No terminal available to ask 'color'; provide an answer, or set "
+                   "ANSIBLE_PROMPT_INTERACTIVE=false to use its default."
+        })
+        self.assertEqual(answered['ansible_facts'], {'name': 'Andrew', 'color': 'blue', 'size': 'large'})
+        self.assertEqual(mockprompt.call_count, 2)
 
 
 
@@ -156,7 +507,7 @@ class TestAsk(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Parameter 'ask' must provide variable name.  Empty received."
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, {
                 "ask": None
             }),
@@ -174,7 +525,7 @@ class TestAsk(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Parameter 'ask' must provide variable name.  Empty received."
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, {
                 "ask": "   "
             }),
@@ -192,7 +543,7 @@ class TestAsk(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Invalid character in 'ask' parameter 'hello world'."
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, {
                 "ask": "hello world"
             }),
@@ -210,7 +561,7 @@ class TestAsk(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Invalid character in 'ask' parameter 'hello-world'."
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, {
                 "ask": "hello-world"
             }),
@@ -228,7 +579,7 @@ class TestAsk(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Invalid character in 'ask' parameter 'hello(world'."
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, {
                 "ask": "hello(world"
             }),
@@ -246,7 +597,7 @@ class TestAsk(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Invalid character in 'ask' parameter 'hello.world'."
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, {
                 "ask": "hello.world"
             }),
@@ -261,13 +612,14 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 0.2.0
         .. function:: test_prompt_ask_var_simple_valid()
         """
-        with mock.patch('__builtin__.raw_input', return_value='mocked input') as mockinput:
-            result = self.prompt._prompt({}, {
-                'say': 'test',
-                'ask': 'varname'
-            })
+        self._typeInput(['mocked input'])
 
-            self.assertEquals(result['ansible_facts']['varname'], 'mocked input')
+        result = self.prompt._prompt({}, {
+            'say': 'test',
+            'ask': 'varname'
+        })
+
+        self.assertEqual(result['ansible_facts']['varname'], 'mocked input')
 
 
     def test_prompt_ask_var_numbers_valid(self):
@@ -277,13 +629,14 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 0.2.0
         .. function:: test_prompt_ask_var_numbers_valid()
         """
-        with mock.patch('__builtin__.raw_input', return_value='mocked input') as mockinput:
-            result = self.prompt._prompt({}, {
-                'say': 'test',
-                'ask': '12345'
-            })
+        self._typeInput(['mocked input'])
+
+        result = self.prompt._prompt({}, {
+            'say': 'test',
+            'ask': '12345'
+        })
 
-            self.assertEquals(result['ansible_facts']['12345'], 'mocked input')
+        self.assertEqual(result['ansible_facts']['12345'], 'mocked input')
 
 
     def test_prompt_ask_var_unicode_valid(self):
@@ -293,13 +646,14 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 0.2.0
         .. function:: test_prompt_ask_var_unicode_valid()
         """
-        with mock.patch('__builtin__.raw_input', return_value='mocked input') as mockinput:
-            result = self.prompt._prompt({}, {
-                'say': 'test',
-                'ask': u'varname'
-            })
+        self._typeInput(['mocked input'])
+
+        result = self.prompt._prompt({}, {
+            'say': 'test',
+            'ask': u'varname'
+        })
 
-            self.assertEquals(result['ansible_facts']['varname'], 'mocked input')
+        self.assertEqual(result['ansible_facts']['varname'], 'mocked input')
 
 
     def test_prompt_ask_var_underscore_valid(self):
@@ -309,13 +663,14 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 0.2.0
         .. function:: test_prompt_ask_var_underscore_valid()
         """
-        with mock.patch('__builtin__.raw_input', return_value='mocked input') as mockinput:
-            result = self.prompt._prompt({}, {
-                'say': 'test',
-                'ask': 'var_name'
-            })
+        self._typeInput(['mocked input'])
 
-            self.assertEquals(result['ansible_facts']['var_name'], 'mocked input')
+        result = self.prompt._prompt({}, {
+            'say': 'test',
+            'ask': 'var_name'
+        })
+
+        self.assertEqual(result['ansible_facts']['var_name'], 'mocked input')
 
 
     def test_prompt_ask_say_missing_valid(self):
@@ -325,12 +680,13 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 0.2.0
         .. function:: test_prompt_ask_say_missing_valid()
         """
-        with mock.patch('__builtin__.raw_input', return_value='mocked input') as mockinput:
-            result = self.prompt._prompt({}, {
-                'ask': 'varname'
-            })
+        self._typeInput(['mocked input'])
+
+        result = self.prompt._prompt({}, {
+            'ask': 'varname'
+        })
 
-            self.assertEquals(result['ansible_facts']['varname'], 'mocked input')
+        self.assertEqual(result['ansible_facts']['varname'], 'mocked input')
 
 
     def test_prompt_msg_newline_withask_fails(self):
@@ -343,7 +699,7 @@ class TestAsk(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Option 'newline' is not compatible with option 'ask'."
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, {
                 "ask": "test_var",
                 "newline": False
@@ -362,7 +718,7 @@ class TestAsk(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Option 'align' is not compatible with option 'ask'."
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, {
                 "ask": "test_var",
                 "align": "center"
@@ -381,7 +737,7 @@ class TestAsk(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Unexpected 'default' in non-question prompt."
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, {
                 "say": "Hello World",
                 "default": "foobar"
@@ -400,7 +756,7 @@ class TestAsk(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Unexpected 'postfix' in non-question prompt."
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, {
                 "say": "Hello World",
                 "postfix": "foobar"
@@ -419,7 +775,7 @@ class TestAsk(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Unexpected 'trim' in non-question prompt."
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, {
                 "say": "Hello World",
                 "trim": False
@@ -438,7 +794,7 @@ class TestAsk(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Unexpected 'confirm' in non-question prompt."
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, {
                 "say": "Hello World",
                 "confirm": True
@@ -457,7 +813,7 @@ class TestAsk(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Unexpected 'default' provided with confirmation question."
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, {
                 "say": "Continue",
                 "ask": "result",
@@ -475,28 +831,14 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 1.0.0
         .. function:: test_prompt_msg_noask_postfix_fails()
         """
-        global counter
-        counter = 0
-
-        def return_helper(*args, **kwargs):
-            """
-            Returns a different value the second time called.
-            """
-            global counter
-
-            counter = counter + 1
-            if counter > 1:
-                return "foobar"
+        stdout = self._typeInput(["", "foobar"])
 
-            return ""
+        result = self.prompt._prompt({}, {
+            'ask': 'varname'
+        })
 
-        with mock.patch('__builtin__.raw_input', side_effect=return_helper) as mockinput:
-            result = self.prompt._prompt({}, {
-                'ask': 'varname'
-            })
-
-            self.assertEqual(mockinput.call_count, 2)
-            self.assertEquals(result['ansible_facts']['varname'], 'foobar')
+        self.assertEqual(stdout.getvalue(), "? ? ")
+        self.assertEqual(result['ansible_facts']['varname'], 'foobar')
 
 
     def test_prompt_msg_shows_default(self):
@@ -506,17 +848,16 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 1.0.0
         .. function:: test_prompt_msg_shows_default()
         """
-        with mock.patch('__builtin__.raw_input', return_value="Andrew") as mockinput:
-            result = self.prompt._prompt(self.response, {
-                "say": "First Name",
-                "ask": "first_name",
-                "default": "foobar"
-            })
+        stdout = self._typeInput(["Andrew"])
 
-            args, kwargs = mockinput.call_args
+        result = self.prompt._prompt(self.response, {
+            "say": "First Name",
+            "ask": "first_name",
+            "default": "foobar"
+        })
 
-            self.assertEquals("First Name [foobar]? ", args[0])
-            self.assertEquals(result['ansible_facts']['first_name'], 'Andrew')
+        self.assertEqual(stdout.getvalue(), "First Name [foobar]? ")
+        self.assertEqual(result['ansible_facts']['first_name'], 'Andrew')
 
 
 
@@ -527,17 +868,16 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 1.0.0
         .. function:: test_prompt_msg_defaults()
         """
-        with mock.patch('__builtin__.raw_input', return_value="") as mockinput:
-            result = self.prompt._prompt(self.response, {
-                "say": "First Name",
-                "ask": "first_name",
-                "default": "foobar"
-            })
+        stdout = self._typeInput([""])
 
-            args, kwargs = mockinput.call_args
+        result = self.prompt._prompt(self.response, {
+            "say": "First Name",
+            "ask": "first_name",
+            "default": "foobar"
+        })
 
-            self.assertEquals("First Name [foobar]? ", args[0])
-            self.assertEquals(result['ansible_facts']['first_name'], 'foobar')
+        self.assertEqual(stdout.getvalue(), "First Name [foobar]? ")
+        self.assertEqual(result['ansible_facts']['first_name'], 'foobar')
 
 
     def test_prompt_msg_postfix_custom(self):
@@ -547,18 +887,17 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 1.0.0
         .. function:: test_prompt_msg_postfix_custom()
         """
-        with mock.patch('__builtin__.raw_input', return_value="") as mockinput:
-            result = self.prompt._prompt(self.response, {
-                "say": "First Name",
-                "ask": "first_name",
-                "default": "foobar",
-                "postfix": "!?!?"
-            })
+        stdout = self._typeInput([""])
 
-            args, kwargs = mockinput.call_args
+        result = self.prompt._prompt(self.response, {
+            "say": "First Name",
+            "ask": "first_name",
+            "default": "foobar",
+            "postfix": "!?!?"
+        })
 
-            self.assertEquals("First Name [foobar]!?!? ", args[0])
-            self.assertEquals(result['ansible_facts']['first_name'], 'foobar')
+        self.assertEqual(stdout.getvalue(), "First Name [foobar]!?!? ")
+        self.assertEqual(result['ansible_facts']['first_name'], 'foobar')
 
 
     def test_prompt_msg_trim_default(self):
@@ -568,13 +907,14 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 1.0.0
         .. function:: test_prompt_msg_trim_default()
         """
-        with mock.patch('__builtin__.raw_input', return_value="  trim  value  ") as mockinput:
-            result = self.prompt._prompt(self.response, {
-                "say": "First Name",
-                "ask": "first_name",
-            })
+        self._typeInput(["  trim  value  "])
 
-            self.assertEquals(result['ansible_facts']['first_name'], 'trim  value')
+        result = self.prompt._prompt(self.response, {
+            "say": "First Name",
+            "ask": "first_name",
+        })
+
+        self.assertEqual(result['ansible_facts']['first_name'], 'trim  value')
 
 
     def test_prompt_msg_trim_off_valid(self):
@@ -584,14 +924,15 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 1.0.0
         .. function:: test_prompt_msg_trim_off_valid()
         """
-        with mock.patch('__builtin__.raw_input', return_value="  trim  value  ") as mockinput:
-            result = self.prompt._prompt(self.response, {
-                "say": "First Name",
-                "ask": "first_name",
-                "trim": False
-            })
+        self._typeInput(["  trim  value  "])
+
+        result = self.prompt._prompt(self.response, {
+            "say": "First Name",
+            "ask": "first_name",
+            "trim": False
+        })
 
-            self.assertEquals(result['ansible_facts']['first_name'], '  trim  value  ')
+        self.assertEqual(result['ansible_facts']['first_name'], '  trim  value  ')
 
 
     def test_prompt_msg_confirm_invalid_repeats(self):
@@ -601,33 +942,16 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 1.0.0
         .. function:: test_prompt_msg_confirm_invalid_repeats()
         """
-        global counter
-        counter = 0
-
-        def return_helper(*args, **kwargs):
-            """
-            Returns a different value the second time called.
-            """
-            global counter
-
-            counter = counter + 1
-            if counter > 1:
-                return "Y"
-
-            return "foobar"
-
-        with mock.patch('__builtin__.raw_input', side_effect=return_helper) as mockinput:
-            result = self.prompt._prompt(self.response, {
-                "say": "Continue",
-                "ask": "result",
-                "confirm": False
-            })
+        stdout = self._typeInput(["foobar", "Y"])
 
-            args, kwargs = mockinput.call_args
+        result = self.prompt._prompt(self.response, {
+            "say": "Continue",
+            "ask": "result",
+            "confirm": False
+        })
 
-            self.assertEquals("Continue [yN]? ", args[0])
-            self.assertEqual(mockinput.call_count, 2)
-            self.assertEquals(result['ansible_facts']['result'], True)
+        self.assertEqual(stdout.getvalue(), "Continue [yN]? Continue [yN]? ")
+        self.assertEqual(result['ansible_facts']['result'], True)
 
 
     def test_prompt_msg_confirm_blank_default_yes(self):
@@ -637,17 +961,16 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 1.0.0
         .. function:: test_prompt_msg_confirm_blank_default_yes()
         """
-        with mock.patch('__builtin__.raw_input', return_value="") as mockinput:
-            result = self.prompt._prompt(self.response, {
-                "say": "Continue",
-                "ask": "result",
-                "confirm": True
-            })
+        stdout = self._typeInput([""])
 
-            args, kwargs = mockinput.call_args
+        result = self.prompt._prompt(self.response, {
+            "say": "Continue",
+            "ask": "result",
+            "confirm": True
+        })
 
-            self.assertEquals("Continue [Yn]? ", args[0])
-            self.assertEquals(result['ansible_facts']['result'], True)
+        self.assertEqual(stdout.getvalue(), "Continue [Yn]? ")
+        self.assertEqual(result['ansible_facts']['result'], True)
 
 
     def test_prompt_msg_confirm_blank_default_no(self):
@@ -657,17 +980,16 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 1.0.0
         .. function:: test_prompt_msg_confirm_blank_default_no()
         """
-        with mock.patch('__builtin__.raw_input', return_value="") as mockinput:
-            result = self.prompt._prompt(self.response, {
-                "say": "Continue",
-                "ask": "result",
-                "confirm": False
-            })
+        stdout = self._typeInput([""])
 
-            args, kwargs = mockinput.call_args
+        result = self.prompt._prompt(self.response, {
+            "say": "Continue",
+            "ask": "result",
+            "confirm": False
+        })
 
-            self.assertEquals("Continue [yN]? ", args[0])
-            self.assertEquals(result['ansible_facts']['result'], False)
+        self.assertEqual(stdout.getvalue(), "Continue [yN]? ")
+        self.assertEqual(result['ansible_facts']['result'], False)
 
 
     def test_prompt_msg_confirm_capital_valid(self):
@@ -677,14 +999,466 @@ class TestAsk(unittest.TestCase):
         .. versionadded:: 1.0.0
         .. function:: test_prompt_msg_confirm_capital_valid()
         """
-        with mock.patch('__builtin__.raw_input', return_value="Y") as mockinput:
-            result = self.prompt._prompt(self.response, {
-                "say": "Continue",
-                "ask": "result",
-                "confirm": False
-            })
+        stdout = self._typeInput(["Y"])
+
+        result = self.prompt._prompt(self.response, {
+            "say": "Continue",
+            "ask": "result",
+            "confirm": False
+        })
+
+        self.assertEqual(stdout.getvalue(), "Continue [yN]? ")
+        self.assertEqual(result['ansible_facts']['result'], True)
+
+
+
+
+    # timeout
+
+    def _getPipe(self, content=""):
+        """
+        Return the read end of a pipe holding the given content, closed after the test.
+
+        .. versionadded:: 1.1.0
+        .. function:: _getPipe([content=""])
+        """
+        readfd, writefd = os.pipe()
+
+        os.write(writefd, content.encode('utf-8'))
+
+        reader = os.fdopen(readfd, 'r')
+
+        self.addCleanup(reader.close)
+        self.addCleanup(os.close, writefd)
+
+        return reader
+
 
-            args, kwargs = mockinput.call_args
+    def test_prompt_timeout_default_used(self):
+        """
+        Test that a question's default is used when no answer arrives before its timeout.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_timeout_default_used()
+        """
+        self.prompt.setInput(self._getPipe())
+
+        result = self.prompt._prompt({}, {
+            'say': 'Color',
+            'ask': 'color',
+            'default': 'blue',
+            'timeout': 0.05
+        })
+
+        self.assertEqual(self.outstr.getvalue(), "Color [blue]? \n")
+
+        self.assertEqual(result['ansible_facts']['color'], 'blue')
+        self.assertEqual(result['prompt_timed_out'], ['color'])
+        self.assertTrue(result['prompt_wait']['color'] >= 0.05)
+
+
+    def test_prompt_timeout_nodefault_fails(self):
+        """
+        Test that a question without a default fails when its timeout expires.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_timeout_nodefault_fails()
+        """
+        self.prompt.setInput(self._getPipe())
+
+        result = self.prompt._prompt({}, {'say': 'Color', 'ask': 'color', 'timeout': 0.05})
+
+        self.assertTrue(result['failed'])
+        self.assertTrue(result['msg'].startswith("Timed out after 0."))
+        self.assertTrue(result['msg'].endswith(" seconds waiting for 'color'."))
+
+
+    def test_prompt_timeout_answered(self):
+        """
+        Test that answers arriving before the timeout are used, including after invalid confirmations.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_timeout_answered()
+        """
+        self.prompt.setInput(self._getPipe("  Andrew \nmaybe\ny\n"))
+
+        result = self.prompt._prompt({}, [
+            {'say': 'First Name', 'ask': 'first_name', 'timeout': 5},
+            {'say': 'Continue', 'ask': 'cont', 'confirm': False, 'timeout': 5},
+        ])
+
+        self.assertEqual(self.outstr.getvalue(), "First Name? Continue [yN]? Continue [yN]? ")
+
+        self.assertEqual(result['ansible_facts'], {'first_name': 'Andrew', 'cont': True})
+        self.assertEqual(sorted(result['prompt_wait'].keys()), ['cont', 'first_name'])
+        self.assertFalse('prompt_timed_out' in result)
+
+
+    def test_prompt_timeout_closed_fails(self):
+        """
+        Test that a closed input stream fails a question with a timeout instead of repeating it.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_timeout_closed_fails()
+        """
+        self.prompt.setInput(io.StringIO(""))
+
+        result = self.prompt._prompt({}, {'say': 'Color', 'ask': 'color', 'timeout': 1})
+
+        self.assertEqual(result, {'failed': True, 'msg': "Input closed while waiting for an answer."})
+
+
+    def test_prompt_timeout_global(self):
+        """
+        Test that the global timeout applies to questions without their own timeout.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_timeout_global()
+        """
+        self.prompt.setInput(self._getPipe())
+        self.prompt.setTimeout(0.05)
+
+        result = self.prompt._prompt({}, {'say': 'Continue', 'ask': 'cont', 'confirm': True})
+
+        self.assertEqual(result['ansible_facts']['cont'], True)
+        self.assertEqual(result['prompt_timed_out'], ['cont'])
+
+
+    def test_prompt_timeout_no_wait_reported(self):
+        """
+        Test that no wait time is reported for questions without a timeout.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_timeout_no_wait_reported()
+        """
+        self._typeInput(['mocked input'])
+
+        result = self.prompt._prompt({}, {'say': 'test', 'ask': 'varname'})
+
+        self.assertEqual(result, {'ansible_facts': {'varname': 'mocked input'}})
+
+
+    def test_prompt_setTimeout_environment(self):
+        """
+        Test that the global timeout can be set from the environment.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setTimeout_environment()
+        """
+        with mock.patch.dict(os.environ, {'ANSIBLE_PROMPT_TIMEOUT': '30'}):
+            self.assertEqual(self._getPrompt()._timeout, 30.0)
+
+        with mock.patch.dict(os.environ, {'ANSIBLE_PROMPT_TIMEOUT': ''}):
+            self.assertEqual(self._getPrompt()._timeout, None)
+
+
+    def test_prompt_setTimeout_invalid_exception(self):
+        """
+        Test that a non-positive global timeout is rejected.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setTimeout_invalid_exception()
+        """
+        with self.assertRaises(ValueError):
+            self.prompt.setTimeout(0)
+
+        with self.assertRaises(ValueError):
+            self.prompt.setTimeout("soon")
+
+
+    def test_prompt_timeout_invalid_fails(self):
+        """
+        Test that a non-positive question timeout fails validation.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_timeout_invalid_fails()
+        """
+        self.expected['failed'] = True
+        self.expected['msg'] = "Option 'timeout' must be a positive number of seconds."
+
+        self.assertEqual(
+            self.prompt._prompt(self.response, {'ask': 'color', 'timeout': -1}),
+            self.expected
+        )
+
+
+    def test_prompt_timeout_say_fails(self):
+        """
+        Test that 'timeout' is rejected for non-question prompts.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_timeout_say_fails()
+        """
+        self.expected['failed'] = True
+        self.expected['msg'] = "Unexpected 'timeout' in non-question prompt."
+
+        self.assertEqual(
+            self.prompt._prompt(self.response, {'say': 'Hello', 'timeout': 5}),
+            self.expected
+        )
+
+
+
+
+    # setStats(stats)
+
+    def test_prompt_setStats_default_disabled(self):
+        """
+        Test that statistics are not reported by default.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setStats_default_disabled()
+        """
+        self._typeInput(['blue'])
+
+        result = self.prompt._prompt({}, {'ask': 'color'})
+
+        self.assertFalse('prompt_stats' in result)
+
+
+    def test_prompt_setStats_environment(self):
+        """
+        Test that statistics can be enabled from the environment.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setStats_environment()
+        """
+        with mock.patch.dict(os.environ, {'ANSIBLE_PROMPT_STATS': 'yes'}):
+            self.assertTrue(self._getPrompt()._stats)
+
+        with mock.patch.dict(os.environ, {'ANSIBLE_PROMPT_STATS': 'no'}):
+            self.assertFalse(self._getPrompt()._stats)
+
+
+    def test_prompt_stats_items_valid(self):
+        """
+        Test that an entry is reported for each message item, with question timings and retries.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_stats_items_valid()
+        """
+        self.prompt.setStats(True)
+
+        self._typeInput(['maybe', 'y'])
+
+        result = self.prompt._prompt({}, [
+            {'say': 'Hello'},
+            {'ask': 'cont', 'confirm': True},
+        ])
+
+        stats = result['prompt_stats']
+
+        self.assertEqual(len(stats['items']), 2)
+        self.assertEqual(stats['items'][0]['type'], 'say')
+        self.assertEqual(stats['items'][0]['index'], 0)
+
+        ask = stats['items'][1]
+
+        self.assertEqual(ask['type'], 'ask')
+        self.assertEqual(ask['var'], 'cont')
+        self.assertEqual(ask['source'], 'user')
+        self.assertEqual(ask['retries'], 1)
+        self.assertEqual(ask['timed_out'], False)
+        self.assertTrue(0 <= ask['first_input'] <= ask['wait'])
+        self.assertEqual(stats['wait'], ask['wait'])
+        self.assertTrue(stats['render'] >= 0)
+
+
+    def test_prompt_stats_answers_source(self):
+        """
+        Test that provided answers are reported without any wait.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_stats_answers_source()
+        """
+        self.prompt.setStats(True)
+        self.prompt.setAnswers({'color': 'blue'})
+
+        result = self.prompt._prompt({}, {'ask': 'color'})
+        ask = result['prompt_stats']['items'][0]
+
+        self.assertEqual(ask['source'], 'answers')
+        self.assertEqual(ask['wait'], 0)
+        self.assertEqual(ask['first_input'], None)
+        self.assertEqual(ask['retries'], 0)
+
+
+    def test_prompt_stats_failure_reported(self):
+        """
+        Test that statistics gathered before a failure are still reported.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_stats_failure_reported()
+        """
+        self.prompt.setStats(True)
+        self.prompt.setInteractive(False)
+
+        result = self.prompt._prompt({}, [
+            {'say': 'Hello'},
+            {'ask': 'color'},
+        ])
+
+        self.assertTrue(result['failed'])
+        self.assertEqual([i['type'] for i in result['prompt_stats']['items']], ['say'])
+
+
+
+
+    # type, pattern, choices
+
+    def test_prompt_type_converted(self):
+        """
+        Test that answers are converted to the question's type.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_type_converted()
+        """
+        self._typeInput([' 42 ', '0.5', '10.0.0.1', '::1'])
+
+        result = self.prompt._prompt({}, [
+            {'ask': 'count', 'type': 'int'},
+            {'ask': 'ratio', 'type': 'float'},
+            {'ask': 'address', 'type': 'ip'},
+            {'ask': 'address6', 'type': 'ip'},
+        ])
+
+        self.assertEqual(result['ansible_facts'], {
+            'count': 42,
+            'ratio': 0.5,
+            'address': '10.0.0.1',
+            'address6': '::1',
+        })
+
+
+    def test_prompt_type_invalid_reprompted(self):
+        """
+        Test that the question is asked again until the answer is valid for its type.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_type_invalid_reprompted()
+        """
+        stdout = self._typeInput(['many', '10.0.0.256', '', '7'])
+
+        result = self.prompt._prompt({}, {'say': 'Count', 'ask': 'count', 'type': 'int'})
+
+        self.assertEqual(stdout.getvalue(), "Count? " * 4)
+
+        self.assertEqual(result['ansible_facts']['count'], 7)
+
+
+    def test_prompt_type_path_valid(self):
+        """
+        Test that path answers must exist, and have any home directory expanded.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_type_path_valid()
+        """
+        stdout = self._typeInput(['~/missing.txt', '~/test_ask.py'])
+
+        with mock.patch.dict(os.environ, {'HOME': os.path.dirname(os.path.abspath(__file__))}):
+            result = self.prompt._prompt({}, {'ask': 'path', 'type': 'path'})
+
+        self.assertEqual(stdout.getvalue(), "? ? ")
+
+        self.assertEqual(result['ansible_facts']['path'], os.path.abspath(__file__))
+
+
+    def test_prompt_type_default_converted(self):
+        """
+        Test that defaults are converted to the question's type.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_type_default_converted()
+        """
+        stdout = self._typeInput([''])
+
+        result = self.prompt._prompt({}, {'say': 'Port', 'ask': 'port', 'type': 'int', 'default': 22})
+
+        self.assertEqual(stdout.getvalue(), "Port [22]? ")
+        self.assertEqual(result['ansible_facts']['port'], 22)
+
+
+    def test_prompt_pattern_reprompted(self):
+        """
+        Test that answers must match the whole of the question's pattern.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_pattern_reprompted()
+        """
+        stdout = self._typeInput(['v1.2', '1.2.3-rc1', '1.2.3'])
+
+        result = self.prompt._prompt({}, {'ask': 'release', 'pattern': r'\d+\.\d+\.\d+'})
+
+        self.assertEqual(stdout.getvalue(), "? " * 3)
+
+        self.assertEqual(result['ansible_facts']['release'], '1.2.3')
+
+
+    def test_prompt_choices_reprompted(self):
+        """
+        Test that answers must be one of the question's choices, which are listed in the prompt.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_choices_reprompted()
+        """
+        stdout = self._typeInput(['purple', '2'])
+
+        result = self.prompt._prompt({}, {'say': 'Zone', 'ask': 'zone', 'type': 'int', 'choices': [1, 2, 3]})
+
+        self.assertEqual(stdout.getvalue(), "Zone (1/2/3)? " * 2)
+
+        self.assertEqual(result['ansible_facts']['zone'], 2)
+
+
+    def test_prompt_validator_answers_invalid_fails(self):
+        """
+        Test that provided answers must be valid.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_validator_answers_invalid_fails()
+        """
+        self.prompt.setAnswers({'color': 'purple'})
+
+        self.assertEqual(
+            self.prompt._prompt({}, {'ask': 'color', 'choices': ['red', 'blue']}),
+            {'failed': True, 'msg': "Invalid answer 'purple' provided for 'color'."}
+        )
+
+
+    def test_prompt_validator_options_invalid_fails(self):
+        """
+        Test that invalid types, patterns, choices, and defaults fail validation.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_validator_options_invalid_fails()
+        """
+        errors = self.prompt.validate([
+            {'ask': 'a', 'type': 'color'},
+            {'ask': 'b', 'pattern': '('},
+            {'ask': 'c', 'choices': 'red'},
+            {'ask': 'd', 'type': 'int', 'default': 'ten'},
+            {'ask': 'e', 'confirm': True, 'type': 'int'},
+            {'say': 'f', 'choices': ['red']},
+        ])
+
+        self.assertEqual(errors[0], "Type 'color' invalid.  Expected 'str', 'int', 'float', 'path', or 'ip'.")
+        self.assertTrue(errors[1].startswith("Invalid pattern '(' for 'b': "))
+        self.assertEqual(errors[2:], [
+            "Option 'choices' must be a list of answers.",
+            "Default 'ten' is not a valid answer for 'd'.",
+            "Option 'type' is not compatible with option 'confirm'.",
+            "Unexpected 'choices' in non-question prompt.",
+        ])
+
+
+    def test_prompt_pattern_compiled_once(self):
+        """
+        Test that each pattern is compiled only once, however many questions use it.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_pattern_compiled_once()
+        """
+        with mock.patch('action_plugins.prompt.re.compile', side_effect=re.compile) as mockcompile:
+            self.prompt.validate([{'ask': 'v%d' % i, 'pattern': r'[a-z]{3}\d'} for i in range(10)])
 
-            self.assertEquals("Continue [yN]? ", args[0])
-            self.assertEquals(result['ansible_facts']['result'], True)
+        self.assertTrue(mockcompile.call_count <= 1)
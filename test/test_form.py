@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 Andrew Vaughan <hello@andrewvaughan.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Test suite for the Ansible prompt action plugin.
+
+.. moduleauthor:: Andrew Vaughan <hello@andrewvaughan.io>
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest import mock
+
+from action_plugins import Prompt
+from action_plugins.prompt import AnswerStore, TerminalLock
+
+from ansible.playbook.task import Task as AnsibleTask
+from ansible.playbook.play_context import PlayContext as AnsiblePlayContext
+
+
+class TestForm(unittest.TestCase):
+    """
+    Tests the form mode of the Ansible prompt action plugin.
+
+    .. class:: TestForm
+    .. versionadded:: 1.1.0
+    """
+
+    ADDRESS = [
+        {'say': 'Please provide your address.'},
+        {'say': 'Street Address:', 'ask': 'address', 'postfix': ''},
+        {'say': 'City:', 'ask': 'city', 'postfix': ''},
+        {'say': 'Country:', 'ask': 'country', 'postfix': '', 'default': 'US'},
+        {'say': 'Correct', 'ask': 'correct', 'confirm': True},
+    ]
+
+
+    def setUp(self):
+        """
+        Sets up a prompt object and a temporary directory before each test.
+
+        .. versionadded:: 1.1.0
+        .. function:: setUp()
+        """
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+        self.prompt = self._getPrompt()
+
+        self.outstr = io.StringIO()
+        self.prompt.setOutput(self.outstr)
+
+
+    def _getPrompt(self, task=None):
+        """
+        Return a generic Prompt object.
+
+        :kwarg task: the task to run (defaults to a new task)
+
+        :returns: generic Prompt object
+
+        .. versionadded:: 1.1.0
+        .. function:: _getPrompt([task=None])
+        """
+        prompt = Prompt(
+            task=task or AnsibleTask(),
+            connection=mock.Mock(),
+            play_context=AnsiblePlayContext(),
+            loader=None,
+            templar=None,
+            shared_loader_obj=None
+        )
+        prompt.setAnswerStore(AnswerStore(os.path.join(self.tmpdir, 'answers.json')))
+        prompt.setTerminalLock(TerminalLock(os.path.join(self.tmpdir, 'tty.lock')))
+        prompt.setInput(io.StringIO())
+
+        return prompt
+
+
+    def _form(self, msg, content):
+        """
+        Run a message as a form, answering it with the given input.
+
+        :returns: the task result and everything written to the output stream
+
+        .. versionadded:: 1.1.0
+        .. function:: _form(msg, content)
+        """
+        self.prompt.setInput(io.StringIO(content))
+
+        result = self.prompt._prompt({}, msg, form=True)
+
+        return result, self.outstr.getvalue()
+
+
+
+
+    # _prompt(result, msg, form)
+
+    def test_prompt_form_answers_valid(self):
+        """
+        Test that every question of a form is listed together and answered from a single block of input.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_form_answers_valid()
+        """
+        result, terminal = self._form(self.ADDRESS, "1 Main St\nSpringfield\n\ny\n")
+
+        self.assertEqual(
+            terminal,
+            "Please provide your address.\n1. Street Address:\n2. City:\n3. Country: [US]\n4. Correct [Yn]?\n"
+        )
+        self.assertEqual(result['ansible_facts'], {
+            'address': '1 Main St',
+            'city': 'Springfield',
+            'country': 'US',
+            'correct': True,
+        })
+
+
+    def test_prompt_form_invalid_reprompted(self):
+        """
+        Test that only the invalid answers of a form are asked for again.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_form_invalid_reprompted()
+        """
+        msg = [
+            {'say': 'Name', 'ask': 'name'},
+            {'say': 'Correct', 'ask': 'correct', 'confirm': True},
+            {'say': 'Color', 'ask': 'color'},
+        ]
+
+        result, terminal = self._form(msg, "Andrew\nmaybe\n\nn\nblue\n")
+
+        self.assertEqual(terminal, "1. Name?\n2. Correct [Yn]?\n3. Color?\nCorrect [Yn]? Color? ")
+        self.assertEqual(result['ansible_facts'], {'name': 'Andrew', 'correct': False, 'color': 'blue'})
+
+
+    def test_prompt_form_groups_consecutive(self):
+        """
+        Test that messages between questions split a form, keeping every item in order.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_form_groups_consecutive()
+        """
+        self.prompt.setFlushPolicy('item')
+
+        msg = [
+            {'say': 'First', 'ask': 'first'},
+            'Between',
+            {'say': 'Second', 'ask': 'second'},
+            {'say': 'Third', 'ask': 'third'},
+        ]
+
+        result, terminal = self._form(msg, "one\ntwo\nthree\n")
+
+        self.assertEqual(terminal, "1. First?\nBetween\n1. Second?\n2. Third?\n")
+        self.assertEqual(result['ansible_facts'], {'first': 'one', 'second': 'two', 'third': 'three'})
+
+
+    def test_prompt_form_provided_skipped(self):
+        """
+        Test that questions answered ahead of time are left out of the form.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_form_provided_skipped()
+        """
+        self.prompt.setAnswers({'city': 'Springfield'})
+
+        result, terminal = self._form(self.ADDRESS, "1 Main St\nCA\ny\n")
+
+        self.assertEqual(
+            terminal,
+            "Please provide your address.\n1. Street Address:\n2. Country: [US]\n3. Correct [Yn]?\n"
+        )
+        self.assertEqual(result['ansible_facts']['city'], 'Springfield')
+        self.assertEqual(result['ansible_facts']['country'], 'CA')
+
+
+    def test_prompt_form_pipe_pasted(self):
+        """
+        Test that a block of answers pasted at once is read from a single buffered read.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_form_pipe_pasted()
+        """
+        readfd, writefd = os.pipe()
+        os.write(writefd, b"1 Main St\nSpringfield\nCA\ny\n")
+
+        reader = os.fdopen(readfd, 'r')
+
+        self.addCleanup(reader.close)
+        self.addCleanup(os.close, writefd)
+
+        self.prompt.setInput(reader)
+
+        with mock.patch('os.read', side_effect=os.read) as mockread:
+            result = self.prompt._prompt({}, self.ADDRESS, form=True)
+
+        self.assertEqual(mockread.call_count, 1)
+        self.assertEqual(result['ansible_facts']['country'], 'CA')
+
+
+    def test_prompt_form_timeout_default_used(self):
+        """
+        Test that questions left unanswered when a form times out use their defaults.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_form_timeout_default_used()
+        """
+        readfd, writefd = os.pipe()
+        os.write(writefd, b"blue\n")
+
+        reader = os.fdopen(readfd, 'r')
+
+        self.addCleanup(reader.close)
+        self.addCleanup(os.close, writefd)
+
+        self.prompt.setInput(reader)
+        self.prompt.setTimeout(0.05)
+
+        result = self.prompt._prompt({}, [
+            {'ask': 'color'},
+            {'ask': 'size', 'default': 'large'},
+        ], form=True)
+
+        self.assertEqual(result['ansible_facts'], {'color': 'blue', 'size': 'large'})
+        self.assertEqual(result['prompt_timed_out'], ['size'])
+
+
+    def test_prompt_form_shared_once(self):
+        """
+        Test that a form is filled in once and its answers reused for every host running the task.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_form_shared_once()
+        """
+        task = AnsibleTask()
+        task._uuid = 'task-uuid'
+
+        store = AnswerStore(os.path.join(self.tmpdir, 'answers.json'))
+        msg = [
+            {'say': 'Release', 'ask': 'release'},
+            {'say': 'Hostname', 'ask': 'hostname', 'once': False},
+        ]
+
+        source = io.StringIO("1.2.3\nalpha\nbravo\n")
+        results = []
+
+        for i in range(2):
+            prompt = self._getPrompt(task)
+            prompt.setOutput(self.outstr)
+            prompt.setAnswerStore(store)
+            prompt.setInput(source)
+
+            results.append(prompt._prompt({}, msg, form=True))
+
+        self.assertEqual(results[0]['ansible_facts'], {'release': '1.2.3', 'hostname': 'alpha'})
+        self.assertEqual(results[1]['ansible_facts'], {'release': '1.2.3', 'hostname': 'bravo'})
+
+
+
+
+    # run()
+
+    def test_prompt_run_form_valid(self):
+        """
+        Test that the run() method accepts the 'form' parameter.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_run_form_valid()
+        """
+        self.prompt.setInput(io.StringIO("Andrew\n"))
+        self.prompt._task.args = {
+            'msg': {'say': 'Name', 'ask': 'name'},
+            'form': 'yes',
+        }
+
+        result = self.prompt.run()
+
+        self.assertEqual(self.outstr.getvalue(), "1. Name?\n")
+        self.assertEqual(result['ansible_facts'], {'name': 'Andrew'})
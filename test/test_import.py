@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 Andrew Vaughan <hello@andrewvaughan.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Test suite for the Ansible prompt action plugin.
+
+.. moduleauthor:: Andrew Vaughan <hello@andrewvaughan.io>
+"""
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+
+class TestImport(unittest.TestCase):
+    """
+    Tests the cost of loading the Ansible prompt action plugin, which is paid again by every forked worker.
+
+    .. class:: TestImport
+    .. versionadded:: 1.1.0
+    """
+
+    #: The number of seconds loading the plugin may take, once Ansible itself has been imported.
+    BUDGET = 0.01
+
+    #: Modules only needed on some paths, which must not be imported just by loading the plugin.
+    LAZY_MODULES = (
+        'codecs', 'fcntl', 'hashlib', 'json', 'select', 'signal', 'socket', 'struct', 'subprocess', 'tempfile',
+        'termios', 'unicodedata', 'yaml'
+    )
+
+    #: Measures loading the plugin in a fresh interpreter, reporting the time taken and any modules it imported.
+    SCRIPT = """
+import importlib.util, json, sys, time
+
+import ansible.errors
+import ansible.module_utils.common.text.converters
+import ansible.module_utils.parsing.convert_bool
+import ansible.plugins.action
+import ansible.utils.display
+
+import action_plugins
+
+spec = importlib.util.find_spec('action_plugins.prompt')
+code = spec.loader.get_code(spec.name)
+module = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = module
+
+before = set(sys.modules)
+start = time.perf_counter()
+
+exec(code, module.__dict__)
+
+print(json.dumps({'seconds': time.perf_counter() - start, 'modules': sorted(set(sys.modules) - before)}))
+"""
+
+
+    def _load(self):
+        """
+        Load the plugin in a fresh interpreter.
+
+        :returns: a dict of the seconds taken and the modules imported
+
+        .. versionadded:: 1.1.0
+        .. function:: _load()
+        """
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output([sys.executable, '-c', self.SCRIPT], cwd=root)
+
+        return json.loads(output.decode('utf-8'))
+
+
+
+
+    # import action_plugins.prompt
+
+    def test_import_within_budget(self):
+        """
+        Test that loading the plugin stays within its time budget.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_import_within_budget()
+        """
+        seconds = min(self._load()['seconds'] for i in range(3))
+
+        self.assertTrue(
+            seconds < self.BUDGET,
+            "Loading the plugin took %.1fms, over its %.1fms budget." % (seconds * 1000, self.BUDGET * 1000)
+        )
+
+
+    def test_import_lazy_modules(self):
+        """
+        Test that modules only needed on some paths are not imported when the plugin loads.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_import_lazy_modules()
+        """
+        imported = [name for name in self._load()['modules'] if name.split('.')[0] in self.LAZY_MODULES]
+
+        self.assertEqual(imported, [])
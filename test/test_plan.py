@@ -0,0 +1,440 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 Andrew Vaughan <hello@andrewvaughan.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Test suite for the Ansible prompt action plugin.
+
+.. moduleauthor:: Andrew Vaughan <hello@andrewvaughan.io>
+"""
+
+import ansible
+import copy
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from unittest import mock
+
+from action_plugins import Prompt
+from action_plugins.prompt import AnswerStore, AskOp, freeze, PLAN_CACHE, PlanCache, PromptError, SayOp, TerminalLock
+
+from ansible.playbook.task import Task as AnsibleTask
+from ansible.playbook.play_context import PlayContext as AnsiblePlayContext
+
+
+class TestPlan(unittest.TestCase):
+    """
+    Tests the compiled prompt plans and plan cache of the Ansible prompt action plugin.
+
+    .. class:: TestPlan
+    .. versionadded:: 1.1.0
+    """
+
+    def setUp(self):
+        """
+        Sets up a prompt object and an empty plan cache before each test.
+
+        .. versionadded:: 1.1.0
+        .. function:: setUp()
+        """
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+        self.prompt = self._getPrompt()
+
+        self.outstr = io.StringIO()
+        self.prompt.setOutput(self.outstr)
+
+        PLAN_CACHE.clear()
+
+
+    def _getPrompt(self):
+        """
+        Return a generic Prompt object.
+
+        :returns: generic Prompt object
+
+        .. versionadded:: 1.1.0
+        .. function:: _getPrompt()
+        """
+        prompt = Prompt(
+            task=AnsibleTask(),
+            connection=None,
+            play_context=AnsiblePlayContext(),
+            loader=None,
+            templar=None,
+            shared_loader_obj=None
+        )
+        prompt.setAnswerStore(AnswerStore(os.path.join(self.tmpdir, 'answers.json')))
+        prompt.setTerminalLock(TerminalLock(os.path.join(self.tmpdir, 'tty.lock')))
+        prompt.setInput(io.StringIO())
+
+        return prompt
+
+
+
+
+    # PlanCache.key(msg)
+
+    def test_plancache_key_stable(self):
+        """
+        Test that equal message specifications hash to the same key regardless of dict ordering.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_plancache_key_stable()
+        """
+        self.assertEqual(
+            PlanCache.key([{"say": "Hello", "align": "center"}]),
+            PlanCache.key([{"align": "center", "say": "Hello"}])
+        )
+
+
+    def test_plancache_key_types_differ(self):
+        """
+        Test that specifications differing only by container or scalar type hash to different keys.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_plancache_key_types_differ()
+        """
+        self.assertNotEqual(PlanCache.key([1, 2]), PlanCache.key((1, 2)))
+        self.assertNotEqual(PlanCache.key("1"), PlanCache.key(1))
+
+
+
+
+    # PlanCache.get(key) / PlanCache.put(key, plan)
+
+    def test_plancache_counters(self):
+        """
+        Test that the cache counts hits and misses.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_plancache_counters()
+        """
+        cache = PlanCache()
+
+        self.assertEqual(cache.get("a"), None)
+
+        cache.put("a", ())
+
+        self.assertEqual(cache.get("a"), ())
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'size': 1, 'maxsize': 128})
+
+
+    def test_plancache_evicts_lru(self):
+        """
+        Test that the least recently used plan is evicted once the cache is full.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_plancache_evicts_lru()
+        """
+        cache = PlanCache(maxsize=2)
+
+        cache.put("a", ("a",))
+        cache.put("b", ("b",))
+        cache.get("a")
+        cache.put("c", ("c",))
+
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual(cache.get("a"), ("a",))
+        self.assertEqual(cache.get("c"), ("c",))
+
+
+
+
+    # _compile(msg)
+
+    def test_prompt_compile_ops(self):
+        """
+        Test that messages compile into immutable say and ask operations.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_compile_ops()
+        """
+        plan = self.prompt._compile([
+            "Hello",
+            {"say": "World", "align": "right", "newline": False},
+            {"say": "Continue", "ask": "cont", "confirm": False},
+        ])
+
+        self.assertEqual(plan.ops, (
+            SayOp("Hello", "left", True, "", False, None, None),
+            SayOp("World", "right", False, "", False, None, None),
+            AskOp(
+                "cont", "Continue", "?", "n", True, False, True, None, "Continue [yN]? ", None, "{say} [yN]? ",
+                None, None
+            ),
+        ))
+        self.assertEqual(plan.errors, ())
+
+        with self.assertRaises(AttributeError):
+            plan.ops[0].text = "Goodbye"
+
+
+    def test_prompt_compile_ask_prompt_rendered(self):
+        """
+        Test that each question's prompt string is rendered once at compile time.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_compile_ask_prompt_rendered()
+        """
+        plan = self.prompt._compile([
+            {"ask": "name"},
+            {"say": "Color", "ask": "color", "default": "blue", "postfix": ":"},
+            {"say": "Continue", "ask": "cont", "confirm": True},
+        ])
+
+        self.assertEqual([op.prompt for op in plan.ops], ["? ", "Color [blue]: ", "Continue [Yn]? "])
+
+
+    def test_prompt_compile_ask_prompt_reused(self):
+        """
+        Test that the same prompt string is reused across retries and repeated tasks.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_compile_ask_prompt_reused()
+        """
+        msg = {"say": "Continue", "ask": "cont", "confirm": True, "once": False}
+
+        with mock.patch.object(self.prompt, '_readLine', side_effect=['maybe', 'y', 'n']) as mockinput:
+            self.prompt._prompt({}, msg)
+            self.prompt._prompt({}, msg)
+
+        prompts = [call[0][0] for call in mockinput.call_args_list]
+
+        self.assertEqual(prompts[0], "Continue [Yn]? ")
+        self.assertTrue(prompts[0] is prompts[1] is prompts[2])
+
+
+    def test_prompt_compile_errors_collected(self):
+        """
+        Test that every invalid item is recorded in the plan.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_compile_errors_collected()
+        """
+        plan = self.prompt._compile(["valid", {"foo": "bar"}, "also valid", {"ask": "a-b"}])
+
+        self.assertEqual(len(plan.ops), 2)
+        self.assertEqual(
+            [str(e) for e in plan.errors],
+            ["Unexpected parameter 'foo'", "Invalid character in 'ask' parameter 'a-b'."]
+        )
+        self.assertTrue(all(isinstance(e, PromptError) for e in plan.errors))
+
+
+    def test_prompt_compile_cached(self):
+        """
+        Test that repeated executions of the same message reuse the compiled plan across plugin instances.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_compile_cached()
+        """
+        msg = [{"say": "Hello World"}, "Goodbye"]
+
+        with mock.patch.object(Prompt, '_parse', autospec=True, side_effect=Prompt._parse) as parse:
+            for i in range(5):
+                prompt = self._getPrompt()
+                prompt.setOutput(self.outstr)
+                prompt._prompt({}, msg)
+
+            self.assertEqual(parse.call_count, 1)
+
+        self.assertEqual(PLAN_CACHE.stats()['hits'], 4)
+        self.assertEqual(PLAN_CACHE.stats()['misses'], 1)
+        self.assertEqual(self.outstr.getvalue(), "Hello World\nGoodbye\n" * 5)
+
+
+    def test_prompt_compile_args_untouched(self):
+        """
+        Test that compiling a question does not modify the provided message.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_compile_args_untouched()
+        """
+        msg = {"say": "Continue", "ask": "cont", "confirm": True}
+
+        self.prompt._compile(msg)
+
+        self.assertEqual(msg, {"say": "Continue", "ask": "cont", "confirm": True})
+
+
+    def test_prompt_compile_args_untouched_run(self):
+        """
+        Test that running a message with every kind of item leaves the provided message unchanged.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_compile_args_untouched_run()
+        """
+        msg = [
+            "Hello",
+            {"say": "Name", "ask": "name"},
+            {"say": "Continue", "ask": "cont", "confirm": True, "when": [True]},
+            {"say": "Color", "ask": "color", "choices": ["red", "blue"], "default": "red", "trim": False},
+            {"say": "Port", "ask": "ports", "type": "int", "foreach": [{"host": "a"}, {"host": "b"}], "key": "x"},
+            {"say": "Done", "align": "center", "color": "red", "bold": True, "box": True},
+        ]
+        original = copy.deepcopy(msg)
+
+        self.prompt.setAnswers({"name": "Andrew", "cont": True, "color": "", "ports": 80})
+
+        self.assertEqual(self.prompt.validate(msg), [])
+        self.assertFalse(self.prompt._prompt({}, msg).get('failed'))
+        self.assertEqual(msg, original)
+
+
+    def test_prompt_compile_frozen(self):
+        """
+        Test that compiled plans share no mutable values with the provided message.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_compile_frozen()
+        """
+        services = [{"name": "nginx", "ports": [80, 443]}]
+        plan = self.prompt._compile({"say": "Service", "foreach": services})
+
+        services[0]["ports"].append(8080)
+
+        self.assertEqual(plan.ops[0].items, freeze([{"name": "nginx", "ports": [80, 443]}]))
+        self.assertEqual(plan.ops[0].items[0]["ports"], (80, 443))
+
+        with self.assertRaises(TypeError):
+            plan.ops[0].items[0]["name"] = "redis"
+
+
+    def test_prompt_compile_default_normalized(self):
+        """
+        Test that defaults are normalized to the text the user would have typed.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_compile_default_normalized()
+        """
+        self.assertEqual(self.prompt._compile({"ask": "count", "default": 5}).ops[0].default, "5")
+
+        with mock.patch.object(self.prompt, '_readLine', return_value=""):
+            self.assertEqual(self.prompt._prompt({}, {"ask": "count", "default": 5})['ansible_facts'], {"count": "5"})
+
+
+    def test_prompt_compile_shared_threads(self):
+        """
+        Test that a single compiled plan is used safely by many hosts at once.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_compile_shared_threads()
+        """
+        msg = [{"say": "Hello", "align": "right"}, {"say": "Name", "ask": "name", "once": False}]
+        results = []
+
+        def host():
+            """
+            Run the message for one host.
+            """
+            prompt = self._getPrompt()
+            prompt.setOutput(io.StringIO())
+            prompt.setAnswers({"name": "Andrew"})
+
+            results.append((prompt._compile(msg), prompt._prompt({}, msg)))
+
+        threads = [threading.Thread(target=host) for i in range(8)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(plan is results[0][0] for plan, result in results))
+        self.assertTrue(all(result == {'ansible_facts': {'name': 'Andrew'}} for plan, result in results))
+
+
+
+
+    # validate(msg)
+
+    def test_prompt_validate_valid(self):
+        """
+        Test that validate() returns no errors for a valid message.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_validate_valid()
+        """
+        self.assertEqual(self.prompt.validate(["Hello", {"say": "Name", "ask": "name"}]), [])
+
+
+    def test_prompt_validate_all_errors(self):
+        """
+        Test that validate() returns every error without producing output or asking questions.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_validate_all_errors()
+        """
+        with mock.patch.object(self.prompt, '_readLine') as mockinput:
+            errors = self.prompt.validate([
+                {"say": "Name", "ask": "name"},
+                {"say": "Hello", "default": "foobar"},
+                {"say": "Hello", "align": "middle"},
+                None,
+            ])
+
+            self.assertFalse(mockinput.called)
+
+        self.assertEqual(errors, [
+            "Unexpected 'default' in non-question prompt.",
+            "Align 'middle' invalid.  Expected 'left', 'center', or 'right'.",
+            "No message provided",
+        ])
+        self.assertEqual(self.outstr.getvalue(), "")
+
+
+    def test_prompt_validate_empty(self):
+        """
+        Test that validate() rejects an empty message list.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_validate_empty()
+        """
+        self.assertEqual(self.prompt.validate([]), ["No message provided"])
+
+
+    def test_prompt_invalid_before_output(self):
+        """
+        Test that _prompt() reports all errors before displaying anything or asking any question.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_invalid_before_output()
+        """
+        with mock.patch.object(self.prompt, '_readLine') as mockinput:
+            result = self.prompt._prompt({}, [
+                "Hello",
+                {"say": "Name", "ask": "name"},
+                {"say": "Hello", "trim": True},
+                {"say": "Hello", "align": "100%"},
+            ])
+
+            self.assertFalse(mockinput.called)
+
+        self.assertEqual(result, {
+            'failed': True,
+            'msg': "Unexpected 'trim' in non-question prompt.\n"
+                   "Align '100%' invalid.  Expected 'left', 'center', or 'right'."
+        })
+        self.assertEqual(self.outstr.getvalue(), "")
@@ -23,12 +23,17 @@ Test suite for the Ansible prompt action plugin.
 """
 
 import ansible
-import mock
-import StringIO
+import io
+import os
+import shutil
 import sys
+import tempfile
 import unittest
 
+from unittest import mock
+
 from action_plugins import Prompt
+from action_plugins.prompt import AnswerStore, CHAR_WIDTHS, displayWidth, TerminalLock
 
 from ansible.playbook.task import Task as AnsibleTask
 from ansible.playbook.play_context import PlayContext as AnsiblePlayContext
@@ -49,8 +54,11 @@ class TestSay(unittest.TestCase):
         .. versionadded:: 0.1.0
         .. function:: setUp()
         """
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
         self.prompt = self._getPrompt()
-        self.outstr = StringIO.StringIO()
+        self.outstr = io.StringIO()
 
         self.prompt.setOutput(self.outstr)
 
@@ -70,14 +78,19 @@ class TestSay(unittest.TestCase):
         .. versionadded:: 0.1.0
         .. function:: _getPrompt()
         """
-        return Prompt(
+        prompt = Prompt(
             task=AnsibleTask(),
-            connection=None,
+            connection=mock.Mock(),
             play_context=AnsiblePlayContext(),
             loader=None,
             templar=None,
             shared_loader_obj=None
         )
+        prompt.setAnswerStore(AnswerStore(os.path.join(self.tmpdir, 'answers.json')))
+        prompt.setTerminalLock(TerminalLock(os.path.join(self.tmpdir, 'tty.lock')))
+        prompt.setInput(io.StringIO())
+
+        return prompt
 
 
 
@@ -108,7 +121,7 @@ class TestSay(unittest.TestCase):
         prompt = self._getPrompt()
         prompt.setOutput()
 
-        self.assertEquals(
+        self.assertEqual(
             prompt._outstr,
             sys.stdout
         )
@@ -122,16 +135,16 @@ class TestSay(unittest.TestCase):
         .. function:: test_setOutput_stringio_valid()
         """
         prompt = self._getPrompt()
-        outstr = StringIO.StringIO()
+        outstr = io.StringIO()
 
         prompt.setOutput(outstr)
 
-        self.assertEquals(outstr, prompt._outstr)
-        self.assertEquals(outstr.getvalue(), "")
+        self.assertEqual(outstr, prompt._outstr)
+        self.assertEqual(outstr.getvalue(), "")
 
         prompt._prompt({}, "test")
 
-        self.assertEquals(outstr.getvalue(), "test\n")
+        self.assertEqual(outstr.getvalue(), "test\n")
 
 
 
@@ -216,7 +229,7 @@ class TestSay(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Failure Message"
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._fail(self.response, "Failure Message"),
             self.expected
         )
@@ -232,7 +245,7 @@ class TestSay(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Failure Message A 3.14 Cats"
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._fail(self.response, "Failure Message %s %.2f %s", "A", 3.14159, "Cats"),
             self.expected
         )
@@ -252,7 +265,7 @@ class TestSay(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Unexpected parameter 'foo'"
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, {
                 "foo": "bar"
             }),
@@ -270,7 +283,7 @@ class TestSay(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "No message provided"
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, ""),
             self.expected
         )
@@ -286,7 +299,7 @@ class TestSay(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "No message provided"
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, []),
             self.expected
         )
@@ -302,7 +315,7 @@ class TestSay(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "No message provided"
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, {}),
             self.expected
         )
@@ -318,7 +331,7 @@ class TestSay(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "No message provided"
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, None),
             self.expected
         )
@@ -335,12 +348,12 @@ class TestSay(unittest.TestCase):
 
         self.assertTrue(isinstance(msg, str))
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, msg),
             self.expected
         )
 
-        self.assertEquals(self.outstr.getvalue(), "%s\n" % msg)
+        self.assertEqual(self.outstr.getvalue(), "%s\n" % msg)
 
 
     def test_prompt_msg_unicode_succeeds(self):
@@ -350,16 +363,16 @@ class TestSay(unittest.TestCase):
         .. versionadded:: 0.2.0
         .. function:: test_prompt_msg_unicode_succeeds()
         """
-        msg = u"Hello World"
+        msg = u"H\u00e9llo W\u00f6rld"
 
-        self.assertTrue(isinstance(msg, unicode))
+        self.assertTrue(isinstance(msg, str))
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, msg),
             self.expected
         )
 
-        self.assertEquals(self.outstr.getvalue(), "%s\n" % msg)
+        self.assertEqual(self.outstr.getvalue(), "%s\n" % msg)
 
 
     def test_prompt_msg_int_succeeds(self):
@@ -373,31 +386,31 @@ class TestSay(unittest.TestCase):
 
         self.assertTrue(isinstance(msg, int))
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, msg),
             self.expected
         )
 
-        self.assertEquals(self.outstr.getvalue(), "%s\n" % str(msg))
+        self.assertEqual(self.outstr.getvalue(), "%s\n" % str(msg))
 
 
     def test_prompt_msg_long_succeeds(self):
         """
-        Test that the _prompt() method is successful if given a simple long.
+        Test that the _prompt() method is successful if given an integer too large for a machine word.
 
         .. versionadded:: 0.1.0
         .. function:: test_prompt_msg_long_succeeds()
         """
-        msg = sys.maxint + 1
+        msg = sys.maxsize + 1
 
-        self.assertTrue(isinstance(msg, long))
+        self.assertTrue(isinstance(msg, int))
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, msg),
             self.expected
         )
 
-        self.assertEquals(self.outstr.getvalue(), "%s\n" % str(msg))
+        self.assertEqual(self.outstr.getvalue(), "%s\n" % str(msg))
 
 
     def test_prompt_msg_float_succeeds(self):
@@ -411,12 +424,12 @@ class TestSay(unittest.TestCase):
 
         self.assertTrue(isinstance(msg, float))
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, msg),
             self.expected
         )
 
-        self.assertEquals(self.outstr.getvalue(), "%s\n" % str(msg))
+        self.assertEqual(self.outstr.getvalue(), "%s\n" % str(msg))
 
 
     def test_prompt_msg_complex_succeeds(self):
@@ -430,12 +443,12 @@ class TestSay(unittest.TestCase):
 
         self.assertTrue(isinstance(msg, complex))
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, msg),
             self.expected
         )
 
-        self.assertEquals(self.outstr.getvalue(), "%s\n" % str(msg))
+        self.assertEqual(self.outstr.getvalue(), "%s\n" % str(msg))
 
 
     def test_prompt_msg_tuple_succeeds(self):
@@ -449,12 +462,12 @@ class TestSay(unittest.TestCase):
 
         self.assertTrue(isinstance(msg, tuple))
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, msg),
             self.expected
         )
 
-        self.assertEquals(self.outstr.getvalue(), "%s\n" % str(msg))
+        self.assertEqual(self.outstr.getvalue(), "%s\n" % str(msg))
 
 
     def test_prompt_msg_set_succeeds(self):
@@ -468,12 +481,12 @@ class TestSay(unittest.TestCase):
 
         self.assertTrue(isinstance(msg, set))
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, msg),
             self.expected
         )
 
-        self.assertEquals(self.outstr.getvalue(), "%s\n" % str(msg))
+        self.assertEqual(self.outstr.getvalue(), "%s\n" % str(msg))
 
 
     def test_prompt_msg_frozenset_succeeds(self):
@@ -487,12 +500,12 @@ class TestSay(unittest.TestCase):
 
         self.assertTrue(isinstance(msg, frozenset))
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, msg),
             self.expected
         )
 
-        self.assertEquals(self.outstr.getvalue(), "%s\n" % str(msg))
+        self.assertEqual(self.outstr.getvalue(), "%s\n" % str(msg))
 
 
     def test_prompt_msg_listparam_invalid_fails(self):
@@ -505,7 +518,7 @@ class TestSay(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Unexpected parameter 'foo'"
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, [
                 {"say": "valid"},
                 {"foo": "bar"}
@@ -513,7 +526,7 @@ class TestSay(unittest.TestCase):
             self.expected
         )
 
-        self.assertEquals(self.outstr.getvalue(), "valid\n")
+        self.assertEqual(self.outstr.getvalue(), "")
 
 
     def test_prompt_msg_list_empty_fails(self):
@@ -526,7 +539,7 @@ class TestSay(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "No message provided"
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, []),
             self.expected
         )
@@ -548,12 +561,12 @@ class TestSay(unittest.TestCase):
 
         self.assertTrue(isinstance(msg, list))
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, msg),
             self.expected
         )
 
-        self.assertEquals(self.outstr.getvalue(), "%s\n" % ("\n".join([str(m) for m in msg])))
+        self.assertEqual(self.outstr.getvalue(), "%s\n" % ("\n".join([str(m) for m in msg])))
 
 
     def test_prompt_msg_listsay_succeeds(self):
@@ -572,12 +585,12 @@ class TestSay(unittest.TestCase):
 
         self.assertTrue(isinstance(msg, list))
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, msg),
             self.expected
         )
 
-        self.assertEquals(self.outstr.getvalue(), "%s\n" % ("\n".join([str(m['say']) for m in msg])))
+        self.assertEqual(self.outstr.getvalue(), "%s\n" % ("\n".join([str(m['say']) for m in msg])))
 
 
     def test_prompt_msg_saynewline_succeeds(self):
@@ -593,12 +606,12 @@ class TestSay(unittest.TestCase):
 
         self.assertTrue(isinstance(msg, list))
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, msg),
             self.expected
         )
 
-        self.assertEquals(self.outstr.getvalue(), "Hello World")
+        self.assertEqual(self.outstr.getvalue(), "Hello World")
 
 
     def test_prompt_msg_saynewlinemultiple_succeeds(self):
@@ -616,12 +629,12 @@ class TestSay(unittest.TestCase):
 
         self.assertTrue(isinstance(msg, list))
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, msg),
             self.expected
         )
 
-        self.assertEquals(self.outstr.getvalue(), "Hello World, How are we?\n")
+        self.assertEqual(self.outstr.getvalue(), "Hello World, How are we?\n")
 
 
     def test_prompt_msg_align_invalid_fails(self):
@@ -634,7 +647,7 @@ class TestSay(unittest.TestCase):
         self.expected['failed'] = True
         self.expected['msg'] = "Align 'foobar' invalid.  Expected 'left', 'center', or 'right'."
 
-        self.assertEquals(
+        self.assertEqual(
             self.prompt._prompt(self.response, {
                 "say": "Hello World",
                 "align": "foobar"
@@ -650,19 +663,19 @@ class TestSay(unittest.TestCase):
         .. versionadded:: 0.3.0
         .. function:: test_prompt_param_align_left_valid()
         """
-        with mock.patch('subprocess.check_output', return_value='10 50'):
+        with mock.patch('action_plugins.prompt.TerminalGeometry.size', return_value=(10, 50)):
             msg = [
                 {"say": "Hello World", "align": "left"},
             ]
 
             self.assertTrue(isinstance(msg, list))
 
-            self.assertEquals(
+            self.assertEqual(
                 self.prompt._prompt(self.response, msg),
                 self.expected
             )
 
-            self.assertEquals(self.outstr.getvalue(), "Hello World\n")
+            self.assertEqual(self.outstr.getvalue(), "Hello World\n")
 
 
     def test_prompt_param_align_center_valid(self):
@@ -672,19 +685,19 @@ class TestSay(unittest.TestCase):
         .. versionadded:: 0.3.0
         .. function:: test_prompt_param_align_center_valid()
         """
-        with mock.patch('subprocess.check_output', return_value='10 75'):
+        with mock.patch('action_plugins.prompt.TerminalGeometry.size', return_value=(10, 75)):
             msg = [
                 {"say": "Hello World", "align": "center"},
             ]
 
             self.assertTrue(isinstance(msg, list))
 
-            self.assertEquals(
+            self.assertEqual(
                 self.prompt._prompt(self.response, msg),
                 self.expected
             )
 
-            self.assertEquals(self.outstr.getvalue(), "%s%s" % ("Hello World".center(74), "\n"))
+            self.assertEqual(self.outstr.getvalue(), "%s%s" % ("Hello World".center(74), "\n"))
 
 
     def test_prompt_param_align_right_valid(self):
@@ -694,19 +707,615 @@ class TestSay(unittest.TestCase):
         .. versionadded:: 0.3.0
         .. function:: test_prompt_param_align_right_valid()
         """
-        with mock.patch('subprocess.check_output', return_value='10 88'):
+        with mock.patch('action_plugins.prompt.TerminalGeometry.size', return_value=(10, 88)):
             msg = [
                 {"say": "Hello World", "align": "right"},
             ]
 
             self.assertTrue(isinstance(msg, list))
 
-            self.assertEquals(
+            self.assertEqual(
                 self.prompt._prompt(self.response, msg),
                 self.expected
             )
 
-            self.assertEquals(self.outstr.getvalue(), "%s%s" % ("Hello World".rjust(87), "\n"))
+            self.assertEqual(self.outstr.getvalue(), "%s%s" % ("Hello World".rjust(87), "\n"))
+
+
+
+
+    # say_file
+
+    def _writeFile(self, content):
+        """
+        Write a temporary file that is removed after the test, returning its path.
+
+        .. versionadded:: 1.1.0
+        .. function:: _writeFile(content)
+        """
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.remove, path)
+
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+
+        return path
+
+
+    def test_prompt_sayfile_valid(self):
+        """
+        Test that each line of a file is displayed.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_sayfile_valid()
+        """
+        path = self._writeFile("alpha\nbravo\r\ncharlie\n")
+
+        self.assertEqual(
+            self.prompt._prompt(self.response, ["Notes:", {"say_file": path}, "Done"]),
+            self.expected
+        )
+
+        self.assertEqual(self.outstr.getvalue(), "Notes:\nalpha\nbravo\ncharlie\nDone\n")
+
+
+    def test_prompt_sayfile_align_newline_valid(self):
+        """
+        Test that each line of a file is aligned, and that only the last line obeys 'newline'.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_sayfile_align_newline_valid()
+        """
+        path = self._writeFile("alpha\nbravo")
+
+        with mock.patch('action_plugins.prompt.TerminalGeometry.size', return_value=(10, 20)):
+            self.prompt._prompt(self.response, {"say_file": path, "align": "right", "newline": False})
+
+        self.assertEqual(self.outstr.getvalue(), "%s\n%s" % ("alpha".rjust(19), "bravo".rjust(20)))
+
+
+    def test_prompt_sayfile_empty_valid(self):
+        """
+        Test that an empty file displays nothing.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_sayfile_empty_valid()
+        """
+        self.prompt._prompt(self.response, {"say_file": self._writeFile("")})
+
+        self.assertEqual(self.outstr.getvalue(), "")
+
+
+    def test_prompt_sayfile_large_bounded(self):
+        """
+        Test that a large file is written in bounded chunks rather than buffered whole.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_sayfile_large_bounded()
+        """
+        line = "x" * 99
+        path = self._writeFile(("%s\n" % line) * 5000)
+
+        outstr = mock.Mock()
+        self.prompt.setOutput(outstr)
+        self.prompt._prompt(self.response, {"say_file": path})
+
+        writes = [c[0][0] for c in outstr.write.call_args_list]
+
+        self.assertEqual("".join(writes), ("%s\n" % line) * 5000)
+        self.assertTrue(len(writes) > 1)
+        self.assertTrue(max(len(w) for w in writes) <= 65536 + 100)
+
+
+    def test_prompt_sayfile_missing_fails(self):
+        """
+        Test that a missing file fails the prompt.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_sayfile_missing_fails()
+        """
+        result = self.prompt._prompt(self.response, {"say_file": "/nonexistent/notes.txt"})
+
+        self.assertTrue(result['failed'])
+        self.assertTrue(result['msg'].startswith("Unable to read file '/nonexistent/notes.txt'"))
+
+
+    def test_prompt_sayfile_empty_fails(self):
+        """
+        Test that an empty file path fails validation.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_sayfile_empty_fails()
+        """
+        self.expected['failed'] = True
+        self.expected['msg'] = "Parameter 'say_file' must provide a file path.  Empty received."
+
+        self.assertEqual(
+            self.prompt._prompt(self.response, {"say_file": " "}),
+            self.expected
+        )
+
+
+    def test_prompt_sayfile_withsay_fails(self):
+        """
+        Test that 'say' and 'say_file' cannot be used together.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_sayfile_withsay_fails()
+        """
+        self.expected['failed'] = True
+        self.expected['msg'] = "Option 'say' is not compatible with option 'say_file'."
+
+        self.assertEqual(
+            self.prompt._prompt(self.response, {"say": "Hello", "say_file": "notes.txt"}),
+            self.expected
+        )
+
+
+    def test_prompt_sayfile_withask_fails(self):
+        """
+        Test that 'ask' and 'say_file' cannot be used together.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_sayfile_withask_fails()
+        """
+        self.expected['failed'] = True
+        self.expected['msg'] = "Option 'say_file' is not compatible with option 'ask'."
+
+        self.assertEqual(
+            self.prompt._prompt(self.response, {"ask": "answer", "say_file": "notes.txt"}),
+            self.expected
+        )
+
+
+
+
+    # setFlushPolicy(policy)
+
+    def test_prompt_setFlushPolicy_default_single_write(self):
+        """
+        Test that many messages are written to the output stream in a single call by default.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setFlushPolicy_default_single_write()
+        """
+        outstr = mock.Mock()
+        self.prompt.setOutput(outstr)
+
+        msg = ["Line %d" % i for i in range(500)]
+
+        self.assertEqual(
+            self.prompt._prompt(self.response, msg),
+            self.expected
+        )
+
+        outstr.write.assert_called_once_with("".join("%s\n" % m for m in msg))
+        outstr.flush.assert_called_once_with()
+
+
+    def test_prompt_setFlushPolicy_item_valid(self):
+        """
+        Test that the 'item' flush policy writes each message as it is rendered.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setFlushPolicy_item_valid()
+        """
+        outstr = mock.Mock()
+        self.prompt.setOutput(outstr)
+        self.prompt.setFlushPolicy('item')
+
+        self.prompt._prompt(self.response, ["alpha", "bravo", "charlie"])
+
+        self.assertEqual(
+            outstr.write.call_args_list,
+            [mock.call("alpha\n"), mock.call("bravo\n"), mock.call("charlie\n")]
+        )
+
+
+    def test_prompt_setFlushPolicy_invalid_exception(self):
+        """
+        Test that an unknown flush policy is rejected.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setFlushPolicy_invalid_exception()
+        """
+        with self.assertRaises(ValueError):
+            self.prompt.setFlushPolicy('never')
+
+
+    def test_prompt_setFlushPolicy_flushes_before_ask(self):
+        """
+        Test that buffered messages are written before the user is asked for input.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setFlushPolicy_flushes_before_ask()
+        """
+        def return_helper(*args, **kwargs):
+            """
+            Returns the output written so far.
+            """
+            return self.outstr.getvalue()
+
+        with mock.patch.object(self.prompt, '_readLine', side_effect=return_helper):
+            result = self.prompt._prompt({}, ["alpha", "bravo", {"ask": "seen", "trim": False}, "charlie"])
+
+        self.assertEqual(result['ansible_facts']['seen'], "alpha\nbravo\n")
+        self.assertEqual(self.outstr.getvalue(), "alpha\nbravo\ncharlie\n")
+
+
+
+    # color, bold, style
+
+    def test_prompt_style_left_valid(self):
+        """
+        Test that styled messages are wrapped in ANSI escape sequences.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_style_left_valid()
+        """
+        self.prompt._prompt(self.response, [
+            {"say": "Alert", "color": "red", "bold": True},
+            {"say": "Note", "style": "underline, italic"},
+            {"say": "Plain", "style": []},
+        ])
+
+        self.assertEqual(
+            self.outstr.getvalue(),
+            "\x1b[31;1mAlert\x1b[0m\n\x1b[4;3mNote\x1b[0m\nPlain\n"
+        )
+
+
+    def test_prompt_style_center_aligned(self):
+        """
+        Test that styled messages are centered by the columns they occupy, not their escape sequences.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_style_center_aligned()
+        """
+        with mock.patch('action_plugins.prompt.TerminalGeometry.size', return_value=(10, 21)):
+            self.prompt._prompt(self.response, [
+                {"say": "Hello World", "align": "center", "color": "green", "style": ["bold"]},
+                {"say": "Hello World", "align": "right", "color": "green"},
+            ])
+
+        self.assertEqual(
+            self.outstr.getvalue(),
+            "    \x1b[32;1mHello World\x1b[0m     \n         \x1b[32mHello World\x1b[0m\n"
+        )
+
+
+    def test_prompt_style_wide_aligned(self):
+        """
+        Test that wide characters count as two columns when aligning.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_style_wide_aligned()
+        """
+        with mock.patch('action_plugins.prompt.TerminalGeometry.size', return_value=(10, 11)):
+            self.prompt._prompt(self.response, [
+                {"say": u"\u65e5\u672c\u8a9e", "align": "center"},
+                {"say": u"cafe\u0301", "align": "right"},
+            ])
+
+        self.assertEqual(
+            self.outstr.getvalue(),
+            u"  \u65e5\u672c\u8a9e  \n      cafe\u0301\n"
+        )
+
+
+    def test_prompt_style_ask_valid(self):
+        """
+        Test that a styled question styles its prompt, but not its default or postfix.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_style_ask_valid()
+        """
+        msg = {"say": "Color", "ask": "color", "default": "blue", "color": "cyan"}
+
+        with mock.patch.object(self.prompt, '_readLine', return_value="") as mockinput:
+            self.prompt._prompt(self.response, msg)
+
+        self.assertEqual(mockinput.call_args[0][0], "\x1b[36mColor\x1b[0m [blue]? ")
+
+
+    def test_prompt_style_invalid_fails(self):
+        """
+        Test that unknown colors and styles fail validation.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_style_invalid_fails()
+        """
+        self.assertEqual(self.prompt.validate([
+            {"say": "Hello", "color": "chartreuse"},
+            {"say": "Hello", "style": "bold sparkly"},
+            {"say": "Hello", "color": ["red"]},
+            {"say": "Hello", "style": [["bold"]]},
+        ]), [
+            "Color 'chartreuse' invalid.  Expected one of: black, blue, bright_black, bright_blue, bright_cyan, "
+            "bright_green, bright_magenta, bright_red, bright_white, bright_yellow, cyan, green, magenta, red, "
+            "white, yellow.",
+            "Style 'sparkly' invalid.  Expected one of: blink, bold, dim, italic, reverse, underline.",
+            "Color '['red']' invalid.  Expected one of: black, blue, bright_black, bright_blue, bright_cyan, "
+            "bright_green, bright_magenta, bright_red, bright_white, bright_yellow, cyan, green, magenta, red, "
+            "white, yellow.",
+            "Style '['bold']' invalid.  Expected one of: blink, bold, dim, italic, reverse, underline.",
+        ])
+
+
+    def test_prompt_displayWidth_valid(self):
+        """
+        Test that display widths ignore escape sequences and count wide and combining characters.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_displayWidth_valid()
+        """
+        self.assertEqual(displayWidth("Hello"), 5)
+        self.assertEqual(displayWidth("\x1b[1;31mHello\x1b[0m"), 5)
+        self.assertEqual(displayWidth(u"\uff21\uff22"), 4)
+        self.assertEqual(displayWidth(u"e\u0301"), 1)
+        self.assertEqual(CHAR_WIDTHS[u"\uff21"], 2)
+
+
+
+
+    # wrap, box, panel
+
+    def test_prompt_wrap_valid(self):
+        """
+        Test that wrapped messages are split into lines fitting the terminal.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_wrap_valid()
+        """
+        with mock.patch('action_plugins.prompt.TerminalGeometry.size', return_value=(10, 13)):
+            self.prompt._prompt(self.response, [
+                {"say": "The quick brown fox jumps over the lazy dog", "wrap": True},
+                {"say": "Hello there World", "wrap": True, "align": "right", "newline": False},
+            ])
+
+        self.assertEqual(
+            self.outstr.getvalue(),
+            "The quick\nbrown fox\njumps over\nthe lazy dog\n" + "Hello there".rjust(12) + "\n" + "World".rjust(13)
+        )
+
+
+    def test_prompt_wrap_long_word_split(self):
+        """
+        Test that words wider than the terminal are split across lines.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_wrap_long_word_split()
+        """
+        with mock.patch('action_plugins.prompt.TerminalGeometry.size', return_value=(10, 6)):
+            self.prompt._prompt(self.response, {"say": "a abcdefghijkl b", "wrap": True})
+
+        self.assertEqual(self.outstr.getvalue(), "a\nabcde\nfghij\nkl b\n")
+
+
+    def test_prompt_wrap_sayfile_valid(self):
+        """
+        Test that each line of a file is wrapped separately.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_wrap_sayfile_valid()
+        """
+        path = self._writeFile("one two three\nfour\n")
+
+        with mock.patch('action_plugins.prompt.TerminalGeometry.size', return_value=(10, 9)):
+            self.prompt._prompt(self.response, {"say_file": path, "wrap": True})
+
+        self.assertEqual(self.outstr.getvalue(), "one two\nthree\nfour\n")
+
+
+    def test_prompt_box_valid(self):
+        """
+        Test that a box is drawn around a message, as wide as its text, and aligned as a whole.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_box_valid()
+        """
+        with mock.patch('action_plugins.prompt.TerminalGeometry.size', return_value=(10, 21)):
+            self.prompt._prompt(self.response, [
+                {"say": "Hello World", "box": True},
+                {"say": "Hi", "box": True, "align": "right"},
+            ])
+
+        self.assertEqual(self.outstr.getvalue(), (
+            u"\u250c\u2500\u2500\u2500\u2500\u2500\u2500\u2500\u2500\u2500\u2500\u2500\u2500\u2500\u2510\n"
+            u"\u2502 Hello World \u2502\n"
+            u"\u2514\u2500\u2500\u2500\u2500\u2500\u2500\u2500\u2500\u2500\u2500\u2500\u2500\u2500\u2518\n"
+            u"              \u250c\u2500\u2500\u2500\u2500\u2510\n"
+            u"              \u2502 Hi \u2502\n"
+            u"              \u2514\u2500\u2500\u2500\u2500\u2518\n"
+        ))
+
+
+    def test_prompt_box_wrapped(self):
+        """
+        Test that text too wide for a box is wrapped inside it.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_box_wrapped()
+        """
+        with mock.patch('action_plugins.prompt.TerminalGeometry.size', return_value=(10, 12)):
+            self.prompt._prompt(self.response, {"say": "Hello there World", "box": True})
+
+        self.assertEqual(self.outstr.getvalue(), (
+            u"\u250c" + u"\u2500" * 7 + u"\u2510\n"
+            u"\u2502 Hello \u2502\n"
+            u"\u2502 there \u2502\n"
+            u"\u2502 World \u2502\n"
+            u"\u2514" + u"\u2500" * 7 + u"\u2518\n"
+        ))
+
+
+    def test_prompt_panel_valid(self):
+        """
+        Test that a panel spans the terminal and aligns its text within it, in a single write.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_panel_valid()
+        """
+        outstr = mock.Mock(wraps=io.StringIO())
+
+        self.prompt.setOutput(outstr)
+        self.prompt.setFlushPolicy('item')
+
+        with mock.patch('action_plugins.prompt.TerminalGeometry.size', return_value=(10, 13)):
+            self.prompt._prompt(self.response, {"say": "Hi", "panel": True, "align": "center"})
+
+        self.assertEqual(outstr.write.call_count, 1)
+        self.assertEqual(outstr.write.call_args[0][0], (
+            u"\u250c" + u"\u2500" * 10 + u"\u2510\n"
+            u"\u2502    Hi    \u2502\n"
+            u"\u2514" + u"\u2500" * 10 + u"\u2518\n"
+        ))
+
+
+    def test_prompt_layout_invalid_fails(self):
+        """
+        Test that layouts fail validation when combined with incompatible options.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_layout_invalid_fails()
+        """
+        self.assertEqual(self.prompt.validate([
+            {"say": "Hello", "box": True, "panel": True},
+            {"say_file": "motd", "box": True},
+            {"say": "Hello", "panel": True, "newline": False},
+            {"say": "Hello", "ask": "name", "wrap": True},
+        ]), [
+            "Option 'box' is not compatible with option 'panel'.",
+            "Option 'box' is not compatible with option 'say_file'.",
+            "Option 'newline' is not compatible with option 'panel'.",
+            "Option 'wrap' is not compatible with option 'ask'.",
+        ])
+
+
+
+
+    # setFormat(fmt)
+
+    def test_prompt_setFormat_json_valid(self):
+        """
+        Test that the 'json' format writes each message as a single line of JSON without terminal formatting.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setFormat_json_valid()
+        """
+        self.prompt.setFormat('json')
+
+        with mock.patch('action_plugins.prompt.TerminalGeometry.size') as size:
+            self.assertEqual(
+                self.prompt._prompt(self.response, [
+                    {"say": "Hello", "align": "center", "color": "red", "newline": False},
+                    {"say": u"Ol\u00e1 \"World\"", "panel": True},
+                ]),
+                self.expected
+            )
+
+        size.assert_not_called()
+
+        self.assertEqual(self.outstr.getvalue(), (
+            u'{"text":"Hello","align":"center","host":null}\n'
+            u'{"text":"Ol\u00e1 \\"World\\"","align":"left","host":null}\n'
+        ))
+
+
+    def test_prompt_setFormat_json_sayfile_valid(self):
+        """
+        Test that each line of a file is written as its own JSON record.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setFormat_json_sayfile_valid()
+        """
+        self.prompt.setFormat('json')
+
+        self.prompt._prompt(self.response, {"say_file": self._writeFile("alpha\nbravo"), "align": "right"})
+
+        self.assertEqual(self.outstr.getvalue(), (
+            '{"text":"alpha","align":"right","host":null}\n'
+            '{"text":"bravo","align":"right","host":null}\n'
+        ))
+
+
+    def test_prompt_setFormat_environment(self):
+        """
+        Test that the format can be set with the ANSIBLE_PROMPT_FORMAT environment variable.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setFormat_environment()
+        """
+        self.assertEqual(self.prompt._format, 'text')
+
+        with mock.patch.dict(os.environ, {'ANSIBLE_PROMPT_FORMAT': 'json'}):
+            self.assertEqual(self._getPrompt()._format, 'json')
+
+
+    def test_prompt_run_environment_invalid_fails(self):
+        """
+        Test that invalid settings in the environment fail the task when it runs, rather than raising.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_run_environment_invalid_fails()
+        """
+        for name, value, message in [
+            ('ANSIBLE_PROMPT_FLUSH', 'never', "Invalid flush policy 'never'. Expected 'ask' or 'item'."),
+            ('ANSIBLE_PROMPT_TIMEOUT', 'soon', "Invalid timeout 'soon'. Expected a positive number of seconds."),
+            ('ANSIBLE_PROMPT_FORMAT', 'xml', "Invalid format 'xml'. Expected 'text' or 'json'."),
+        ]:
+            with mock.patch.dict(os.environ, {name: value}):
+                prompt = self._getPrompt()
+
+            prompt.setOutput(self.outstr)
+            prompt._task.args = {"msg": "Hello World"}
+
+            self.assertEqual(prompt.run(), {
+                'failed': True,
+                'msg': "Environment variable %s invalid.  %s" % (name, message)
+            })
+
+        self.assertEqual(self.outstr.getvalue(), "")
+
+
+    def test_prompt_setFormat_invalid_exception(self):
+        """
+        Test that an unknown format is rejected.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setFormat_invalid_exception()
+        """
+        with self.assertRaises(ValueError):
+            self.prompt.setFormat('xml')
+
+
+    def test_prompt_run_format_json_valid(self):
+        """
+        Test that the run() method accepts the 'format' parameter and reports the host of each message.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_run_format_json_valid()
+        """
+        self.prompt._task.args = {"msg": "Hello World", "format": "json"}
+
+        self.prompt.run(task_vars={"inventory_hostname": "web01"})
+
+        self.assertEqual(self.outstr.getvalue(), '{"text":"Hello World","align":"left","host":"web01"}\n')
+
+
+    def test_prompt_run_format_invalid_fails(self):
+        """
+        Test that the run() method fails with an unknown 'format' parameter.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_run_format_invalid_fails()
+        """
+        self.prompt._task.args = {"msg": "Hello World", "format": "xml"}
+
+        result = self.prompt.run()
+
+        self.assertEqual(result['msg'], "Format 'xml' invalid.  Expected 'text' or 'json'.")
+        self.assertEqual(self.outstr.getvalue(), "")
 
 
 
@@ -729,7 +1338,7 @@ class TestSay(unittest.TestCase):
 
         prompt.setOutput(self.outstr)
 
-        self.assertEquals(
+        self.assertEqual(
             prompt.run(),
             self.expected
         )
@@ -743,7 +1352,7 @@ class TestSay(unittest.TestCase):
         .. function:: test_run_multiple_params_fails()
         """
         self.expected['failed'] = True
-        self.expected['msg'] = "Expected single 'msg' parameter. Multiple parameters given."
+        self.expected['msg'] = "Unexpected parameter 'foo'.  Expected 'msg', with optional 'form' and 'format'."
 
         del(self.expected['changed'])
 
@@ -755,12 +1364,36 @@ class TestSay(unittest.TestCase):
             "foo": "bar"
         }
 
-        self.assertEquals(
+        self.assertEqual(
             prompt.run(),
             self.expected
         )
 
 
+    def test_prompt_run_unexpected_params_named(self):
+        """
+        Test that the run() method names every unexpected parameter, while accepting 'form' and 'format'.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_run_unexpected_params_named()
+        """
+        prompt = self._getPrompt()
+
+        prompt.setOutput(self.outstr)
+        prompt._task.args = {
+            "msg": "Hello World",
+            "form": True,
+            "format": "text",
+            "foo": "bar",
+            "baz": "qux"
+        }
+
+        self.assertEqual(prompt.run(), {
+            'failed': True,
+            'msg': "Unexpected parameter 'baz', 'foo'.  Expected 'msg', with optional 'form' and 'format'."
+        })
+
+
     def test_prompt_run_singlemessage_valid(self):
         """
         Test that the run() method will succeed with a single message.
@@ -777,12 +1410,12 @@ class TestSay(unittest.TestCase):
             "msg": "Hello World"
         }
 
-        self.assertEquals(
+        self.assertEqual(
             prompt.run(),
             self.expected
         )
 
-        self.assertEquals(
+        self.assertEqual(
             self.outstr.getvalue(),
             "Hello World\n"
         )
@@ -807,12 +1440,12 @@ class TestSay(unittest.TestCase):
             ]
         }
 
-        self.assertEquals(
+        self.assertEqual(
             prompt.run(),
             self.expected
         )
 
-        self.assertEquals(
+        self.assertEqual(
             self.outstr.getvalue(),
             "Hello World\nHi there\n"
         )
@@ -843,12 +1476,12 @@ class TestSay(unittest.TestCase):
             ]
         }
 
-        self.assertEquals(
+        self.assertEqual(
             prompt.run(),
             self.expected
         )
 
-        self.assertEquals(
+        self.assertEqual(
             self.outstr.getvalue(),
             "Hello World\n"
         )
@@ -875,12 +1508,12 @@ class TestSay(unittest.TestCase):
             ]
         }
 
-        self.assertEquals(
+        self.assertEqual(
             prompt.run(),
             self.expected
         )
 
-        self.assertEquals(
+        self.assertEqual(
             self.outstr.getvalue(),
             "Hello World\n"
         )
@@ -893,7 +1526,7 @@ class TestSay(unittest.TestCase):
         .. versionadded:: 0.3.0
         .. function:: test_prompt_run_align_center_valid()
         """
-        with mock.patch('subprocess.check_output', return_value='10 88'):
+        with mock.patch('action_plugins.prompt.TerminalGeometry.size', return_value=(10, 88)):
             del(self.expected['changed'])
 
             prompt = self._getPrompt()
@@ -909,12 +1542,12 @@ class TestSay(unittest.TestCase):
                 ]
             }
 
-            self.assertEquals(
+            self.assertEqual(
                 prompt.run(),
                 self.expected
             )
 
-            self.assertEquals(
+            self.assertEqual(
                 self.outstr.getvalue(),
                 "Hello World".center(88)
             )
@@ -927,7 +1560,7 @@ class TestSay(unittest.TestCase):
         .. versionadded:: 0.3.0
         .. function:: test_prompt_run_align_right_valid()
         """
-        with mock.patch('subprocess.check_output', return_value='10 52'):
+        with mock.patch('action_plugins.prompt.TerminalGeometry.size', return_value=(10, 52)):
             del(self.expected['changed'])
 
             prompt = self._getPrompt()
@@ -943,12 +1576,12 @@ class TestSay(unittest.TestCase):
                 ]
             }
 
-            self.assertEquals(
+            self.assertEqual(
                 prompt.run(),
                 self.expected
             )
 
-            self.assertEquals(
+            self.assertEqual(
                 self.outstr.getvalue(),
                 "Hello World".rjust(52)
             )
@@ -0,0 +1,381 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 Andrew Vaughan <hello@andrewvaughan.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Test suite for the Ansible prompt action plugin.
+
+.. moduleauthor:: Andrew Vaughan <hello@andrewvaughan.io>
+"""
+
+import io
+import os
+import pty
+import shutil
+import tempfile
+import termios
+import unittest
+
+from unittest import mock
+
+from action_plugins import Prompt
+from action_plugins.prompt import AnswerStore, InputSession, Secret, TerminalLock
+
+from ansible.errors import AnsibleError
+from ansible.playbook.task import Task as AnsibleTask
+from ansible.playbook.play_context import PlayContext as AnsiblePlayContext
+
+try:
+    import passlib
+    HAS_PASSLIB = True
+except ImportError:
+    HAS_PASSLIB = False
+
+
+class TestSecret(unittest.TestCase):
+    """
+    Tests the secret questions of the Ansible prompt action plugin.
+
+    .. class:: TestSecret
+    .. versionadded:: 1.1.0
+    """
+
+    def setUp(self):
+        """
+        Sets up a prompt object and a temporary directory before each test.
+
+        .. versionadded:: 1.1.0
+        .. function:: setUp()
+        """
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+        self.prompt = self._getPrompt()
+
+        self.outstr = io.StringIO()
+        self.prompt.setOutput(self.outstr)
+
+
+    def _getPrompt(self, task=None):
+        """
+        Return a generic Prompt object.
+
+        :kwarg task: the task to run (defaults to a new task)
+
+        :returns: generic Prompt object
+
+        .. versionadded:: 1.1.0
+        .. function:: _getPrompt([task=None])
+        """
+        prompt = Prompt(
+            task=task or AnsibleTask(),
+            connection=mock.Mock(),
+            play_context=AnsiblePlayContext(),
+            loader=None,
+            templar=None,
+            shared_loader_obj=None
+        )
+        prompt.setAnswerStore(AnswerStore(os.path.join(self.tmpdir, 'answers.json')))
+        prompt.setTerminalLock(TerminalLock(os.path.join(self.tmpdir, 'tty.lock')))
+        prompt.setInput(io.StringIO())
+
+        return prompt
+
+
+    def _answer(self, msg, content, prompt=None):
+        """
+        Run a message, answering its questions with the given input.
+
+        :returns: the task result and everything written to the output stream
+
+        .. versionadded:: 1.1.0
+        .. function:: _answer(msg, content[, prompt=None])
+        """
+        prompt = prompt or self.prompt
+        prompt.setInput(io.StringIO(content))
+
+        result = prompt._prompt({}, msg)
+
+        return result, prompt._outstr.getvalue()
+
+
+
+
+    # InputSession.noEcho()
+
+    def test_session_noEcho_terminal(self):
+        """
+        Test that a terminal stops displaying input while echo is disabled, and displays it again afterwards.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_session_noEcho_terminal()
+        """
+        master, slave = pty.openpty()
+        self.addCleanup(os.close, master)
+
+        session = InputSession(os.fdopen(slave))
+        self.addCleanup(session.stream().close)
+
+        with session.noEcho() as disabled:
+            flags = termios.tcgetattr(slave)[3]
+
+            self.assertTrue(disabled)
+            self.assertFalse(flags & termios.ECHO)
+            self.assertTrue(flags & termios.ECHONL)
+
+        self.assertTrue(termios.tcgetattr(slave)[3] & termios.ECHO)
+
+
+    def test_session_noEcho_stream(self):
+        """
+        Test that input which is not a terminal is read as usual.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_session_noEcho_stream()
+        """
+        session = InputSession(io.StringIO("hunter2\n"))
+
+        with session.noEcho() as disabled:
+            self.assertFalse(disabled)
+            self.assertEqual(session.readline(), "hunter2\n")
+
+
+
+
+    # secret
+
+    def test_prompt_secret_no_echo(self):
+        """
+        Test that secrets are read without echo, are not trimmed, and keep the task result from being displayed.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_secret_no_echo()
+        """
+        msg = [{'say': 'Name', 'ask': 'name'}, {'say': 'Password', 'ask': 'password', 'secret': True}]
+
+        with mock.patch.object(self.prompt, '_readLine', side_effect=['Andrew', ' hunter2 ']) as readLine:
+            result = self.prompt._prompt({}, msg)
+
+        self.assertEqual(readLine.call_args_list, [
+            mock.call("Name? ", None, True),
+            mock.call("Password? ", None, False),
+        ])
+        self.assertEqual(result['ansible_facts'], {'name': 'Andrew', 'password': ' hunter2 '})
+        self.assertTrue(result['_ansible_no_log'])
+
+
+    def test_prompt_secret_verify_mismatch(self):
+        """
+        Test that a secret asked twice is asked again until both answers match.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_secret_verify_mismatch()
+        """
+        result, terminal = self._answer(
+            {'say': 'Password', 'ask': 'password', 'secret': True, 'verify': True, 'postfix': ':'},
+            "hunter2\nhunter3\n\nhunter2\nhunter2\n"
+        )
+
+        self.assertEqual(terminal, (
+            "Password: Confirm Password: Answers do not match.\n"
+            "Password: Password: Confirm Password: "
+        ))
+        self.assertEqual(result['ansible_facts'], {'password': 'hunter2'})
+
+
+    def test_prompt_secret_encrypt_valid(self):
+        """
+        Test that a secret can be set as a hash of the answer.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_secret_encrypt_valid()
+        """
+        with mock.patch('ansible.utils.encrypt.do_encrypt', return_value="$6$salt$hash") as encrypt:
+            result, terminal = self._answer(
+                {'ask': 'password', 'secret': True, 'encrypt': 'sha512_crypt', 'salt': 'salt', 'trim': True},
+                " hunter2 \n"
+            )
+
+        encrypt.assert_called_once_with("hunter2", "sha512_crypt", salt="salt")
+        self.assertEqual(result['ansible_facts'], {'password': "$6$salt$hash"})
+
+
+    @unittest.skipUnless(HAS_PASSLIB, "requires passlib")
+    def test_prompt_secret_encrypt_sha512_crypt(self):
+        """
+        Test that a secret is hashed with sha512-crypt.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_secret_encrypt_sha512_crypt()
+        """
+        from passlib.hash import sha512_crypt
+
+        result, terminal = self._answer({'ask': 'password', 'secret': True, 'encrypt': 'sha512_crypt'}, "hunter2\n")
+
+        self.assertTrue(sha512_crypt.verify("hunter2", result['ansible_facts']['password']))
+
+
+    def test_prompt_secret_encrypt_failed(self):
+        """
+        Test that a secret that cannot be hashed fails the prompt.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_secret_encrypt_failed()
+        """
+        with mock.patch('ansible.utils.encrypt.do_encrypt', side_effect=AnsibleError("passlib must be installed")):
+            result, terminal = self._answer({'ask': 'password', 'secret': True, 'encrypt': 'sha512_crypt'}, "x\n")
+
+        self.assertEqual(result['msg'], "Unable to hash the answer to 'password': passlib must be installed")
+
+
+    def test_prompt_secret_encrypt_once(self):
+        """
+        Test that a secret is hashed once, and the hash shared with every host, without writing the secret to disk.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_secret_encrypt_once()
+        """
+        task = AnsibleTask()
+        task._uuid = 'task-uuid'
+
+        store = AnswerStore(os.path.join(self.tmpdir, 'answers.json'))
+        terminal = io.StringIO("hunter2\n")
+        msg = {'ask': 'password', 'secret': True, 'encrypt': 'sha512_crypt'}
+        results = []
+
+        with mock.patch('ansible.utils.encrypt.do_encrypt', return_value="$6$salt$hash") as encrypt, \
+                mock.patch('sys.stdout', new=io.StringIO()) as stdout:
+            for i in range(50):
+                prompt = self._getPrompt(task)
+                prompt.setAnswerStore(store)
+                prompt.setInput(terminal)
+
+                results.append(prompt._prompt({}, msg)['ansible_facts']['password'])
+
+        self.assertEqual(encrypt.call_count, 1)
+        self.assertEqual(results, ["$6$salt$hash"] * 50)
+        self.assertEqual(stdout.getvalue(), "? ")
+
+        with open(store.path) as f:
+            self.assertNotIn("hunter2", f.read())
+
+
+    def test_prompt_secret_plain_not_stored(self):
+        """
+        Test that a secret that is not hashed is asked for each host rather than written to disk.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_secret_plain_not_stored()
+        """
+        task = AnsibleTask()
+        task._uuid = 'task-uuid'
+
+        store = AnswerStore(os.path.join(self.tmpdir, 'answers.json'))
+        terminal = io.StringIO("hunter2\nhunter3\n")
+        results = []
+
+        with mock.patch('sys.stdout', new=io.StringIO()):
+            for i in range(2):
+                prompt = self._getPrompt(task)
+                prompt.setAnswerStore(store)
+                prompt.setInput(terminal)
+
+                results.append(prompt._prompt({}, {'ask': 'password', 'secret': True})['ansible_facts']['password'])
+
+        self.assertEqual(results, ["hunter2", "hunter3"])
+        self.assertFalse(os.path.exists(store.path))
+
+
+    def test_prompt_secret_encrypt_once_false_not_stored(self):
+        """
+        Test that a hashed secret that is asked for each host is not written to disk.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_secret_encrypt_once_false_not_stored()
+        """
+        msg = {'ask': 'password', 'secret': True, 'encrypt': 'sha512_crypt', 'once': False}
+
+        with mock.patch('ansible.utils.encrypt.do_encrypt', return_value="$6$salt$hash"):
+            result, _ = self._answer(msg, "hunter2\n")
+
+        self.assertEqual(result['ansible_facts']['password'], "$6$salt$hash")
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir, 'answers.json')))
+
+
+    def test_prompt_secret_not_in_form(self):
+        """
+        Test that secrets are asked on their own rather than as part of a form.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_secret_not_in_form()
+        """
+        self.prompt.setInput(io.StringIO("Andrew\nhunter2\nBlue\n"))
+
+        result = self.prompt._prompt({}, [
+            {'say': 'Name', 'ask': 'name'},
+            {'say': 'Password', 'ask': 'password', 'secret': True},
+            {'say': 'Color', 'ask': 'color'},
+        ], form=True)
+
+        self.assertEqual(self.outstr.getvalue(), "1. Name?\nPassword? 1. Color?\n")
+        self.assertEqual(result['ansible_facts'], {'name': 'Andrew', 'password': 'hunter2', 'color': 'Blue'})
+
+
+    def test_prompt_secret_compiled(self):
+        """
+        Test that secret options compile into the question's secret handling.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_secret_compiled()
+        """
+        plan = self.prompt._compile([
+            {'ask': 'a'},
+            {'ask': 'b', 'secret': True},
+            {'ask': 'c', 'secret': True, 'verify': True, 'encrypt': 'sha512_crypt', 'salt': 'abc'},
+        ])
+
+        self.assertEqual([op.secret for op in plan.ops], [
+            None,
+            Secret(False, None, None),
+            Secret(True, 'sha512_crypt', 'abc'),
+        ])
+        self.assertEqual([op.trim for op in plan.ops], [True, False, False])
+
+
+    def test_prompt_secret_invalid_fails(self):
+        """
+        Test that invalid secret options fail validation.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_secret_invalid_fails()
+        """
+        self.assertEqual(self.prompt.validate([
+            {'ask': 'a', 'verify': True},
+            {'ask': 'a', 'secret': True, 'default': 'hunter2'},
+            {'ask': 'a', 'secret': True, 'confirm': True},
+            {'ask': 'a', 'secret': True, 'encrypt': 'sha512-crypt'},
+            {'ask': 'a', 'secret': True, 'encrypt': 'sha512_crypt', 'type': 'int'},
+            {'ask': 'a', 'secret': True, 'salt': 'abc'},
+            {'say': 'a', 'secret': True},
+        ]), [
+            "Option 'verify' requires option 'secret'.",
+            "Option 'default' is not compatible with option 'secret'.",
+            "Option 'confirm' is not compatible with option 'secret'.",
+            "Encrypt 'sha512-crypt' invalid.  Expected a hashing algorithm, such as 'sha512_crypt'.",
+            "Option 'type' is not compatible with option 'encrypt'.",
+            "Option 'salt' requires option 'encrypt'.",
+            "Unexpected 'secret' in non-question prompt.",
+        ])
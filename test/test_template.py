@@ -0,0 +1,497 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 Andrew Vaughan <hello@andrewvaughan.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+Test suite for the Ansible prompt action plugin.
+
+.. moduleauthor:: Andrew Vaughan <hello@andrewvaughan.io>
+"""
+
+import ansible.template
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest import mock
+
+from action_plugins import Prompt
+from action_plugins.prompt import AnswerStore, TerminalLock
+
+from ansible.parsing.dataloader import DataLoader
+from ansible.playbook.task import Task as AnsibleTask
+from ansible.playbook.play_context import PlayContext as AnsiblePlayContext
+from ansible.plugins.action import ActionBase
+
+
+def _trusted(text):
+    """
+    Mark text as a template written in a playbook, which ansible-core 2.19 and later require before templating it.
+
+    .. versionadded:: 1.1.0
+    .. function:: _trusted(text)
+    """
+    trust = getattr(ansible.template, 'trust_as_template', None)
+
+    return trust(text) if trust is not None else text
+
+
+class TestTemplate(unittest.TestCase):
+    """
+    Tests the incremental rendering of message items by the Ansible prompt action plugin.
+
+    .. class:: TestTemplate
+    .. versionadded:: 1.1.0
+    """
+
+    def setUp(self):
+        """
+        Sets up a prompt object with a template engine before each test.
+
+        .. versionadded:: 1.1.0
+        .. function:: setUp()
+        """
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+        self.templar = ansible.template.Templar(loader=DataLoader(), variables={})
+        self.prompt = Prompt(
+            task=AnsibleTask(),
+            connection=mock.Mock(),
+            play_context=AnsiblePlayContext(),
+            loader=DataLoader(),
+            templar=self.templar,
+            shared_loader_obj=None
+        )
+        self.prompt.setAnswerStore(AnswerStore(os.path.join(self.tmpdir, 'answers.json')))
+        self.prompt.setTerminalLock(TerminalLock(os.path.join(self.tmpdir, 'tty.lock')))
+        self.prompt.setInput(io.StringIO())
+
+        self.outstr = io.StringIO()
+        self.prompt.setOutput(self.outstr)
+
+
+    def _answer(self, msg, content, task_vars=None):
+        """
+        Run a message, answering its questions with the given input.
+
+        :returns: the task result and everything written to the output stream
+
+        .. versionadded:: 1.1.0
+        .. function:: _answer(msg, content[, task_vars=None])
+        """
+        self.prompt.setInput(io.StringIO(content))
+        self.prompt._task.args = {'msg': msg}
+
+        result = self.prompt.run(task_vars=task_vars or {})
+
+        return result, self.outstr.getvalue()
+
+
+
+
+    # _renderOp(op, variables)
+
+    def test_prompt_template_answer_valid(self):
+        """
+        Test that later items are rendered with the answers to earlier questions of the same task.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_template_answer_valid()
+        """
+        result, terminal = self._answer([
+            {'say': 'First Name:', 'ask': 'first_name', 'postfix': ''},
+            {'say': _trusted('Hello {{ first_name }}!  Favorite color?'), 'ask': 'color',
+             'default': _trusted('{{ first_name | lower }}')},
+            {'say': _trusted('{{ first_name }} likes {{ color }}.')},
+        ], "Andrew\n\n")
+
+        self.assertEqual(terminal, "First Name: Hello Andrew!  Favorite color? [andrew]? Andrew likes andrew.\n")
+        self.assertEqual(result['ansible_facts'], {'first_name': 'Andrew', 'color': 'andrew'})
+
+
+    def test_prompt_template_task_vars_valid(self):
+        """
+        Test that items are rendered with the variables of the task.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_template_task_vars_valid()
+        """
+        result, terminal = self._answer(
+            [
+                _trusted('Deploying {{ release }}'),
+                {'say': _trusted('Release {{ release }}'), 'ask': 'go', 'confirm': True},
+            ],
+            "y\n",
+            {'release': '1.1.0'}
+        )
+
+        self.assertEqual(terminal, "Deploying 1.1.0\nRelease 1.1.0 [Yn]? ")
+
+
+    def test_prompt_template_answer_not_templated(self):
+        """
+        Test that templates typed by the user are displayed as typed.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_template_answer_not_templated()
+        """
+        self._answer([{'ask': 'name'}, _trusted('Hello {{ name }}')], "{{ 6 * 7 }}\n")
+
+        self.assertEqual(self.outstr.getvalue(), "? Hello {{ 6 * 7 }}\n")
+
+
+    def test_prompt_template_undefined_fails(self):
+        """
+        Test that a template using an undefined variable fails the prompt.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_template_undefined_fails()
+        """
+        result, terminal = self._answer(['Before', _trusted('Hello {{ missing }}'), 'After'], "")
+
+        self.assertTrue(result['failed'])
+        self.assertTrue(result['msg'].startswith("Unable to render message:"))
+        self.assertEqual(self.outstr.getvalue(), "Before\n")
+
+
+    def test_prompt_template_default_invalid_fails(self):
+        """
+        Test that a templated default is checked once rendered.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_template_default_invalid_fails()
+        """
+        result, terminal = self._answer([
+            {'ask': 'name'},
+            {'ask': 'count', 'type': 'int', 'default': _trusted('{{ name }}')},
+        ], "Andrew\n")
+
+        self.assertEqual(result['msg'], "Default 'Andrew' is not a valid answer for 'count'.")
+
+
+    def test_prompt_template_plan_shared(self):
+        """
+        Test that rendering for one host does not change the cached plan used by the next.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_template_plan_shared()
+        """
+        msg = [_trusted('Host {{ inventory_hostname }}')]
+
+        self._answer(msg, "", {'inventory_hostname': 'web01'})
+        self._answer(msg, "", {'inventory_hostname': 'web02'})
+
+        self.assertEqual(self.outstr.getvalue(), "Host web01\nHost web02\n")
+        self.assertEqual(self.prompt._compile(msg).ops[0].text, 'Host {{ inventory_hostname }}')
+
+
+
+
+    # when
+
+    def test_prompt_when_answer_valid(self):
+        """
+        Test that items are shown only when their conditions are true for the answers given so far.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_when_answer_valid()
+        """
+        result, terminal = self._answer([
+            {'say': 'Use a proxy', 'ask': 'proxy', 'confirm': False},
+            {'say': 'Proxy host', 'ask': 'proxy_host', 'when': _trusted('proxy')},
+            {'say': 'Direct connection.', 'when': [_trusted('not proxy'), _trusted('region == "us"')]},
+            {'say': 'Region', 'ask': 'region_name', 'when': _trusted('region != "us"')},
+        ], "n\n", {'region': 'us'})
+
+        self.assertEqual(terminal, "Use a proxy [yN]? Direct connection.\n")
+        self.assertEqual(result['ansible_facts'], {'proxy': False})
+
+
+    def test_prompt_when_literal_valid(self):
+        """
+        Test that literal conditions skip items, even without a template engine.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_when_literal_valid()
+        """
+        self.prompt._templar = None
+
+        self.prompt._prompt({}, [{'say': 'Hidden', 'when': False}, {'say': 'Shown', 'when': [True]}])
+
+        self.assertEqual(self.outstr.getvalue(), "Shown\n")
+
+
+    def test_prompt_when_literal_not_templated(self):
+        """
+        Test that literal conditions are decided without evaluating them through the template engine.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_when_literal_not_templated()
+        """
+        self.prompt._loader = None
+
+        with mock.patch.object(self.templar, 'evaluate_conditional', create=True) as evaluate:
+            self.prompt._prompt({}, [{'say': 'Hidden', 'when': [True, False]}, {'say': 'Shown', 'when': True}])
+
+        self.assertFalse(evaluate.called)
+        self.assertEqual(self.outstr.getvalue(), "Shown\n")
+
+
+    def test_prompt_when_no_templar_fails(self):
+        """
+        Test that a templated condition fails without a template engine.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_when_no_templar_fails()
+        """
+        self.prompt._templar = None
+
+        result = self.prompt._prompt({}, {'say': 'Hello', 'when': [True, 'proxy']})
+
+        self.assertEqual(result, {
+            'failed': True,
+            'msg': "Unable to evaluate condition 'proxy': no template engine available."
+        })
+
+
+    def test_prompt_when_form_valid(self):
+        """
+        Test that questions whose conditions are false are left out of a form.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_when_form_valid()
+        """
+        self.prompt.setInput(io.StringIO("Andrew\n"))
+
+        result = self.prompt._prompt({}, [
+            {'say': 'Name', 'ask': 'name'},
+            {'say': 'Email', 'ask': 'email', 'when': False},
+        ], form=True)
+
+        self.assertEqual(self.outstr.getvalue(), "1. Name?\n")
+        self.assertEqual(result['ansible_facts'], {'name': 'Andrew'})
+
+
+    def test_prompt_when_undefined_fails(self):
+        """
+        Test that a condition using an undefined variable fails the prompt.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_when_undefined_fails()
+        """
+        result, terminal = self._answer([{'say': 'Hello', 'when': _trusted('missing')}], "")
+
+        self.assertTrue(result['failed'])
+        self.assertTrue(result['msg'].startswith("Unable to evaluate condition:"))
+
+
+    def test_prompt_when_invalid_fails(self):
+        """
+        Test that conditions that are neither text nor booleans fail validation.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_when_invalid_fails()
+        """
+        self.assertEqual(self.prompt.validate([
+            {'say': 'Hello', 'when': []},
+            {'say': 'Hello', 'when': {'proxy': True}},
+        ]), [
+            "Option 'when' must be a condition or a list of conditions.",
+            "Option 'when' must be a condition or a list of conditions.",
+        ])
+
+
+
+
+    # foreach
+
+    def test_prompt_foreach_say_valid(self):
+        """
+        Test that a message is shown for each element of a loop, in order.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_foreach_say_valid()
+        """
+        self._answer([
+            'Services:',
+            {'say': _trusted('- {{ item }}'), 'foreach': _trusted('{{ services }}')},
+            'Done',
+        ], "", {'services': ['nginx', 'redis']})
+
+        self.assertEqual(self.outstr.getvalue(), "Services:\n- nginx\n- redis\nDone\n")
+
+
+    def test_prompt_foreach_ask_valid(self):
+        """
+        Test that the answers to a repeated question are collected into a single dict fact.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_foreach_ask_valid()
+        """
+        result, terminal = self._answer([
+            {
+                'say': _trusted('Restart {{ service.name }}'),
+                'ask': 'restart',
+                'confirm': False,
+                'foreach': [{'name': 'nginx', 'critical': True}, {'name': 'redis'}, {'name': 'cron'}],
+                'loop_var': 'service',
+                'key': _trusted('{{ service.name }}'),
+                'when': _trusted('service.name != "cron"'),
+            },
+            {'say': _trusted('nginx: {{ restart.nginx }}, redis: {{ restart.redis }}')},
+        ], "y\n\n")
+
+        self.assertEqual(terminal, "Restart nginx [yN]? Restart redis [yN]? nginx: True, redis: False\n")
+        self.assertEqual(result['ansible_facts'], {'restart': {'nginx': True, 'redis': False}})
+
+
+    def test_prompt_foreach_ask_replaces_answer(self):
+        """
+        Test that a repeated question replaces the answer of an earlier question with the same variable.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_foreach_ask_replaces_answer()
+        """
+        result, terminal = self._answer([
+            {'ask': 'port'},
+            {'ask': 'port', 'foreach': ['web', 'db']},
+        ], "80\n8080\n5432\n")
+
+        self.assertEqual(result['ansible_facts'], {'port': {'web': '8080', 'db': '5432'}})
+
+
+    def test_prompt_foreach_many_valid(self):
+        """
+        Test that a loop over hundreds of elements answers every one within a single result.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_foreach_many_valid()
+        """
+        hosts = ['host%03d' % i for i in range(500)]
+
+        result, terminal = self._answer(
+            [{'say': _trusted('Port for {{ item }}'), 'ask': 'ports', 'type': 'int', 'foreach': hosts}],
+            "".join("%d\n" % (8000 + i) for i in range(500))
+        )
+
+        self.assertEqual(result['ansible_facts']['ports'], dict((h, 8000 + i) for i, h in enumerate(hosts)))
+
+
+    def test_prompt_foreach_rendered_invalid_fails(self):
+        """
+        Test that a loop whose template does not render a list fails the prompt.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_foreach_rendered_invalid_fails()
+        """
+        result, terminal = self._answer([{'say': 'Hello', 'foreach': _trusted('{{ name }}')}], "", {'name': 'Andrew'})
+
+        self.assertEqual(result['msg'], "Option 'foreach' must be a list.  Received 'Andrew'.")
+
+
+    def test_prompt_foreach_ask_key_required_fails(self):
+        """
+        Test that a question repeated over mappings or lists fails without a key, rather than keying answers by repr.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_foreach_ask_key_required_fails()
+        """
+        for element in ({'name': 'nginx'}, ['nginx', 80]):
+            result, terminal = self._answer([{'ask': 'restart', 'confirm': False, 'foreach': [element]}], "y\n")
+
+            self.assertEqual(
+                result['msg'],
+                "Option 'key' is required to repeat 'restart' over elements that are not strings or numbers."
+            )
+
+
+    def test_prompt_foreach_ask_key_rendered_invalid_fails(self):
+        """
+        Test that a key rendering a mapping fails the prompt.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_foreach_ask_key_rendered_invalid_fails()
+        """
+        result, terminal = self._answer([
+            {'ask': 'restart', 'confirm': False, 'foreach': [{'name': 'nginx'}], 'key': _trusted('{{ item }}')},
+        ], "y\n")
+
+        self.assertEqual(result['msg'], "Option 'key' must render a string or number.  Received '{'name': 'nginx'}'.")
+
+
+    def test_prompt_foreach_say_mapping_valid(self):
+        """
+        Test that messages may be repeated over mappings without a key, as only answers are keyed.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_foreach_say_mapping_valid()
+        """
+        self._answer([{'say': _trusted('Host {{ item.name }}'), 'foreach': [{'name': 'a'}, {'name': 'b'}]}], "")
+
+        self.assertEqual(self.outstr.getvalue(), "Host a\nHost b\n")
+
+
+    def test_prompt_foreach_invalid_fails(self):
+        """
+        Test that invalid loops fail validation.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_foreach_invalid_fails()
+        """
+        self.assertEqual(self.prompt.validate([
+            {'say': 'Hello', 'foreach': 'services'},
+            {'say': 'Hello', 'foreach': ['a'], 'loop_var': 'my-item'},
+            {'say': 'Hello', 'foreach': ['a'], 'key': 'name'},
+            {'foreach': ['a']},
+            {'say': 'Hello', 'loop_var': 'service'},
+            {'say': 'Hello', 'ask': 'name', 'foreach': ['a'], 'align': 'center'},
+        ]), [
+            "Option 'foreach' must be a list.  Received 'services'.",
+            "Invalid character in 'loop_var' parameter 'my-item'.",
+            "Unexpected 'key' in non-question prompt.",
+            "Option 'foreach' requires a 'say', 'say_file', or 'ask' to repeat.",
+            "Option 'loop_var' requires option 'foreach'.",
+            "Option 'align' is not compatible with option 'ask'.",
+        ])
+
+
+
+
+    # finalize_task_arg(name, value, templar, context)
+
+    @unittest.skipUnless(hasattr(ActionBase, 'finalize_task_arg'), "requires ansible-core 2.19 or later")
+    def test_prompt_finalize_deferred_valid(self):
+        """
+        Test that only the text of message items is left to be templated by the plugin.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_finalize_deferred_valid()
+        """
+        templar = self.templar.copy_with_new_env(available_variables={'where': 'center', 'name': 'Andrew'})
+
+        self.assertEqual(
+            Prompt.finalize_task_arg('msg', [
+                _trusted('{{ name }}'),
+                {'say': _trusted('{{ name }}'), 'align': _trusted('{{ where }}')},
+            ], templar, None),
+            ['{{ name }}', {'say': '{{ name }}', 'align': 'center'}]
+        )
+
+        self.assertEqual(Prompt.finalize_task_arg('msg', _trusted('{{ name }}'), templar, None), 'Andrew')
+        self.assertEqual(Prompt.finalize_task_arg('form', _trusted('{{ 1 == 1 }}'), templar, None), True)
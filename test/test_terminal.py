@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 Andrew Vaughan <hello@andrewvaughan.io>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Test suite for the Ansible prompt action plugin.
+
+.. moduleauthor:: Andrew Vaughan <hello@andrewvaughan.io>
+"""
+
+import io
+import os
+import pty
+import re
+import select
+import shutil
+import signal
+import tempfile
+import termios
+import threading
+import unittest
+
+from unittest import mock
+
+from action_plugins import Prompt
+from action_plugins.prompt import AnswerStore, TERMINAL, TerminalGeometry, TerminalLock
+
+from ansible.playbook.task import Task as AnsibleTask
+from ansible.playbook.play_context import PlayContext as AnsiblePlayContext
+
+
+class TestTerminal(unittest.TestCase):
+    """
+    Tests the terminal geometry provider of the Ansible prompt action plugin.
+
+    .. class:: TestTerminal
+    .. versionadded:: 1.1.0
+    """
+
+    def setUp(self):
+        """
+        Sets up a geometry provider with a fixed size query before each test.
+
+        .. versionadded:: 1.1.0
+        .. function:: setUp()
+        """
+        self.terminal = TerminalGeometry(default=(30, 100))
+
+
+
+
+    # setTerminal(terminal)
+
+    def test_prompt_setTerminal_default_valid(self):
+        """
+        Test that prompts share the process-wide terminal geometry by default.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_prompt_setTerminal_default_valid()
+        """
+        prompt = Prompt(
+            task=AnsibleTask(),
+            connection=None,
+            play_context=AnsiblePlayContext(),
+            loader=None,
+            templar=None,
+            shared_loader_obj=None
+        )
+
+        self.assertEqual(prompt._terminal, TERMINAL)
+
+        prompt.setTerminal(self.terminal)
+        self.assertEqual(prompt._terminal, self.terminal)
+
+        prompt.setTerminal()
+        self.assertEqual(prompt._terminal, TERMINAL)
+
+
+
+
+    # size()
+
+    def test_terminal_size_cached(self):
+        """
+        Test that the terminal is only queried once for many aligned messages.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_terminal_size_cached()
+        """
+        prompt = Prompt(
+            task=AnsibleTask(),
+            connection=None,
+            play_context=AnsiblePlayContext(),
+            loader=None,
+            templar=None,
+            shared_loader_obj=None
+        )
+
+        outstr = io.StringIO()
+        prompt.setOutput(outstr)
+        prompt.setTerminal(self.terminal)
+
+        with mock.patch.object(TerminalGeometry, '_query', return_value=(10, 20)) as query:
+            prompt._prompt({}, [{"say": "Hello", "align": "center"}] * 40)
+
+            self.assertEqual(query.call_count, 1)
+
+        self.assertEqual(outstr.getvalue(), ("%s\n" % "Hello".center(19)) * 40)
+
+
+    def test_terminal_size_sigwinch_invalidates(self):
+        """
+        Test that a resize signal causes the terminal to be queried again.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_terminal_size_sigwinch_invalidates()
+        """
+        with mock.patch.object(TerminalGeometry, '_query', side_effect=[(10, 20), (10, 40)]) as query:
+            self.assertEqual(self.terminal.size(), (10, 20))
+            self.assertEqual(self.terminal.size(), (10, 20))
+
+            os.kill(os.getpid(), signal.SIGWINCH)
+
+            self.assertEqual(self.terminal.size(), (10, 40))
+            self.assertEqual(query.call_count, 2)
+
+
+    def test_terminal_size_thread_handler_deferred(self):
+        """
+        Test that measuring the terminal from another thread leaves the resize handler for the main thread to install.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_terminal_size_thread_handler_deferred()
+        """
+        with mock.patch.object(TerminalGeometry, '_handlerInstalled', False), \
+                mock.patch.object(TerminalGeometry, '_previousHandler', None), \
+                mock.patch.object(TerminalGeometry, '_query', return_value=(10, 20)), \
+                mock.patch('signal.signal') as install:
+            thread = threading.Thread(target=TerminalGeometry().size)
+            thread.start()
+            thread.join()
+
+            self.assertFalse(TerminalGeometry._handlerInstalled)
+            self.assertFalse(install.called)
+
+            TerminalGeometry().size()
+
+            self.assertTrue(TerminalGeometry._handlerInstalled)
+            install.assert_called_once_with(signal.SIGWINCH, TerminalGeometry._resized)
+
+
+    def test_terminal_size_invalidate(self):
+        """
+        Test that invalidate() causes the terminal to be queried again.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_terminal_size_invalidate()
+        """
+        with mock.patch.object(TerminalGeometry, '_query', side_effect=[(10, 20), (10, 40)]):
+            self.assertEqual(self.terminal.columns(), 20)
+
+            self.terminal.invalidate()
+
+            self.assertEqual(self.terminal.columns(), 40)
+
+
+    def test_terminal_size_columns_env(self):
+        """
+        Test that the COLUMNS environment variable is used when there is no terminal.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_terminal_size_columns_env()
+        """
+        with mock.patch.object(TerminalGeometry, '_query', return_value=None):
+            with mock.patch.dict(os.environ, {'COLUMNS': '132', 'LINES': '50'}):
+                self.assertEqual(self.terminal.size(), (50, 132))
+
+
+    def test_terminal_size_default(self):
+        """
+        Test that the configured default is used when there is no terminal or environment setting.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_terminal_size_default()
+        """
+        with mock.patch.object(TerminalGeometry, '_query', return_value=None):
+            with mock.patch.dict(os.environ, {'COLUMNS': ''}):
+                self.assertEqual(self.terminal.size(), (30, 100))
+
+
+    def test_terminal_query_stream(self):
+        """
+        Test that the output stream's terminal is measured with an ioctl.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_terminal_query_stream()
+        """
+        stream = mock.Mock()
+        stream.fileno.return_value = 99
+
+        terminal = TerminalGeometry(stream=stream)
+
+        with mock.patch.object(TerminalGeometry, '_ioctl', return_value=(12, 34)) as ioctl:
+            self.assertEqual(terminal.size(), (12, 34))
+            self.assertEqual(ioctl.call_args[0][3], 99)
+
+
+
+
+
+    # TerminalLock
+
+    def test_terminallock_stress_pty(self):
+        """
+        Test that many processes asking questions on one pseudo-terminal each receive their own answer.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_terminallock_stress_pty()
+        """
+        count = 16
+        tmpdir = tempfile.mkdtemp()
+        master, slave = pty.openpty()
+
+        # Answers must not be echoed back, so everything read from the master side is a prompt
+        attrs = termios.tcgetattr(slave)
+        attrs[3] &= ~termios.ECHO
+        termios.tcsetattr(slave, termios.TCSANOW, attrs)
+
+        lock = TerminalLock(os.path.join(tmpdir, 'tty.lock'))
+        store = AnswerStore(os.path.join(tmpdir, 'answers.json'))
+        children = []
+
+        for i in range(count):
+            pid = os.fork()
+
+            if pid == 0:
+                status = 1
+
+                try:
+                    ttyin = os.fdopen(os.dup(slave), 'r')
+                    ttyout = os.fdopen(os.dup(slave), 'w')
+
+                    prompt = Prompt(
+                        task=AnsibleTask(),
+                        connection=None,
+                        play_context=AnsiblePlayContext(),
+                        loader=None,
+                        templar=None,
+                        shared_loader_obj=None
+                    )
+
+                    prompt.setInput(ttyin)
+                    prompt.setOutput(ttyout)
+                    prompt.setTerminalLock(lock)
+                    prompt.setAnswerStore(store)
+
+                    result = prompt._prompt({}, [
+                        "Host %d says hello" % i,
+                        {'say': 'Host %d' % i, 'ask': 'name', 'once': False},
+                    ])
+
+                    status = 0 if result['ansible_facts']['name'] == 'answer-%d' % i else 2
+                finally:
+                    os._exit(status)
+
+            children.append(pid)
+
+        try:
+            buf = ""
+            answered = 0
+
+            while answered < count:
+                ready, _, _ = select.select([master], [], [], 10)
+                self.assertTrue(ready, "Timed out waiting for a prompt")
+
+                buf += os.read(master, 4096).decode('utf-8')
+
+                for match in re.finditer(r"Host (\d+)\? ", buf):
+                    os.write(master, ("answer-%s\n" % match.group(1)).encode('utf-8'))
+                    answered += 1
+
+                buf = buf[buf.rfind("? ") + 2:] if "? " in buf else buf
+
+            statuses = []
+
+            while children:
+                statuses.append(os.waitpid(children.pop(), 0)[1])
+
+            self.assertEqual(statuses, [0] * count)
+        finally:
+            # Children still blocked on the terminal after a failure would otherwise never exit
+            for pid in children:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+
+            os.close(master)
+            os.close(slave)
+            shutil.rmtree(tmpdir)
+
+
+    def test_terminallock_forRun_private(self):
+        """
+        Test that the lock for a run lives in a directory only the current user can access.
+
+        .. versionadded:: 1.1.0
+        .. function:: test_terminallock_forRun_private()
+        """
+        tmpdir = tempfile.mkdtemp()
+
+        try:
+            with mock.patch('tempfile.gettempdir', return_value=tmpdir):
+                with mock.patch.dict(TerminalLock._runLocks, clear=True):
+                    lock = TerminalLock.forRun()
+
+            with lock.hold():
+                self.assertTrue(os.path.exists(lock.path))
+
+            self.assertEqual(os.path.basename(lock.path), '%d.tty.lock' % os.getppid())
+            self.assertEqual(os.stat(os.path.dirname(lock.path)).st_mode & 0o777, 0o700)
+        finally:
+            shutil.rmtree(tmpdir)